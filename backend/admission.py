@@ -0,0 +1,210 @@
+import math
+import secrets
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, NoReturn
+
+import asyncpg
+
+import db
+from email_client import EmailClient
+from scheduler import LLMScheduler
+
+DEFAULT_TENANT = "default"
+# Serializes admission checks with the inserts they admit, so a burst of
+# concurrent /negotiate calls cannot all pass against the same counts.
+ADMISSION_LOCK = 0x6E65676F
+# Window over which finished turns are counted to estimate throughput.
+THROUGHPUT_WINDOW = 300
+
+# A negotiation counts as active while it has turns queued or running;
+# nothing moves negotiation.status on when suppliers stop answering, so the
+# status column would only ever grow.
+COUNTS = db.Query(
+    "admission_counts",
+    """
+    SELECT
+        count(DISTINCT ng_id) AS active,
+        count(DISTINCT ng_id) FILTER (WHERE tenant = $1) AS tenant_active,
+        count(*) AS pending,
+        count(*) FILTER (WHERE tenant = $1) AS tenant_pending,
+        (SELECT count(*) FROM agent_job
+         WHERE status = 'done' AND locked_at > NOW() - make_interval(secs => $2)) AS recent_done
+    FROM agent_job
+    WHERE status IN ('queued', 'running')
+    """,
+    timeout=2,
+)
+TENANT_COUNTS = db.Query(
+    "admission_tenants",
+    """
+    SELECT tenant, count(DISTINCT ng_id)::int AS active, count(*)::int AS pending,
+           (count(*) FILTER (WHERE status = 'running'))::int AS running
+    FROM agent_job
+    WHERE status IN ('queued', 'running')
+    GROUP BY tenant
+    ORDER BY pending DESC, active DESC
+    LIMIT $1
+    """,
+    timeout=5,
+)
+
+
+def tenant_for_key(api_keys: dict[str, str], api_key: str | None) -> str | None:
+    """
+    The tenant an API key belongs to, or None if the key is unknown.
+
+    Without configured keys every caller is `DEFAULT_TENANT`: a client
+    cannot pick its own tenant and so its own per-tenant limits.
+    """
+    if not api_keys:
+        return DEFAULT_TENANT
+    if api_key is None:
+        return None
+    for key, tenant in api_keys.items():
+        if secrets.compare_digest(key, api_key):
+            return tenant
+    return None
+
+
+class AdmissionRejected(Exception):
+    """Answered with 429 and `Retry-After: retry_after`."""
+
+    def __init__(self, reason: str, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    """Zero disables a limit; all are off unless configured."""
+
+    max_active_negotiations: int = 0
+    tenant_max_active_negotiations: int = 0
+    max_pending_turns: int = 0
+    tenant_max_pending_turns: int = 0
+    tenant_max_running_turns: int = 0
+    outbox_high_water: float = 0.0
+    # Retry-After when a negotiation limit is hit; a negotiation stops
+    # counting once all of its queued turns are done, not after one turn.
+    negotiation_retry_after: int = 300
+    max_retry_after: int = 600
+
+
+class AdmissionController:
+    """
+    Limits how much work the API accepts, based on what is already queued.
+
+    Negotiation starts are checked against active negotiations (those with
+    work queued or running) and pending agent turns (queued or running
+    jobs), globally and per tenant, in the transaction that creates them.
+    The tenant comes from the caller's API key (see `tenant_for_key`). Emails are refused while the outbox is
+    nearly full. Rejections carry a Retry-After estimated from how fast the
+    backlog is draining. Running turns per tenant are capped when workers
+    claim jobs (see jobs.CLAIM_SQL).
+    """
+
+    def __init__(
+        self,
+        limits: AdmissionLimits,
+        scheduler: LLMScheduler,
+        email_client: EmailClient | None = None,
+    ) -> None:
+        self.limits = limits
+        self.scheduler = scheduler
+        self.email_client = email_client
+        self.admitted: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+
+    def _retry_after(self, backlog: float, rate: float) -> int:
+        if rate <= 0:
+            return self.limits.max_retry_after
+        return max(1, min(self.limits.max_retry_after, math.ceil(backlog / rate)))
+
+    def _reject(self, reason: str, detail: str, retry_after: int) -> NoReturn:
+        self.rejected[reason] += 1
+        raise AdmissionRejected(reason, detail, retry_after)
+
+    async def admit_negotiation(self, conn: asyncpg.Connection, tenant: str, turns: int) -> None:
+        """
+        Raise AdmissionRejected unless a negotiation opening `turns` turns
+        fits. Call inside the transaction that inserts it.
+        """
+        limits = self.limits
+        if not (
+            limits.max_active_negotiations
+            or limits.tenant_max_active_negotiations
+            or limits.max_pending_turns
+            or limits.tenant_max_pending_turns
+        ):
+            # Nothing to check, so no reason to serialize /negotiate calls.
+            self.admitted["negotiations"] += 1
+            return
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", ADMISSION_LOCK)
+        counts = await db.fetchrow(conn, COUNTS, tenant, THROUGHPUT_WINDOW)
+        if 0 < limits.max_active_negotiations <= counts["active"]:
+            self._reject(
+                "active_negotiations",
+                f"{counts['active']} negotiations are active",
+                limits.negotiation_retry_after,
+            )
+        if 0 < limits.tenant_max_active_negotiations <= counts["tenant_active"]:
+            self._reject(
+                "tenant_active_negotiations",
+                f"Tenant {tenant} has {counts['tenant_active']} active negotiations",
+                limits.negotiation_retry_after,
+            )
+
+        rate = counts["recent_done"] / THROUGHPUT_WINDOW
+        for reason, pending, limit in (
+            ("pending_turns", counts["pending"], limits.max_pending_turns),
+            ("tenant_pending_turns", counts["tenant_pending"], limits.tenant_max_pending_turns),
+        ):
+            if limit and pending + turns > limit:
+                self._reject(
+                    reason,
+                    f"{pending} agent turns are queued or running",
+                    self._retry_after(pending + turns - limit, rate),
+                )
+        self.admitted["negotiations"] += 1
+
+    def admit_email(self) -> None:
+        """Raise AdmissionRejected while the outbox is above its high-water mark."""
+        outbox = self.email_client.outbox if self.email_client else None
+        if outbox is not None:
+            queued = outbox.pending
+            high_water = self.limits.outbox_high_water * outbox.queue.maxsize
+            if high_water and queued >= high_water:
+                self._reject(
+                    "outbox",
+                    f"{queued} emails are waiting to be sent",
+                    self._retry_after(queued - high_water + 1, outbox.send_rate()),
+                )
+        self.admitted["emails"] += 1
+
+    async def status(self, pool: asyncpg.Pool, tenants: int = 20) -> dict[str, Any]:
+        """Limits, current backlog and the busiest `tenants` tenants."""
+        outbox = self.email_client.outbox if self.email_client else None
+        counts = await db.fetchrow(pool, COUNTS, DEFAULT_TENANT, THROUGHPUT_WINDOW)
+        rows = await db.fetch(pool, TENANT_COUNTS, tenants)
+        return {
+            "limits": asdict(self.limits),
+            "active_negotiations": counts["active"],
+            "pending_turns": counts["pending"],
+            "turns_per_minute": counts["recent_done"] * 60 / THROUGHPUT_WINDOW,
+            "tenants": {row["tenant"]: dict(row) for row in rows},
+            "llm": {
+                "queue_depth": self.scheduler.queue_depth,
+                "in_flight": self.scheduler.in_flight,
+                "defer_depth": self.scheduler.defer_depth,
+                "advice_deferred": self.scheduler.deferred,
+            },
+            "outbox": {
+                "queued": outbox.pending if outbox else 0,
+                "capacity": outbox.queue.maxsize if outbox else 0,
+                "sends_per_second": outbox.send_rate() if outbox else 0.0,
+            },
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
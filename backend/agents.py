@@ -1,65 +1,223 @@
-
-from botocore import client
-from pydantic import BaseModel
+import asyncio
 import json
-
-
-def call_bedrock(prompt: str, system_prompt: str = "") -> str:
-    """Call Amazon Bedrock gpt-oss-120b model and return response text."""
-    messages = [{"role": "user", "content": prompt}]
-    if system_prompt:
-        messages.insert(0, {"role": "system", "content": system_prompt})
-
-    body = {
-        "messages": messages,
-        "max_tokens": 1024,
-        "temperature": 0.7,
+import sys
+
+import asyncpg
+
+import db
+from context import ConversationContext
+from llm import LLMGateway
+from offers import JSON_OBJECT, OfferLedger, format_snapshot
+from streams import TokenStreamHub
+
+OPENING_INSTRUCTION = (
+    "Write the opening email to the supplier requesting a quote. "
+    "Reply with the email body only."
+)
+
+# Suppliers advised in one completion before switching to one call each.
+BATCH_ADVICE_MAX = 25
+
+SAVE_MESSAGE = db.Query(
+    "save_message",
+    """
+    INSERT INTO message (ng_id, supplier_id, role, content)
+    VALUES ($1, $2, $3, $4)
+    RETURNING message_id
+    """,
+    timeout=5,
+)
+
+
+def parse_advice(reply: str, sup_ids: list[str]) -> dict[str, str]:
+    """Split a batched advice reply into per-supplier instructions."""
+    match = JSON_OBJECT.search(reply)
+    if not match:
+        return {}
+    try:
+        raw = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    return {
+        sup_id: raw[sup_id].strip()
+        for sup_id in sup_ids
+        if isinstance(raw.get(sup_id), str) and raw[sup_id].strip()
     }
 
-    try :
 
-        response = bedrock_client.invoke_model(
-        modelId="openai.gpt-oss-120b-1:0",
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps(body),
+class NegotiationAgent:
+    # Thousands of these can be resident; slots keep each to a few pointers.
+    __slots__ = (
+        "client",
+        "db_pool",
+        "sys_prompt",
+        "ng_id",
+        "sup_id",
+        "product",
+        "insights",
+        "streams",
+        "context",
+    )
+
+    def __init__(
+        self,
+        client: LLMGateway,
+        db_pool: asyncpg.Pool,
+        sys_prompt: str,
+        ng_id: str,
+        sup_id: str,
+        product: str,
+        insights: str = "",
+        streams: TokenStreamHub | None = None,
+        context: ConversationContext | None = None,
+    ) -> None:
+        self.client = client
+        self.db_pool = db_pool
+        # Every agent row stores the same prompt; interned, all loaded
+        # agents share one copy instead of one string per row.
+        self.sys_prompt = sys.intern(sys_prompt or "")
+        self.ng_id = ng_id
+        self.sup_id = sup_id
+        self.product = sys.intern(product)
+        self.insights = insights
+        self.streams = streams
+        self.context = context or ConversationContext(client, db_pool, ng_id, sup_id)
+
+    def system_prompt(self, instructions: str = "") -> str:
+        prompt = f"{self.sys_prompt}\nProduct: {self.product}\n"
+        if self.insights:
+            prompt += f"Supplier insights: {self.insights}\n"
+        if instructions:
+            prompt += f"Supervisor instructions: {instructions}\n"
+        return prompt
+
+    async def save_message(self, role: str, content: str) -> str:
+        message_id = await db.fetchval(
+            self.db_pool, SAVE_MESSAGE, self.ng_id, self.sup_id, role, content
         )
-    except Exception as e:
-        return f"Bedrock service is currently unavailable. {e}"
-
-
-
-    result = json.loads(response["body"].read())
-    return result["choices"][0]["message"]["content"]
-
+        return str(message_id)
+
+    async def generate(self, messages: list[dict[str, str]]) -> str:
+        """Complete `messages`, streaming partial text to subscribers if a hub is set."""
+        if self.streams is None:
+            return await self.client.invoke(messages)
+
+        parts = []
+        try:
+            async for text in self.client.stream(messages):
+                parts.append(text)
+                self.streams.publish(self.ng_id, self.sup_id, {"type": "token", "text": text})
+        except BaseException:
+            self.streams.publish(self.ng_id, self.sup_id, {"type": "error"})
+            raise
+        return "".join(parts)
+
+    async def send_message(self, instructions: str = "") -> tuple[str, str] | None:
+        """
+        Draft the next email to the supplier and persist it.
+
+        Returns the new message id and text, or None when the model call
+        fails so that nothing half-written ends up in the transcript.
+        """
+        messages = await self.context.build(self.system_prompt(instructions))
+        if len(messages) == 1:
+            messages.append({"role": "user", "content": OPENING_INSTRUCTION})
+
+        try:
+            reply = await self.generate(messages)
+        except Exception as e:
+            print(f"Negotiator {self.sup_id} in {self.ng_id} failed: {e}")
+            return None
 
-class NegotiationAgent(BaseModel):
-    sys_prompt: str
-    insights:str
-    product: str
-    def __init__(self,client, sys_prompt: str, insights:str, product: str) -> None:
-        self.sys_prompt = sys_prompt
-        self.insights = insights
-        self.product = product
-        self.client = client
-        return
-    def send_message(self)-> str:
-
-        try :
-            response = self.client.invoke_model(
-                 modelId="openai.gpt-oss-120b-1:0",
-                 contentType="application/json",
-                 accept="application/json",
-                 body=json.dumps(body),
+        message_id = await self.save_message("negotiator", reply)
+        if self.streams is not None:
+            self.streams.publish(
+                self.ng_id, self.sup_id, {"type": "done", "message_id": message_id}
             )
+        return message_id, reply
+
+
+class OrchestratorAgent:
+    __slots__ = ("client", "strategy", "product", "sys_promt", "db_pool", "ng_id", "ledger")
+
+    def __init__(
+        self,
+        client: LLMGateway,
+        strategy: str,
+        product: str,
+        sys_promt: str,
+        db_pool: asyncpg.Pool,
+        ng_id: str,
+        ledger: OfferLedger | None = None,
+    ) -> None:
+        self.client = client
+        self.strategy = strategy
+        self.product = sys.intern(product)
+        self.sys_promt = sys_promt
+        self.db_pool = db_pool
+        self.ng_id = ng_id
+        self.ledger = ledger or OfferLedger(client, db_pool)
+
+    async def overview(self) -> str:
+        """Offer standings per supplier from the ledger, independent of thread length."""
+        return format_snapshot(await self.ledger.snapshot(self.ng_id))
+
+    def _prompt(self, overview: str, task: str) -> str:
+        return f"""
+        Product: {self.product}
+        Strategy: {self.strategy}
+        Supplier standings, cheapest best offer first:
+        {overview}
+
+        {task}
+        """
+
+    async def advise(self, sup_id: str, overview: str | None = None) -> str:
+        """Return instructions for the negotiator talking to `sup_id`."""
+        if overview is None:
+            overview = await self.overview()
+        prompt = self._prompt(
+            overview, f"Give short, concrete instructions for the agent negotiating with {sup_id}."
+        )
+        try:
+            return await self.client.complete(prompt, self.sys_promt, lane="orchestrator")
         except Exception as e:
-            return f"Bedrock service is currently unavailable. {e}"
-        result = json.loads(response["body"].read())
-        return result["choices"][0]["message"]["content"]
-
-
-
-
-
-
+            print(f"Orchestrator advice for {sup_id} in {self.ng_id} failed: {e}")
+            return ""
+
+    async def advise_all(self, sup_ids: list[str]) -> dict[str, str]:
+        """
+        Instructions for every supplier's negotiator from one shared snapshot.
+
+        Up to `BATCH_ADVICE_MAX` suppliers are advised in a single completion
+        that returns a JSON object keyed by supplier id; anyone missing from
+        it, or every supplier in larger negotiations, is advised by concurrent
+        single-supplier calls.
+        """
+        overview = await self.overview()
+        advice: dict[str, str] = {}
+        if len(sup_ids) <= BATCH_ADVICE_MAX:
+            prompt = self._prompt(
+                overview,
+                "Give short, concrete instructions for the agent negotiating with each "
+                f"of these suppliers: {', '.join(sup_ids)}. Reply with one JSON object "
+                "mapping each supplier id to its instructions and nothing else.",
+            )
+            try:
+                reply = await self.client.complete(
+                    prompt,
+                    self.sys_promt,
+                    max_tokens=200 * len(sup_ids) + 200,
+                    lane="orchestrator",
+                )
+                advice = parse_advice(reply, sup_ids)
+            except Exception as e:
+                print(f"Orchestrator advice round in {self.ng_id} failed: {e}")
+
+        missing = [sup_id for sup_id in sup_ids if sup_id not in advice]
+        results = await asyncio.gather(*(self.advise(sup_id, overview) for sup_id in missing))
+        advice.update(zip(missing, results))
+        return advice
 
@@ -0,0 +1,133 @@
+"""
+Benchmark prompt size as a supplier thread grows.
+
+Plays a 200-message negotiation into `agent`/`message` tables in a scratch
+`context_bench` schema (the live tables are not touched) and, after every
+message, compares the tokens sent with the full transcript against the
+compacted context from context.py. Summaries come from a local stand-in
+that truncates the transcript unless `--bedrock` is given.
+
+    python bench_context.py
+    python bench_context.py --messages 400 --bedrock
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+
+import asyncpg
+from dotenv import load_dotenv
+
+from context import CHAT_ROLES, ConversationContext
+from llm import estimate_tokens
+
+SCHEMA = "context_bench"
+SYSTEM_PROMPT = "You are a skilled negotiation agent representing a buyer. " * 8
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.agent (
+    ng_id UUID NOT NULL,
+    sup_id TEXT NOT NULL,
+    sys_prompt TEXT,
+    role TEXT,
+    context_summary TEXT,
+    context_offers JSONB NOT NULL DEFAULT '[]',
+    summarized_at TIMESTAMPTZ,
+    summarized_id UUID
+);
+CREATE TABLE {SCHEMA}.message (
+    message_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    ng_id UUID NOT NULL,
+    supplier_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX ON {SCHEMA}.message (ng_id, supplier_id, created_at, message_id);
+"""
+
+
+class TruncatingSummarizer:
+    """Stands in for the gateway: returns the tail of the prompt, capped like a summary."""
+
+    async def complete(self, prompt: str, system_prompt: str = "", **kwargs) -> str:
+        return prompt[-kwargs.get("max_tokens", 400) * 4 :]
+
+
+def email(role: str, i: int) -> str:
+    price = 20 - i * 0.05
+    if role == "supplier":
+        body = f"Thanks for your message. We can offer {price:.2f} EUR per unit for 5,000 units. "
+    else:
+        body = f"We appreciate the offer, but a competitor quoted {price - 1:.2f} EUR. "
+    return body + "Lead times and payment terms as discussed previously. " * random.randint(3, 8)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--bedrock", action="store_true", help="summarize with the real model")
+    parser.add_argument("--keep", action="store_true", help="keep the generated schema")
+    args = parser.parse_args()
+
+    load_dotenv()
+    url = os.environ["DB_URL"]
+    conn = await asyncpg.connect(url)
+    await conn.execute(SETUP_SQL)
+    await conn.close()
+
+    if args.bedrock:
+        from config import build_llm
+
+        client = build_llm()
+    else:
+        client = TruncatingSummarizer()
+
+    pool = await asyncpg.create_pool(url, server_settings={"search_path": f"{SCHEMA},public"})
+    ng_id, sup_id = str(uuid.uuid4()), "sup-1"
+    await pool.execute(
+        "INSERT INTO agent (ng_id, sup_id, sys_prompt, role) VALUES ($1, $2, $3, 'negotiator')",
+        ng_id,
+        sup_id,
+        SYSTEM_PROMPT,
+    )
+    context = ConversationContext(client, pool, ng_id, sup_id)
+    full: list[dict[str, str]] = [{"role": "system", "content": SYSTEM_PROMPT}]
+
+    print(f"{'messages':>8} {'full transcript':>16} {'compacted':>10} {'build ms':>9}")
+    try:
+        for i in range(1, args.messages + 1):
+            role = "supplier" if i % 2 else "negotiator"
+            content = email(role, i)
+            await pool.execute(
+                "INSERT INTO message (ng_id, supplier_id, role, content) VALUES ($1, $2, $3, $4)",
+                ng_id,
+                sup_id,
+                role,
+                content,
+            )
+            full.append({"role": CHAT_ROLES[role], "content": content})
+
+            start = time.perf_counter()
+            compacted = await context.build(SYSTEM_PROMPT)
+            elapsed = time.perf_counter() - start
+            if i % 25 == 0 or i == args.messages:
+                print(
+                    f"{i:>8} {estimate_tokens(full, 0):>16,} "
+                    f"{estimate_tokens(compacted, 0):>10,} {elapsed * 1000:>9.1f}"
+                )
+    finally:
+        if not args.keep:
+            await pool.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        await pool.close()
+        if args.bedrock:
+            client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+Benchmark JSON encoding of large row sets the way the list endpoints do it.
+
+Builds a `message` table in a scratch `json_bench` schema (the live tables
+are not touched) and, for each row count, times:
+
+- old: `[dict(row) ...]`, FastAPI's `jsonable_encoder`, then `json.dumps`
+- orjson: the Records encoded directly by `responses.dumps`
+- json_agg: Postgres builds the JSON text, Python only encodes it to bytes
+
+Each line shows the full request path (fetch + encode) and the encoding
+alone, which is the CPU the API process spends per request.
+
+    python bench_json.py                       # 10k and 100k rows
+    python bench_json.py --rows 10000 100000 500000 --runs 20 --keep
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import asyncpg
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+
+from responses import dumps
+
+SCHEMA = "json_bench"
+COLUMNS = "message_id, ng_id, supplier_id, role, content, created_at, delivery_status"
+SELECT_SQL = f"SELECT {COLUMNS} FROM message ORDER BY created_at, message_id LIMIT $1"
+JSON_AGG_SQL = f"SELECT COALESCE(json_agg(t), '[]')::text FROM ({SELECT_SQL}) t"
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.message (
+    message_id UUID PRIMARY KEY,
+    ng_id UUID NOT NULL,
+    supplier_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    delivery_status TEXT
+);
+INSERT INTO {SCHEMA}.message
+SELECT
+    md5(i::text)::uuid,
+    md5((i % 50)::text)::uuid,
+    'sup-' || (i % 20),
+    (ARRAY['negotiator', 'supplier'])[1 + i % 2],
+    'Dear supplier, ' || repeat('we would like to discuss the unit price. ', 8) || i,
+    '2026-01-01'::timestamptz + i * interval '1 second',
+    (ARRAY['sent', NULL, 'queued'])[1 + i % 3]
+FROM generate_series(1, $ROWS) i;
+CREATE INDEX ON {SCHEMA}.message (created_at, message_id);
+ANALYZE {SCHEMA}.message;
+"""
+
+
+def old_encode(rows: list[asyncpg.Record]) -> bytes:
+    # What FastAPI did for `return [dict(row) for row in rows]`.
+    content = jsonable_encoder([dict(row) for row in rows])
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def summarize(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+    return f"median {statistics.median(samples) * 1000:9.2f} ms   p95 {p95 * 1000:9.2f} ms"
+
+
+async def timed(fn, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="keep the generated schema")
+    args = parser.parse_args()
+
+    load_dotenv()
+    url = os.environ["DB_URL"]
+    conn = await asyncpg.connect(url)
+    print(f"Generating {max(args.rows):,} messages in schema {SCHEMA}...")
+    await conn.execute(SETUP_SQL.replace("$ROWS", str(max(args.rows))))
+    await conn.close()
+
+    pool = await asyncpg.create_pool(url, server_settings={"search_path": f"{SCHEMA},public"})
+    try:
+        for n in args.rows:
+            rows = await pool.fetch(SELECT_SQL, n)
+            old_body, new_body = old_encode(rows), dumps(rows)
+            assert json.loads(old_body) == json.loads(new_body), "encodings differ"
+            print(f"\n{n:,} rows, {len(new_body) / 1e6:.1f} MB")
+
+            async def old_path():
+                old_encode(await pool.fetch(SELECT_SQL, n))
+
+            async def orjson_path():
+                dumps(await pool.fetch(SELECT_SQL, n))
+
+            async def json_agg_path():
+                (await pool.fetchval(JSON_AGG_SQL, n)).encode()
+
+            async def encode(fn):
+                fn(rows)
+
+            for name, request, encoder in (
+                ("old dict + jsonable_encoder", old_path, old_encode),
+                ("orjson from Records", orjson_path, dumps),
+                ("postgres json_agg", json_agg_path, None),
+            ):
+                print(f"  {name:<28} request {summarize(await timed(request, args.runs))}")
+                if encoder is not None:
+                    samples = await timed(lambda: encode(encoder), args.runs)
+                    print(f"  {'':<28} encode  {summarize(samples)}")
+    finally:
+        if not args.keep:
+            await pool.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
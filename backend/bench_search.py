@@ -0,0 +1,115 @@
+"""
+Benchmark the product search query against a generated catalog.
+
+Builds `product`/`supplier` tables in a scratch `search_bench` schema (the
+live tables are not touched), then times the old unindexed
+`SELECT * ... ILIKE` query against the ranked trigram query in search.py.
+
+    python bench_search.py                 # 1M products
+    python bench_search.py --rows 100000 --runs 50 --keep
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import asyncpg
+from dotenv import load_dotenv
+
+from search import SEARCH_WITH_SUPPLIER_SQL, like_pattern, search_cache, search_products
+
+SCHEMA = "search_bench"
+OLD_SQL = "SELECT * FROM product WHERE product_name ILIKE $1"
+QUERIES = ["espresso", "espreso machine", "grinder", "stainless kettle", "milk frother", "cof"]
+
+SETUP_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.supplier (
+    supplier_id TEXT PRIMARY KEY,
+    supplier_name TEXT NOT NULL,
+    insights TEXT
+);
+CREATE TABLE {SCHEMA}.product (
+    product_id TEXT PRIMARY KEY,
+    product_name TEXT NOT NULL,
+    supplier_id TEXT NOT NULL,
+    description TEXT
+);
+INSERT INTO {SCHEMA}.supplier
+SELECT 'sup-' || i, 'Supplier ' || i, repeat('insight ', 20)
+FROM generate_series(1, 1000) i;
+INSERT INTO {SCHEMA}.product
+SELECT
+    'prod-' || i,
+    (ARRAY['Espresso', 'Coffee', 'Milk', 'Stainless', 'Burr', 'Drip', 'Cold Brew', 'Ceramic'])[1 + i % 8]
+        || ' ' ||
+    (ARRAY['Machine', 'Grinder', 'Kettle', 'Frother', 'Filter', 'Mug', 'Scale', 'Tamper', 'Pitcher'])[1 + (i / 8) % 9]
+        || ' ' || md5(i::text)::varchar(6),
+    'sup-' || (1 + i % 1000),
+    repeat('description ', 30)
+FROM generate_series(1, $ROWS) i;
+CREATE INDEX ON {SCHEMA}.product USING gin (product_name gin_trgm_ops);
+ANALYZE {SCHEMA}.supplier;
+ANALYZE {SCHEMA}.product;
+"""
+
+
+def summarize(name: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) >= 20 else samples[-1]
+    return f"{name:<28} median {statistics.median(samples) * 1000:9.2f} ms   p95 {p95 * 1000:9.2f} ms"
+
+
+async def timed(fn, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="keep the generated schema")
+    args = parser.parse_args()
+
+    load_dotenv()
+    url = os.environ["DB_URL"]
+    conn = await asyncpg.connect(url)
+    print(f"Generating {args.rows:,} products in schema {SCHEMA}...")
+    await conn.execute(SETUP_SQL.replace("$ROWS", str(args.rows)))
+    await conn.close()
+
+    pool = await asyncpg.create_pool(url, server_settings={"search_path": f"{SCHEMA},public"})
+    try:
+        for query in QUERIES:
+            print(f"\nquery: {query!r}")
+            old = await timed(lambda: pool.fetch(OLD_SQL, f"%{query}%"), args.runs)
+            new = await timed(
+                lambda: pool.fetch(SEARCH_WITH_SUPPLIER_SQL, query, like_pattern(query), 50),
+                args.runs,
+            )
+            search_cache.clear()
+            cached = await timed(lambda: search_products(pool, query), args.runs)
+            print(summarize("old ILIKE SELECT *", old))
+            print(summarize("ranked trigram (uncached)", new))
+            print(summarize("ranked trigram (cached)", cached))
+            plan = await pool.fetch(
+                "EXPLAIN " + SEARCH_WITH_SUPPLIER_SQL, query, like_pattern(query), 50
+            )
+            print("\n".join(row[0] for row in plan))
+    finally:
+        if not args.keep:
+            await pool.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+"""
+Benchmark memory held by negotiation sessions.
+
+Creates 10k historical negotiations with their agent and supplier rows in a
+scratch `session_bench` schema (the live tables are not touched), then
+loads every one of them twice with tracemalloc running: into a plain dict,
+as `active_sessions` used to keep them, and through a bounded
+`SessionRegistry`. Reports resident sessions, traced bytes per session
+next to the registry's own estimate, and the cost of rehydrating an
+evicted session compared to a hit.
+
+    python bench_sessions.py
+    python bench_sessions.py --negotiations 10000 --suppliers 8 --max-sessions 500
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from dotenv import load_dotenv
+
+from catalog import CatalogCache
+from config import NEGOTIATOR_AGENT_SYSTEM_PROMPT, OCHESTRATOR_AGENT_SYSTEM_PROMPT
+from db import create_pool
+from offers import OfferLedger
+from router import NegotiationSession
+from sessions import SessionRegistry, session_size
+
+SCHEMA = "session_bench"
+
+SETUP_SQL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.negotiation (
+    ng_id UUID PRIMARY KEY,
+    product TEXT NOT NULL,
+    strategy TEXT,
+    status TEXT NOT NULL DEFAULT 'done'
+);
+CREATE TABLE {SCHEMA}.agent (
+    ng_id UUID NOT NULL,
+    sup_id TEXT NOT NULL,
+    sys_prompt TEXT,
+    role TEXT,
+    PRIMARY KEY (ng_id, sup_id)
+);
+CREATE TABLE {SCHEMA}.supplier (
+    supplier_id INT PRIMARY KEY,
+    supplier_name TEXT NOT NULL,
+    email TEXT,
+    insights TEXT
+);
+"""
+
+
+async def populate(pool, negotiations: int, suppliers: int) -> list[str]:
+    await pool.executemany(
+        "INSERT INTO supplier VALUES ($1, $2, $3, $4)",
+        [
+            (i, f"Supplier {i}", f"sales@supplier{i}.example", "Flexible on volume discounts.")
+            for i in range(1, 201)
+        ],
+    )
+    ng_ids = [str(uuid.uuid4()) for _ in range(negotiations)]
+    await pool.executemany(
+        "INSERT INTO negotiation (ng_id, product, strategy) VALUES ($1, $2, $3)",
+        [
+            (ng_id, f"Nitrile gloves, box of {100 + i % 50}", "Push for 10% below list price.")
+            for i, ng_id in enumerate(ng_ids)
+        ],
+    )
+    await pool.executemany(
+        "INSERT INTO agent VALUES ($1, $2, $3, 'negotiator')",
+        [
+            (ng_id, str((i * suppliers + j) % 200 + 1), NEGOTIATOR_AGENT_SYSTEM_PROMPT)
+            for i, ng_id in enumerate(ng_ids)
+            for j in range(suppliers)
+        ],
+    )
+    return ng_ids
+
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--negotiations", type=int, default=10_000)
+    parser.add_argument("--suppliers", type=int, default=5, help="agents per negotiation")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20, help="loads in flight")
+    parser.add_argument("--keep", action="store_true", help="keep the generated schema")
+    args = parser.parse_args()
+
+    load_dotenv()
+    pool = await create_pool(
+        os.environ["DB_URL"],
+        max_size=args.concurrency,
+        server_settings={"search_path": f"{SCHEMA},public"},
+    )
+    await pool.execute(SETUP_SQL)
+    # Shared by every session, as in TurnRunner; no model calls are made.
+    ledger = OfferLedger(None, pool)
+    catalog = CatalogCache(os.environ["DB_URL"])
+
+    async def load(ng_id: str) -> NegotiationSession | None:
+        return await NegotiationSession.load(
+            pool, None, ng_id, OCHESTRATOR_AGENT_SYSTEM_PROMPT, catalog, ledger=ledger
+        )
+
+    async def load_all(ng_ids: list[str], store) -> None:
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def one(ng_id: str) -> None:
+            async with slots:
+                await store(ng_id)
+
+        await asyncio.gather(*(one(ng_id) for ng_id in ng_ids))
+
+    try:
+        start = time.perf_counter()
+        ng_ids = await populate(pool, args.negotiations, args.suppliers)
+        print(
+            f"Created {len(ng_ids):,} negotiations with {args.suppliers} agents each "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        # Loaded after populating, from the scratch schema's supplier table.
+        await catalog.start(pool)
+
+        tracemalloc.start()
+        print(f"\n{'mode':<12} {'resident':>9} {'traced MB':>10} {'B/session':>10} {'estimate':>9}")
+
+        unbounded: dict[str, NegotiationSession] = {}
+
+        async def keep(ng_id: str) -> None:
+            unbounded[ng_id] = await load(ng_id)
+
+        baseline = traced()
+        await load_all(ng_ids, keep)
+        used = traced() - baseline
+        sample = list(unbounded.values())[:100]
+        estimate = sum(map(session_size, sample)) // len(sample)
+        print(
+            f"{'dict':<12} {len(unbounded):>9,} {used / 2**20:>10.1f} "
+            f"{used // len(unbounded):>10,} {estimate:>9,}"
+        )
+        for session in unbounded.values():
+            session.close()
+        unbounded.clear()
+
+        registry = SessionRegistry(max_sessions=args.max_sessions)
+        baseline = traced()
+        await load_all(ng_ids, lambda ng_id: registry.get_or_load(ng_id, load))
+        used = traced() - baseline
+        metrics = registry.metrics(sample=100)
+        print(
+            f"{'registry':<12} {len(registry):>9,} {used / 2**20:>10.1f} "
+            f"{used // max(len(registry), 1):>10,} {metrics['bytes_per_session']:>9,}"
+        )
+        tracemalloc.stop()
+        print(f"Evicted: {metrics['evicted']}, loads: {metrics['loads']:,}")
+
+        hits, reloads = [], []
+        for ng_id in ng_ids[-100:] + ng_ids[:100]:
+            resident = ng_id in registry
+            start = time.perf_counter()
+            await registry.get_or_load(ng_id, load)
+            (hits if resident else reloads).append(time.perf_counter() - start)
+        print(
+            f"\nResident lookup p50 {statistics.median(hits) * 1e6:.1f} us, "
+            f"rehydration after eviction p50 {statistics.median(reloads) * 1000:.2f} ms"
+        )
+    finally:
+        await catalog.stop()
+        if not args.keep:
+            await pool.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+from typing import Any
+
+import asyncpg
+import orjson
+
+from events import listen_forever
+
+CHANNEL = "catalog_changed"
+# Explicit projections, so columns added later are not shipped to clients
+# until they are listed here.
+CATALOG_SQL = {
+    "supplier": "SELECT supplier_id, supplier_name, email, insights FROM supplier"
+    " ORDER BY supplier_id",
+    "product": "SELECT product_id, product_name, supplier_id, description FROM product"
+    " ORDER BY product_id",
+}
+TABLES = tuple(CATALOG_SQL)
+
+
+class CatalogSnapshot:
+    """One table held in memory with its pre-encoded JSON body and ETag."""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.rows: list[dict[str, Any]] = orjson.loads(body)
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+
+
+class CatalogCache:
+    """
+    Suppliers and products served from memory.
+
+    Statement-level triggers on both tables (migrations/0005_catalog.sql)
+    NOTIFY `catalog_changed` with the table name; every API worker listens and
+    reloads just that table, so workers stay consistent without polling.
+    """
+
+    def __init__(self, database_url: str) -> None:
+        self.database_url = database_url
+        self.pool: asyncpg.Pool | None = None
+        self.snapshots: dict[str, CatalogSnapshot] = {}
+        self.suppliers_by_id: dict[str, dict[str, Any]] = {}
+        self.suppliers_by_name: dict[str, dict[str, Any]] = {}
+        self._stale: set[str] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        self._wakeup = asyncio.Event()
+        for table in TABLES:
+            await self._load(table)
+        self._tasks = [
+            asyncio.create_task(
+                listen_forever(
+                    self.database_url,
+                    {CHANNEL: self._invalidate},
+                    on_connect=self._on_connect,
+                )
+            ),
+            asyncio.create_task(self._reload()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _invalidate(self, table: str) -> None:
+        if table in TABLES:
+            self._stale.add(table)
+            self._wakeup.set()
+
+    def _on_connect(self) -> None:
+        # Changes made while nobody was listening would be missed otherwise.
+        for table in TABLES:
+            self._invalidate(table)
+
+    async def _reload(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._stale:
+                table = self._stale.pop()
+                try:
+                    await self._load(table)
+                except (OSError, asyncpg.PostgresError) as e:
+                    print(f"Reloading {table} catalog failed: {e}")
+                    self._stale.add(table)
+                    await asyncio.sleep(2.0)
+
+    async def _load(self, table: str) -> None:
+        # Postgres encodes the whole table in one json_agg, so the body is
+        # served as-is and Python only parses it for the lookup maps.
+        body = await self.pool.fetchval(
+            f"SELECT COALESCE(json_agg(t), '[]')::text FROM ({CATALOG_SQL[table]}) t"
+        )
+        snapshot = CatalogSnapshot(body.encode())
+        self.snapshots[table] = snapshot
+        if table == "supplier":
+            self.suppliers_by_id = {str(row["supplier_id"]): row for row in snapshot.rows}
+            self.suppliers_by_name = {row["supplier_name"]: row for row in snapshot.rows}
+
+    def snapshot(self, table: str) -> CatalogSnapshot:
+        return self.snapshots[table]
+
+    def supplier(self, key: str) -> dict[str, Any] | None:
+        """Look a supplier up by id, falling back to its name."""
+        return self.suppliers_by_id.get(key) or self.suppliers_by_name.get(key)
@@ -0,0 +1,131 @@
+import os
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+
+from admission import AdmissionLimits
+from db import DatabasePool, create_pool
+from llm import LLMGateway
+from response_cache import ResponseCache
+from scheduler import LLMScheduler
+
+load_dotenv()
+
+DATABASE_URL = os.environ["DB_URL"]
+AWS_REGION = os.environ.get("AWS_REGION", "eu-west-1")
+FRONTEND_ORIGINS = os.environ.get("FRONTEND_ORIGINS", "")
+BEDROCK_MAX_WORKERS = int(os.environ.get("BEDROCK_MAX_WORKERS", "32"))
+BEDROCK_TIMEOUT = float(os.environ.get("BEDROCK_TIMEOUT", "60"))
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get("BEDROCK_MAX_CONCURRENCY", "16"))
+BEDROCK_RPM = float(os.environ.get("BEDROCK_RPM", "120"))
+BEDROCK_TPM = float(os.environ.get("BEDROCK_TPM", "200000"))
+BEDROCK_ENDPOINT_URL = os.environ.get("BEDROCK_ENDPOINT_URL") or None
+# Response cache: "off", "on" (temperature 0 calls only) or "force" (all calls).
+LLM_CACHE = os.environ.get("LLM_CACHE", "off").lower()
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+# asyncpg pool per process (see db.py). Requests wait at most
+# DB_ACQUIRE_TIMEOUT seconds for a connection before failing with 503.
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "20"))
+DB_ACQUIRE_TIMEOUT = float(os.environ.get("DB_ACQUIRE_TIMEOUT", "10"))
+DB_MAX_INACTIVE_LIFETIME = float(os.environ.get("DB_MAX_INACTIVE_LIFETIME", "300"))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+# Apply pending migrations/ when the API starts (see migrate.py).
+MIGRATE_ON_STARTUP = os.environ.get("MIGRATE_ON_STARTUP", "1") != "0"
+# Agent turns the API process runs itself; 0 leaves them all to worker.py.
+EMBEDDED_WORKER_CONCURRENCY = int(os.environ.get("EMBEDDED_WORKER_CONCURRENCY", "4"))
+# Negotiation sessions kept in memory per process (see sessions.py).
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "1000"))
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "1800"))
+# Admission control (see admission.py); 0 disables a limit, and all are off
+# by default.
+ADMISSION_LIMITS = AdmissionLimits(
+    max_active_negotiations=int(os.environ.get("MAX_ACTIVE_NEGOTIATIONS", "0")),
+    tenant_max_active_negotiations=int(os.environ.get("TENANT_MAX_ACTIVE_NEGOTIATIONS", "0")),
+    max_pending_turns=int(os.environ.get("MAX_PENDING_TURNS", "0")),
+    tenant_max_pending_turns=int(os.environ.get("TENANT_MAX_PENDING_TURNS", "0")),
+    tenant_max_running_turns=int(os.environ.get("TENANT_MAX_RUNNING_TURNS", "0")),
+    outbox_high_water=float(os.environ.get("OUTBOX_HIGH_WATER", "0")),
+)
+# "key:tenant,key:tenant". Callers send their key in X-API-Key and are
+# counted against that tenant's limits; unset, everyone is one tenant.
+TENANT_API_KEYS = dict(
+    entry.strip().split(":", 1)
+    for entry in os.environ.get("TENANT_API_KEYS", "").split(",")
+    if entry.strip()
+)
+# Bulk exports (see export.py) read from a replica when one is configured.
+EXPORT_DATABASE_URL = os.environ.get("EXPORT_DATABASE_URL") or DATABASE_URL
+EXPORT_MAX_CONCURRENT = int(os.environ.get("EXPORT_MAX_CONCURRENT", "2"))
+# Waiting model calls beyond which orchestrator advice is reused, not refreshed.
+LLM_DEFER_DEPTH = int(os.environ.get("LLM_DEFER_DEPTH", str(2 * BEDROCK_MAX_CONCURRENCY)))
+EMAIL_ADDRESS = os.environ.get("EMAIL_ADDRESS") or None
+EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD") or None
+
+NEGOTIATOR_AGENT_SYSTEM_PROMPT = """
+You are a skilled negotation agent representing a buyer in a procurment process. Your goal is to win the best possible deal for the
+the company. While your are negotiating an Supervisor agent is monetoring your progress and giving you new
+instructions every new step of the negotiation. Follow their instructions carefully and adapt your strategy accordingly
+Further instructions might be provided following this. Make sure to follow them closely.
+"""
+
+OCHESTRATOR_AGENT_SYSTEM_PROMPT = """
+Your are a negotiationg orchestration agent. The company you are are working for is looking to procure a product. Your goal is to
+be a consultant to other agents each responsible for one particular supplier of that product.
+You will have to follow the main instructions given to you and when asked to reflect them also in the advice you
+give to the other agents.
+Make sure to gain understanding of the overall negotiation progress and give strategic advice to the other agents when asked.
+You might want to give them information about the progress of other agents as well as additional instructions. Use this to guide
+their behavior and if requested by the user make smart decisions on how to reduce to overall price of the product through clever
+negotiation tactics advice to the other agents, which might include the recommendation to present the supplier with a
+competing offer from another supplier that your agents are alo negotiating with.
+"""
+
+
+async def create_db_pool(
+    min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE
+) -> DatabasePool:
+    return await create_pool(
+        DATABASE_URL,
+        min_size=min(min_size, max_size),
+        max_size=max_size,
+        acquire_timeout=DB_ACQUIRE_TIMEOUT,
+        max_inactive_lifetime=DB_MAX_INACTIVE_LIFETIME,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+    )
+
+
+def build_llm() -> LLMGateway:
+    # botocore's connection pool defaults to 10, size it to match the gateway's
+    # worker threads so concurrent calls don't queue inside the client. Retries
+    # are left to the scheduler so throttled calls give up their slot.
+    bedrock_client = boto3.client(
+        "bedrock-runtime",
+        region_name=AWS_REGION,
+        endpoint_url=BEDROCK_ENDPOINT_URL,
+        config=Config(
+            max_pool_connections=BEDROCK_MAX_WORKERS,
+            read_timeout=BEDROCK_TIMEOUT,
+            retries={"mode": "standard", "max_attempts": 1},
+        ),
+    )
+    scheduler = LLMScheduler(
+        max_concurrency=BEDROCK_MAX_CONCURRENCY,
+        requests_per_minute=BEDROCK_RPM,
+        tokens_per_minute=BEDROCK_TPM,
+        defer_depth=LLM_DEFER_DEPTH,
+    )
+    cache = None
+    if LLM_CACHE in ("on", "force"):
+        cache = ResponseCache(
+            maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, force=LLM_CACHE == "force"
+        )
+    return LLMGateway(
+        bedrock_client,
+        max_workers=BEDROCK_MAX_WORKERS,
+        timeout=BEDROCK_TIMEOUT,
+        scheduler=scheduler,
+        cache=cache,
+    )
@@ -0,0 +1,210 @@
+import json
+import os
+import re
+from typing import Any
+
+import asyncpg
+
+import db
+from llm import LLMGateway, estimate_tokens
+from patterns import PRICE_PATTERN
+
+CONTEXT_RECENT_TURNS = int(os.environ.get("CONTEXT_RECENT_TURNS", "12"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "6000"))
+
+# message.role values as stored in the database, mapped to chat roles from
+# the negotiator's point of view.
+CHAT_ROLES = {"negotiator": "assistant", "supplier": "user"}
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain the running summary of a procurement email thread between our "
+    "negotiator and a supplier. Keep every commitment, open question, price, "
+    "quantity, lead time and condition that is still relevant. Be concise."
+)
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+CONTEXT_STATE = db.Query(
+    "context_state",
+    """
+    SELECT context_summary, context_offers, summarized_at, summarized_id
+    FROM agent
+    WHERE ng_id = $1 AND sup_id = $2
+    """,
+    timeout=5,
+)
+HISTORY = db.Query(
+    "context_history",
+    """
+    SELECT message_id, role, content, created_at FROM message
+    WHERE ng_id = $1 AND supplier_id = $2
+    ORDER BY created_at, message_id
+    """,
+    timeout=5,
+)
+HISTORY_AFTER = db.Query(
+    "context_history_after",
+    """
+    SELECT message_id, role, content, created_at FROM message
+    WHERE ng_id = $1 AND supplier_id = $2
+      AND (created_at, message_id) > ($3, $4)
+    ORDER BY created_at, message_id
+    """,
+    timeout=5,
+)
+# Only advances if nobody else folded past the same point meanwhile.
+SAVE_FOLD = db.Query(
+    "context_fold",
+    """
+    UPDATE agent SET context_summary = $3, context_offers = $4::jsonb,
+                     summarized_at = $5, summarized_id = $6
+    WHERE ng_id = $1 AND sup_id = $2
+      AND summarized_at IS NOT DISTINCT FROM $7
+      AND summarized_id IS NOT DISTINCT FROM $8
+    """,
+    timeout=5,
+)
+
+
+def offer_sentences(content: str, limit: int = 3) -> list[str]:
+    """The sentences of an email that quote a price."""
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(content)]
+    return [s[:300] for s in sentences if PRICE_PATTERN.search(s)][:limit]
+
+
+class ConversationContext:
+    """
+    Builds the model input for one supplier thread within a token budget.
+
+    The last `recent_turns` messages are sent verbatim. Older messages are
+    folded into a summary and a list of quoted offers stored on the agent
+    row, so each turn reads O(recent_turns) messages and the summary is only
+    extended when `fold_batch` more messages have aged out.
+    """
+
+    __slots__ = (
+        "client",
+        "db_pool",
+        "ng_id",
+        "sup_id",
+        "recent_turns",
+        "fold_batch",
+        "token_budget",
+        "summary_tokens",
+        "max_offers",
+    )
+
+    def __init__(
+        self,
+        client: LLMGateway,
+        db_pool: asyncpg.Pool,
+        ng_id: str,
+        sup_id: str,
+        recent_turns: int = CONTEXT_RECENT_TURNS,
+        fold_batch: int = 6,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        summary_tokens: int = 400,
+        max_offers: int = 12,
+    ) -> None:
+        self.client = client
+        self.db_pool = db_pool
+        self.ng_id = ng_id
+        self.sup_id = sup_id
+        self.recent_turns = recent_turns
+        self.fold_batch = fold_batch
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_offers = max_offers
+
+    async def _state(self) -> asyncpg.Record | None:
+        return await db.fetchrow(self.db_pool, CONTEXT_STATE, self.ng_id, self.sup_id)
+
+    async def _unsummarized(self, state: asyncpg.Record | None) -> list[asyncpg.Record]:
+        if state is None or state["summarized_at"] is None:
+            return await db.fetch(self.db_pool, HISTORY, self.ng_id, self.sup_id)
+        return await db.fetch(
+            self.db_pool,
+            HISTORY_AFTER,
+            self.ng_id,
+            self.sup_id,
+            state["summarized_at"],
+            state["summarized_id"],
+        )
+
+    async def _fold(
+        self, state: asyncpg.Record | None, old: list[asyncpg.Record]
+    ) -> tuple[str, list[dict[str, Any]]] | None:
+        """Extend the stored summary with `old`; None if the model call failed."""
+        summary = (state and state["context_summary"]) or ""
+        offers = json.loads(state["context_offers"]) if state and state["context_offers"] else []
+
+        transcript = "\n\n".join(f"[{m['role']}] {m['content']}" for m in old)
+        prompt = (
+            f"Summary so far:\n{summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            "Return the updated summary only."
+        )
+        try:
+            summary = await self.client.complete(
+                prompt,
+                SUMMARY_SYSTEM_PROMPT,
+                max_tokens=self.summary_tokens,
+                temperature=0.0,
+                lane="background",
+            )
+        except Exception as e:
+            print(f"Summarizing {self.sup_id} in {self.ng_id} failed: {e}")
+            return None
+
+        for m in old:
+            for sentence in offer_sentences(m["content"]):
+                offers.append(
+                    {"role": m["role"], "at": m["created_at"].isoformat(), "text": sentence}
+                )
+        offers = offers[-self.max_offers :]
+
+        last = old[-1]
+        await db.execute(
+            self.db_pool,
+            SAVE_FOLD,
+            self.ng_id,
+            self.sup_id,
+            summary.strip(),
+            json.dumps(offers),
+            last["created_at"],
+            last["message_id"],
+            state["summarized_at"] if state else None,
+            state["summarized_id"] if state else None,
+        )
+        return summary.strip(), offers
+
+    async def build(self, system_prompt: str, max_tokens: int = 1024) -> list[dict[str, str]]:
+        """System prompt, folded history and recent turns, trimmed to the budget."""
+        state = await self._state()
+        summary = (state and state["context_summary"]) or ""
+        offers = json.loads(state["context_offers"]) if state and state["context_offers"] else []
+        recent = await self._unsummarized(state)
+
+        if len(recent) > self.recent_turns + self.fold_batch:
+            cut = len(recent) - self.recent_turns
+            folded = await self._fold(state, recent[:cut])
+            if folded is not None:
+                summary, offers = folded
+                recent = recent[cut:]
+
+        system = system_prompt
+        if summary:
+            system += f"\nEarlier in this thread (summary):\n{summary}\n"
+        if offers:
+            system += "Offers quoted earlier:\n" + "".join(
+                f"- {o['role']} ({o['at'][:10]}): {o['text']}\n" for o in offers
+            )
+        messages = [{"role": "system", "content": system}]
+        turns = [
+            {"role": CHAT_ROLES.get(m["role"], "user"), "content": m["content"]} for m in recent
+        ]
+
+        # Drop the oldest verbatim turns until the call fits, keeping the last.
+        while len(turns) > 1 and estimate_tokens(messages + turns, max_tokens) > self.token_budget:
+            turns.pop(0)
+        return messages + turns
@@ -0,0 +1,335 @@
+import asyncio
+import itertools
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+from telemetry import DB_POOL_WAIT, DB_QUERIES, fail, tracer
+
+# A prepared statement outlived the schema it was planned against (e.g. a
+# migration altered a table it reads), or the server no longer has it.
+STALE_STATEMENT_ERRORS = (
+    asyncpg.exceptions.InvalidCachedStatementError,
+    asyncpg.exceptions.OutdatedSchemaCacheError,
+    asyncpg.exceptions.InvalidSQLStatementNameError,
+)
+
+
+@dataclass(frozen=True)
+class Query:
+    """
+    A hot query, prepared once per connection as a named statement.
+
+    `timeout` bounds each execution in seconds; on expiry asyncpg cancels
+    the statement on the server and `QueryTimeoutError` is raised.
+    """
+
+    name: str
+    sql: str
+    timeout: float | None = None
+
+    def __post_init__(self) -> None:
+        _query_names[self.sql] = self.name
+
+
+# SQL text of every named query; `_run` times those itself, so the query
+# logger only labels what is left as ad-hoc.
+_query_names: dict[str, str] = {}
+
+
+# Both timeouts subclass TimeoutError, and so OSError, so callers that
+# already treat connection trouble as transient handle them the same way.
+class QueryTimeoutError(TimeoutError):
+    def __init__(self, name: str, timeout: float | None) -> None:
+        super().__init__(f"Query {name} exceeded {timeout}s")
+        self.name = name
+        self.timeout = timeout
+
+
+class PoolTimeoutError(TimeoutError):
+    """No connection became free within the acquire timeout."""
+
+
+class PoolStats:
+    def __init__(self, window: int = 1000) -> None:
+        self.acquired = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits: deque[float] = deque(maxlen=window)
+
+    def observe(self, wait: float) -> None:
+        self.acquired += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.recent_waits.append(wait)
+
+    def as_dict(self) -> dict[str, Any]:
+        waits = sorted(self.recent_waits)
+
+        def percentile(p: float) -> float:
+            return waits[min(len(waits) - 1, int(p * len(waits)))] if waits else 0.0
+
+        return {
+            "acquired": self.acquired,
+            "waiting": self.waiting,
+            "acquire_timeouts": self.timeouts,
+            "wait_avg_s": self.wait_total / self.acquired if self.acquired else 0.0,
+            "wait_p50_s": percentile(0.50),
+            "wait_p95_s": percentile(0.95),
+            "wait_p99_s": percentile(0.99),
+            "wait_max_s": self.wait_max,
+        }
+
+
+class StatementStats:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.query_time = 0.0
+        self.prepared = 0
+        self.reprepared = 0
+        self.timeouts: Counter[str] = Counter()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "query_time_s": self.query_time,
+            "statements_prepared": self.prepared,
+            "statements_reprepared": self.reprepared,
+            "query_timeouts": dict(self.timeouts),
+        }
+
+
+class DatabasePool:
+    """
+    asyncpg pool that records how long callers wait for a connection.
+
+    Wraps an `asyncpg.Pool` through its public API only. Every acquisition,
+    including the ones behind `pool.fetch()` and friends, goes through
+    `acquire`, so the wait metrics cover all callers without changing how
+    they use the pool. Waits beyond `acquire_timeout` raise
+    `PoolTimeoutError` instead of queueing indefinitely.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, acquire_timeout: float | None = None) -> None:
+        self.pool = pool
+        self.acquire_timeout = acquire_timeout
+        self.stats = PoolStats()
+
+    def acquire(self, timeout: float | None = None) -> "_Acquire":
+        """`async with pool.acquire() as conn`, or `conn = await pool.acquire()` plus `release`."""
+        return _Acquire(self, timeout)
+
+    async def _acquire(self, timeout: float | None) -> asyncpg.Connection:
+        if timeout is None:
+            timeout = self.acquire_timeout
+        self.stats.waiting += 1
+        start = time.monotonic()
+        try:
+            conn = await self.pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise PoolTimeoutError(f"No database connection free after {timeout}s") from None
+        finally:
+            self.stats.waiting -= 1
+        wait = time.monotonic() - start
+        self.stats.observe(wait)
+        DB_POOL_WAIT.observe(wait)
+        return conn
+
+    async def release(self, conn: asyncpg.Connection) -> None:
+        await self.pool.release(conn)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def executemany(
+        self, command: str, args: Any, *, timeout: float | None = None
+    ) -> None:
+        async with self.acquire() as conn:
+            await conn.executemany(command, args, timeout=timeout)
+
+    async def fetch(
+        self, query: str, *args: Any, timeout: float | None = None
+    ) -> list[asyncpg.Record]:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(
+        self, query: str, *args: Any, timeout: float | None = None
+    ) -> asyncpg.Record | None:
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(
+        self, query: str, *args: Any, column: int = 0, timeout: float | None = None
+    ) -> Any:
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+    def get_size(self) -> int:
+        return self.pool.get_size()
+
+    def get_idle_size(self) -> int:
+        return self.pool.get_idle_size()
+
+    def get_min_size(self) -> int:
+        return self.pool.get_min_size()
+
+    def get_max_size(self) -> int:
+        return self.pool.get_max_size()
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "size": self.get_size(),
+            "idle": self.get_idle_size(),
+            "min_size": self.get_min_size(),
+            "max_size": self.get_max_size(),
+            **self.stats.as_dict(),
+            **statement_stats.as_dict(),
+        }
+
+
+class _Acquire:
+    def __init__(self, pool: DatabasePool, timeout: float | None) -> None:
+        self.pool = pool
+        self.timeout = timeout
+        self.conn: asyncpg.Connection | None = None
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self.conn = await self.pool._acquire(self.timeout)
+        return self.conn
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.pool.release(self.conn)
+
+    def __await__(self):
+        return self.pool._acquire(self.timeout).__await__()
+
+
+# Named statements per server connection, keyed by backend pid. Entries are
+# dropped when the connection closes, so a reused pid never sees them.
+_statements: dict[int, dict[str, PreparedStatement]] = {}
+_generation = itertools.count(1)
+statement_stats = StatementStats()
+
+
+def _forget(conn: asyncpg.Connection) -> None:
+    _statements.pop(conn.get_server_pid(), None)
+
+
+def _log_query(query: Any) -> None:
+    statement_stats.queries += 1
+    statement_stats.query_time += query.elapsed
+    if query.query not in _query_names:
+        DB_QUERIES.labels("other").observe(query.elapsed)
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    _forget(conn)
+    conn.add_termination_listener(_forget)
+    # Counts every query on pooled connections, prepared or not; the load
+    # test divides the total by the turns run.
+    conn.add_query_logger(_log_query)
+
+
+async def create_pool(
+    dsn: str,
+    min_size: int = 2,
+    max_size: int = 10,
+    acquire_timeout: float | None = 10.0,
+    command_timeout: float | None = None,
+    max_inactive_lifetime: float = 300.0,
+    statement_cache_size: int = 100,
+    **connect_kwargs: Any,
+) -> DatabasePool:
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=min_size,
+        max_size=max_size,
+        max_queries=50_000,
+        max_inactive_connection_lifetime=max_inactive_lifetime,
+        init=init_connection,
+        command_timeout=command_timeout,
+        statement_cache_size=statement_cache_size,
+        **connect_kwargs,
+    )
+    return DatabasePool(pool, acquire_timeout=acquire_timeout)
+
+
+async def _statement(conn: asyncpg.Connection, query: Query) -> PreparedStatement:
+    statements = _statements.setdefault(conn.get_server_pid(), {})
+    statement = statements.get(query.name)
+    if statement is None:
+        # A fresh name per preparation, since a statement that went stale
+        # may still be allocated on the server under the old one.
+        statement = await conn.prepare(
+            query.sql, name=f"{query.name}_{next(_generation)}", timeout=query.timeout
+        )
+        statements[query.name] = statement
+        statement_stats.prepared += 1
+    return statement
+
+
+async def _run(
+    db: DatabasePool | asyncpg.Pool | asyncpg.Connection, query: Query, method: str, args: tuple
+) -> Any:
+    if isinstance(db, (DatabasePool, asyncpg.Pool)):
+        async with db.acquire() as conn:
+            return await _run(conn, query, method, args)
+
+    with tracer.start_as_current_span(f"db {query.name}") as span:
+        for attempt in range(2):
+            statement = await _statement(db, query)
+            start = time.perf_counter()
+            try:
+                result = await getattr(statement, method)(*args, timeout=query.timeout)
+            except STALE_STATEMENT_ERRORS:
+                _statements[db.get_server_pid()].pop(query.name, None)
+                # Inside a transaction the error has already aborted it; the
+                # caller retries the whole transaction, not just this statement.
+                if attempt or db.is_in_transaction():
+                    raise
+                statement_stats.reprepared += 1
+            except asyncio.TimeoutError:
+                statement_stats.timeouts[query.name] += 1
+                error = QueryTimeoutError(query.name, query.timeout)
+                fail(span, error)
+                raise error from None
+            else:
+                DB_QUERIES.labels(query.name).observe(time.perf_counter() - start)
+                return result
+
+
+async def fetch(
+    db: DatabasePool | asyncpg.Pool | asyncpg.Connection, query: Query, *args: Any
+) -> list[asyncpg.Record]:
+    return await _run(db, query, "fetch", args)
+
+
+async def fetchrow(
+    db: DatabasePool | asyncpg.Pool | asyncpg.Connection, query: Query, *args: Any
+) -> asyncpg.Record | None:
+    return await _run(db, query, "fetchrow", args)
+
+
+async def fetchval(
+    db: DatabasePool | asyncpg.Pool | asyncpg.Connection, query: Query, *args: Any
+) -> Any:
+    return await _run(db, query, "fetchval", args)
+
+
+async def execute(
+    db: DatabasePool | asyncpg.Pool | asyncpg.Connection, query: Query, *args: Any
+) -> None:
+    """Run a statement for its effect; prepared statements have no `execute`."""
+    await _run(db, query, "fetch", args)
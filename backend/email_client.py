@@ -0,0 +1,105 @@
+import os
+from email.message import EmailMessage
+from email.utils import make_msgid
+from typing import Any
+
+import aioimaplib
+import asyncpg
+
+from outbox import Outbox, SmtpConnectionPool
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", "4"))
+SMTP_PER_DOMAIN = int(os.environ.get("SMTP_PER_DOMAIN", "2"))
+SMTP_QUEUE_SIZE = int(os.environ.get("SMTP_QUEUE_SIZE", "1000"))
+# Both off for local stand-ins such as aiosmtpd.
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") != "0"
+SMTP_AUTH = os.environ.get("SMTP_AUTH", "1") != "0"
+IMAP_HOST = os.environ.get("IMAP_HOST", "imap.gmail.com")
+IMAP_PORT = int(os.environ.get("IMAP_PORT", "993"))
+# Plain IMAP for local stand-in servers.
+IMAP_SSL = os.environ.get("IMAP_SSL", "1") != "0"
+IMAP_MAILBOX = os.environ.get("IMAP_MAILBOX", "INBOX")
+
+
+class EmailClient:
+    def __init__(
+        self,
+        email: str | None = None,
+        password: str | None = None,
+        db_pool: asyncpg.Pool | None = None,
+    ) -> None:
+        self.email = email
+        self.password = password
+        self.db_pool = db_pool
+        self.outbox: Outbox | None = None
+
+    def attach(self, db_pool: asyncpg.Pool) -> None:
+        """Record delivery status on message rows once the pool exists."""
+        self.db_pool = db_pool
+        if self.outbox is not None:
+            self.outbox.db_pool = db_pool
+
+    def _start_outbox(self) -> Outbox:
+        smtp = SmtpConnectionPool(
+            SMTP_HOST,
+            SMTP_PORT,
+            username=self.email if SMTP_AUTH else None,
+            password=self.password if SMTP_AUTH else None,
+            size=SMTP_POOL_SIZE,
+            start_tls=SMTP_STARTTLS,
+        )
+        self.outbox = Outbox(
+            smtp, self.db_pool, queue_size=SMTP_QUEUE_SIZE, per_domain=SMTP_PER_DOMAIN
+        )
+        self.outbox.start()
+        return self.outbox
+
+    async def close(self) -> None:
+        if self.outbox is not None:
+            await self.outbox.stop()
+            self.outbox = None
+
+    async def email_login(self, email: str, password: str) -> None:
+        """Check the credentials against the IMAP server and keep them."""
+        if IMAP_SSL:
+            imap = aioimaplib.IMAP4_SSL(host=IMAP_HOST, port=IMAP_PORT)
+        else:
+            imap = aioimaplib.IMAP4(host=IMAP_HOST, port=IMAP_PORT)
+        await imap.wait_hello_from_server()
+        response = await imap.login(email, password)
+        await imap.logout()
+        if response.result != "OK":
+            raise ValueError("Invalid email credentials")
+        # Connections of the old account are not reused.
+        await self.close()
+        self.email = email
+        self.password = password
+
+    async def email_send(
+        self, to_email: str, subject: str, body: str, row_id: str | None = None
+    ) -> str:
+        """
+        Queue one email and return its Message-ID.
+
+        Delivery happens in the background over pooled SMTP connections; when
+        `row_id` names the message row the email was drafted from, its
+        delivery status is kept there.
+        """
+        if not self.email:
+            raise RuntimeError("Email client is not logged in")
+
+        message = EmailMessage()
+        message["From"] = self.email
+        message["To"] = to_email
+        message["Subject"] = subject
+        message["Message-ID"] = make_msgid()
+        message.set_content(body)
+
+        outbox = self.outbox or self._start_outbox()
+        await outbox.put(message, row_id)
+        return message["Message-ID"]
+
+    def metrics(self) -> dict[str, Any]:
+        return self.outbox.metrics() if self.outbox else {}
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import asyncpg
+
+import db
+
+CHANNEL = "negotiation_events"
+BATCH_SIZE = 500
+# Event ids are assigned at insert but become visible at commit, so a
+# transaction that commits late leaves a gap below ids already read. Gaps are
+# re-read until filled or, as ids skipped by rollbacks never are, until they
+# are this old; at most MAX_GAPS are tracked.
+GAP_TIMEOUT = 60.0
+MAX_GAPS = 10_000
+
+DRAIN_QUERY = db.Query(
+    "events_drain",
+    """
+    SELECT event_id, ng_id, type, payload FROM negotiation_event
+    WHERE event_id > $1 OR event_id = ANY($3::bigint[])
+    ORDER BY event_id LIMIT $2
+    """,
+    timeout=10,
+)
+REPLAY_QUERY = db.Query(
+    "events_replay",
+    """
+    SELECT event_id, ng_id, type, payload FROM negotiation_event
+    WHERE ng_id = $1 AND event_id > $2 ORDER BY event_id LIMIT $3
+    """,
+    timeout=10,
+)
+
+
+async def listen_forever(
+    database_url: str,
+    handlers: dict[str, Callable[[str], None]],
+    on_connect: Callable[[], None],
+    reconnect_delay: float = 2.0,
+) -> None:
+    """
+    Hold a dedicated LISTEN connection, reconnecting whenever it drops.
+
+    `handlers` maps channel names to callbacks taking the NOTIFY payload.
+    `on_connect` runs after every (re)connect so callers can catch up on
+    notifications sent while nobody was listening.
+    """
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(database_url)
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            for channel, handler in handlers.items():
+                await conn.add_listener(
+                    channel, lambda _c, _p, _ch, payload, handler=handler: handler(payload)
+                )
+            on_connect()
+            await closed.wait()
+        except Exception as e:
+            # Anything short of cancellation, including asyncpg's
+            # InterfaceError on a dropped connection, means reconnect: the
+            # SSE bus, job wakeups and catalog invalidation all hang off this.
+            print(f"LISTEN connection failed: {e!r}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                conn.terminate()
+        await asyncio.sleep(reconnect_delay)
+
+
+class NegotiationEventBus:
+    """
+    Pushes message-created and status-changed events to subscribers.
+
+    Events are written to `negotiation_event` by database triggers (see
+    migrations/0002_negotiation_events.sql), so every writer and every API
+    worker sees the same stream. Each worker holds one LISTEN connection; a NOTIFY only wakes
+    it up, and it then reads everything past the last event id it has seen,
+    plus any lower ids still missing (see GAP_TIMEOUT). That one read per
+    event is shared by all watchers of the process, and it also catches up on
+    anything missed while the listen connection was down. Events can
+    therefore reach subscribers out of id order.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        retention_hours: float = 24,
+        reconnect_delay: float = 2.0,
+    ) -> None:
+        self.database_url = database_url
+        self.retention_hours = retention_hours
+        self.reconnect_delay = reconnect_delay
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+        # Called for every event before it reaches subscribers.
+        self.on_event: Callable[[str, dict[str, Any]], None] | None = None
+        self.last_id = 0
+        # Unseen ids below last_id, with when they were first missed.
+        self.gaps: dict[int, float] = {}
+        self.pool: asyncpg.Pool | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._pruned_at = 0.0
+
+    async def start(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        self._wakeup = asyncio.Event()
+        self.last_id = await pool.fetchval(
+            "SELECT COALESCE(MAX(event_id), 0) FROM negotiation_event"
+        )
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._drain()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _listen(self) -> None:
+        await listen_forever(
+            self.database_url,
+            {CHANNEL: lambda _: self._wakeup.set()},
+            # Pick up whatever was written while we were not listening.
+            on_connect=self._wakeup.set,
+            reconnect_delay=self.reconnect_delay,
+        )
+
+    async def _drain(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                while True:
+                    self._expire_gaps()
+                    rows = await db.fetch(
+                        self.pool,
+                        DRAIN_QUERY,
+                        self.last_id,
+                        BATCH_SIZE,
+                        list(self.gaps),
+                    )
+                    for row in rows:
+                        self._advance(row["event_id"])
+                        self.publish(str(row["ng_id"]), self._event(row))
+                    if len(rows) < BATCH_SIZE:
+                        break
+                await self._prune()
+            except Exception as e:
+                print(f"Reading negotiation events failed: {e!r}")
+                await asyncio.sleep(self.reconnect_delay)
+                self._wakeup.set()
+
+    def _advance(self, event_id: int) -> None:
+        if self.gaps.pop(event_id, None) is not None or event_id <= self.last_id:
+            return
+        now = time.monotonic()
+        for missing in range(max(self.last_id + 1, event_id - MAX_GAPS), event_id):
+            self.gaps[missing] = now
+        self.last_id = event_id
+
+    def _expire_gaps(self) -> None:
+        cutoff = time.monotonic() - GAP_TIMEOUT
+        # Insertion order is oldest first.
+        for event_id, missed_at in list(self.gaps.items()):
+            if missed_at > cutoff and len(self.gaps) <= MAX_GAPS:
+                break
+            del self.gaps[event_id]
+
+    async def _prune(self) -> None:
+        if time.monotonic() - self._pruned_at < 3600:
+            return
+        self._pruned_at = time.monotonic()
+        await self.pool.execute(
+            "DELETE FROM negotiation_event WHERE created_at < NOW() - make_interval(hours => $1)",
+            self.retention_hours,
+        )
+
+    @staticmethod
+    def _event(row: asyncpg.Record) -> dict[str, Any]:
+        return {
+            "id": row["event_id"],
+            "type": row["type"],
+            "data": json.loads(row["payload"]),
+        }
+
+    def publish(self, ng_id: str, event: dict[str, Any]) -> None:
+        if self.on_event:
+            self.on_event(ng_id, event)
+        for queue in self.subscribers.get(ng_id, ()):
+            queue.put_nowait(event)
+
+    async def subscribe(
+        self, ng_id: str, after: int | None = None, keepalive: float = 15.0
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        """
+        Yield events for one negotiation, or None every `keepalive` seconds
+        of silence. With `after`, stored events past that id are replayed
+        first, a page at a time, so a reconnecting client misses nothing.
+        Delivery is at least once: a late event can arrive after higher ids,
+        so a client resuming from its last id may see some events again.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(ng_id, set()).add(queue)
+        # Only events not yet published when we subscribed can arrive both
+        # from the replay and from the queue.
+        published_through, pending = self.last_id, set(self.gaps)
+        replayed: set[int] = set()
+        try:
+            cursor = after
+            while cursor is not None:
+                rows = await db.fetch(self.pool, REPLAY_QUERY, ng_id, cursor, BATCH_SIZE)
+                for row in rows:
+                    event_id = row["event_id"]
+                    if event_id > published_through or event_id in pending:
+                        replayed.add(event_id)
+                    yield self._event(row)
+                cursor = rows[-1]["event_id"] if len(rows) == BATCH_SIZE else None
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] in replayed:
+                    replayed.discard(event["id"])
+                    continue
+                yield event
+        finally:
+            self.subscribers[ng_id].discard(queue)
+            if not self.subscribers[ng_id]:
+                del self.subscribers[ng_id]
@@ -0,0 +1,497 @@
+"""
+Streaming export of negotiations, their messages and their offers.
+
+Rows are read through a server-side cursor in batches and encoded batch by
+batch, so memory stays bounded however large the export. Every dataset is
+ordered by negotiation (created_at, ng_id); `--after` takes the cursor of
+the last negotiation already exported, `<negotiation_created_at>,<ng_id>`,
+and resumes with the next one.
+
+    python export.py messages --format ndjson --since 2026-01-01 -o messages.ndjson
+    python export.py offers --format parquet --status done -o offers.parquet
+    python export.py messages -o messages.ndjson --resume
+
+After every batch the CLI checkpoints the output's length and cursor at
+the last complete negotiation in `<output>.cursor`. `--resume` truncates
+an interrupted NDJSON or CSV file back to that checkpoint and appends from
+there; an interrupted Parquet file is closed as it stands and the cursor to
+pass as `--after` for a new file is printed. Parquet output needs pyarrow.
+
+The API serves the same datasets at `GET /export/{dataset}`, with
+`EXPORT_MAX_CONCURRENT` exports at a time.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator, Awaitable
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+import asyncpg
+from dotenv import load_dotenv
+
+from admission import AdmissionRejected
+from responses import dumps
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+BATCH_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    One export table: a query selecting `columns` for the negotiations
+    matching `{where}`, plus the type of each column for Parquet.
+    """
+
+    sql: str
+    columns: tuple[tuple[str, str], ...]
+
+    @property
+    def names(self) -> list[str]:
+        return [name for name, _ in self.columns]
+
+
+NEGOTIATION_COLUMNS = (
+    ("ng_id", "uuid"),
+    ("negotiation_created_at", "timestamp"),
+    ("tenant", "text"),
+    ("status", "text"),
+    ("product", "text"),
+)
+
+# Negotiations are read in (created_at, ng_id) order and each one's rows are
+# sorted on their own in a LATERAL subquery, so no sort spans the export.
+DATASETS = {
+    "negotiations": Dataset(
+        """
+        SELECT n.ng_id, n.created_at AS negotiation_created_at, n.tenant, n.status,
+               n.product, n.strategy, n.supplier_count, n.message_count,
+               n.last_message_at, n.best_offer
+        FROM negotiation n
+        WHERE {where}
+        ORDER BY n.created_at, n.ng_id
+        """,
+        NEGOTIATION_COLUMNS
+        + (
+            ("strategy", "text"),
+            ("supplier_count", "int"),
+            ("message_count", "int"),
+            ("last_message_at", "timestamp"),
+            ("best_offer", "numeric"),
+        ),
+    ),
+    "messages": Dataset(
+        """
+        SELECT n.ng_id, n.created_at AS negotiation_created_at, n.tenant, n.status,
+               n.product, m.message_id, m.supplier_id, m.role, m.content,
+               m.created_at, m.delivery_status
+        FROM negotiation n
+        CROSS JOIN LATERAL (
+            SELECT * FROM message
+            WHERE message.ng_id = n.ng_id
+            ORDER BY supplier_id, created_at, message_id
+        ) m
+        WHERE {where}
+        ORDER BY n.created_at, n.ng_id, m.supplier_id, m.created_at, m.message_id
+        """,
+        NEGOTIATION_COLUMNS
+        + (
+            ("message_id", "uuid"),
+            ("supplier_id", "text"),
+            ("role", "text"),
+            ("content", "text"),
+            ("created_at", "timestamp"),
+            ("delivery_status", "text"),
+        ),
+    ),
+    "offers": Dataset(
+        """
+        SELECT n.ng_id, n.created_at AS negotiation_created_at, n.tenant, n.status,
+               n.product, o.offer_id, o.sup_id, o.message_id, o.unit_price, o.currency,
+               o.quantity, o.lead_time_days, o.terms, o.created_at
+        FROM negotiation n
+        CROSS JOIN LATERAL (
+            SELECT * FROM offer
+            WHERE offer.ng_id = n.ng_id
+            ORDER BY sup_id, created_at, offer_id
+        ) o
+        WHERE {where}
+        ORDER BY n.created_at, n.ng_id, o.sup_id, o.created_at, o.offer_id
+        """,
+        NEGOTIATION_COLUMNS
+        + (
+            ("offer_id", "int"),
+            ("sup_id", "text"),
+            ("message_id", "uuid"),
+            ("unit_price", "numeric"),
+            ("currency", "text"),
+            ("quantity", "int"),
+            ("lead_time_days", "int"),
+            ("terms", "text"),
+            ("created_at", "timestamp"),
+        ),
+    ),
+}
+
+
+@dataclass(frozen=True)
+class ExportFilter:
+    since: datetime | None = None
+    until: datetime | None = None
+    status: str | None = None
+    tenant: str | None = None
+    after: tuple[datetime, uuid.UUID] | None = None
+
+    def where(self) -> tuple[str, list[Any]]:
+        """SQL condition on `n` (the negotiation) and its arguments."""
+        conditions: list[str] = []
+        args: list[Any] = []
+        for clause, value in (
+            ("n.created_at >= ${}", self.since),
+            ("n.created_at < ${}", self.until),
+            ("n.status = ${}", self.status),
+            ("n.tenant = ${}", self.tenant),
+        ):
+            if value is not None:
+                args.append(value)
+                conditions.append(clause.format(len(args)))
+        if self.after is not None:
+            args.extend(self.after)
+            conditions.append(f"(n.created_at, n.ng_id) > (${len(args) - 1}, ${len(args)})")
+        return " AND ".join(conditions) or "TRUE", args
+
+
+def parse_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Split an export cursor, `<negotiation_created_at>,<ng_id>`; ValueError if malformed."""
+    created_at, ng_id = cursor.rsplit(",", 1)
+    return datetime.fromisoformat(created_at), uuid.UUID(ng_id)
+
+
+def format_cursor(row: asyncpg.Record) -> str:
+    return f"{row['negotiation_created_at'].isoformat()},{row['ng_id']}"
+
+
+async def batches(
+    conn: asyncpg.Connection, dataset: Dataset, filters: ExportFilter, size: int = BATCH_SIZE
+) -> AsyncIterator[list[asyncpg.Record]]:
+    """
+    Rows in batches of `size` from a server-side cursor.
+
+    Runs in one read-only REPEATABLE READ transaction, so a long export sees
+    a single snapshot and never blocks a writer.
+    """
+    where, args = filters.where()
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        cursor = await conn.cursor(dataset.sql.format(where=where), *args)
+        while rows := await cursor.fetch(size):
+            yield rows
+
+
+class NdjsonEncoder:
+    def __init__(self, dataset: Dataset, header: bool = True) -> None:
+        self.dataset = dataset
+
+    def encode(self, rows: list[asyncpg.Record]) -> bytes:
+        return b"".join(dumps(row) + b"\n" for row in rows)
+
+    def close(self) -> bytes:
+        return b""
+
+
+class CsvEncoder:
+    def __init__(self, dataset: Dataset, header: bool = True) -> None:
+        self.dataset = dataset
+        self.header = header
+
+    def encode(self, rows: list[asyncpg.Record]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header:
+            writer.writerow(self.dataset.names)
+            self.header = False
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+        return buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class _Sink(io.RawIOBase):
+    """Write-only stream collecting what ParquetWriter emits between reads."""
+
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+class ParquetEncoder:
+    """One row group per batch, written as soon as it is encoded."""
+
+    def __init__(self, dataset: Dataset, header: bool = True) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow)") from None
+        types = {
+            "uuid": pa.string(),
+            "text": pa.string(),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+            "int": pa.int64(),
+            "numeric": pa.float64(),
+        }
+        self.pa = pa
+        self.dataset = dataset
+        self.schema = pa.schema([(name, types[kind]) for name, kind in dataset.columns])
+        self.sink = _Sink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    @staticmethod
+    def _value(kind: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if kind == "uuid":
+            return str(value)
+        if kind == "numeric" and isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    def encode(self, rows: list[asyncpg.Record]) -> bytes:
+        columns = {
+            name: [self._value(kind, row[i]) for row in rows]
+            for i, (name, kind) in enumerate(self.dataset.columns)
+        }
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+        return self.sink.take()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.sink.take()
+
+
+ENCODERS = {"ndjson": NdjsonEncoder, "csv": CsvEncoder, "parquet": ParquetEncoder}
+
+
+async def negotiation_batches(
+    conn: asyncpg.Connection, dataset: Dataset, filters: ExportFilter
+) -> AsyncIterator[tuple[list[asyncpg.Record], str]]:
+    """
+    Batches that end on a negotiation boundary, each with the cursor of its
+    last negotiation. Rows of a negotiation that runs past the end of a
+    fetched batch are held back and sent with the next one.
+    """
+    held: list[asyncpg.Record] = []
+    async for rows in batches(conn, dataset, filters):
+        rows = held + rows
+        last = rows[-1]["ng_id"]
+        split = len(rows)
+        while split and rows[split - 1]["ng_id"] == last:
+            split -= 1
+        held = rows[split:]
+        if split:
+            yield rows[:split], format_cursor(rows[split - 1])
+    if held:
+        yield held, format_cursor(held[-1])
+
+
+def connect(dsn: str) -> Awaitable[asyncpg.Connection]:
+    """
+    A connection of its own rather than one from the pool, so a long export
+    does not hold a slot the API needs. A client that stops reading leaves
+    the transaction idle; the server ends it after five minutes rather than
+    hold back vacuum.
+    """
+    return asyncpg.connect(
+        dsn,
+        server_settings={
+            "application_name": "export",
+            "idle_in_transaction_session_timeout": "300000",
+        },
+    )
+
+
+class Exporter:
+    """Runs API exports, at most `max_concurrent` at a time."""
+
+    def __init__(self, dsn: str, max_concurrent: int = 2, retry_after: int = 60) -> None:
+        self.dsn = dsn
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.running = 0
+        self.rows: Counter[str] = Counter()
+        self.completed: Counter[str] = Counter()
+
+    def open(self, dataset: str, fmt: str, filters: ExportFilter) -> AsyncIterator[bytes]:
+        """
+        The export's bytes. Raises ValueError for an unknown dataset or
+        format and AdmissionRejected while `max_concurrent` exports run.
+        The slot is taken when the returned iterator starts and released
+        when it finishes, so an iterator that is never started holds none.
+        """
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset {dataset}; expected one of {', '.join(DATASETS)}")
+        if fmt not in ENCODERS:
+            raise ValueError(f"Unknown format {fmt}; expected one of {', '.join(ENCODERS)}")
+        encoder = ENCODERS[fmt](DATASETS[dataset])
+        if self.slots.locked():
+            raise AdmissionRejected(
+                "exports", f"{self.running} exports are running", self.retry_after
+            )
+        return self._stream(dataset, encoder, filters)
+
+    async def _stream(
+        self, dataset: str, encoder: Any, filters: ExportFilter
+    ) -> AsyncIterator[bytes]:
+        # Exports that passed the check in `open` together wait here for a
+        # slot rather than run more than `max_concurrent` at once.
+        async with self.slots:
+            self.running += 1
+            outcome = "error"
+            try:
+                conn = await connect(self.dsn)
+                try:
+                    async for rows, _ in negotiation_batches(conn, DATASETS[dataset], filters):
+                        # Encoding a batch, Parquet especially, is CPU-bound;
+                        # keep it off the event loop the live API runs on.
+                        yield await asyncio.to_thread(encoder.encode, rows)
+                        self.rows[dataset] += len(rows)
+                    # Closing a Parquet writer flushes the last row group
+                    # and the footer, which is as slow as a batch.
+                    yield await asyncio.to_thread(encoder.close)
+                    outcome = "done"
+                finally:
+                    await conn.close()
+            except (asyncio.CancelledError, GeneratorExit):
+                outcome = "disconnected"
+                raise
+            finally:
+                self.running -= 1
+                self.completed[outcome] += 1
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "max_concurrent": self.max_concurrent,
+            "rows": dict(self.rows),
+            "completed": dict(self.completed),
+        }
+
+
+def _read_checkpoint(path: str) -> tuple[int, str] | None:
+    try:
+        with open(path) as f:
+            offset, cursor = f.read().split(" ", 1)
+    except FileNotFoundError:
+        return None
+    return int(offset), cursor.strip()
+
+
+def _write_checkpoint(path: str, offset: int, cursor: str) -> None:
+    with open(path + ".tmp", "w") as f:
+        f.write(f"{offset} {cursor}\n")
+    os.replace(path + ".tmp", path)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("dataset", choices=DATASETS)
+    parser.add_argument("--format", choices=ENCODERS, default="ndjson")
+    parser.add_argument(
+        "--since", type=datetime.fromisoformat, help="negotiations created at or after"
+    )
+    parser.add_argument(
+        "--until", type=datetime.fromisoformat, help="negotiations created before"
+    )
+    parser.add_argument("--status", help="only negotiations with this status")
+    parser.add_argument("--tenant", help="only negotiations of this tenant")
+    parser.add_argument("--after", type=parse_cursor, help="resume after this cursor")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument(
+        "--resume", action="store_true", help="continue an interrupted NDJSON or CSV export"
+    )
+    args = parser.parse_args()
+
+    # Progress is checkpointed next to the output after every batch: the byte
+    # offset of the last complete negotiation and its cursor.
+    checkpoint_path = args.output + ".cursor"
+    after, offset = args.after, 0
+    if args.resume:
+        if args.format == "parquet":
+            parser.error("Parquet files cannot be appended to; pass --after with a new --output")
+        checkpoint = _read_checkpoint(checkpoint_path)
+        if checkpoint is None:
+            parser.error(f"No checkpoint at {checkpoint_path}")
+        offset, cursor = checkpoint
+        after = parse_cursor(cursor)
+
+    load_dotenv()
+    filters = ExportFilter(args.since, args.until, args.status, args.tenant, after)
+    encoder = ENCODERS[args.format](DATASETS[args.dataset], header=not offset)
+    conn = await connect(os.environ.get("EXPORT_DATABASE_URL") or os.environ["DB_URL"])
+    rows, cursor = 0, None
+    with open(args.output, "r+b" if offset else "wb") as out:
+        # Drop anything written after the last checkpoint.
+        out.truncate(offset)
+        out.seek(offset)
+        try:
+            async for batch, cursor in negotiation_batches(conn, DATASETS[args.dataset], filters):
+                out.write(encoder.encode(batch))
+                out.flush()
+                rows += len(batch)
+                _write_checkpoint(checkpoint_path, out.tell(), cursor)
+                print(f"\r{rows:,} rows, through {cursor}", end="", file=sys.stderr)
+            out.write(encoder.close())
+        except BaseException:
+            if args.format == "parquet":
+                # Closing writes the footer, leaving a readable file of the
+                # row groups written so far.
+                out.write(encoder.close())
+            if cursor:
+                print(
+                    f"\nInterrupted; continue with --resume, or --after {cursor}",
+                    file=sys.stderr,
+                )
+            raise
+        finally:
+            await conn.close()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"\nExported {rows:,} rows to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
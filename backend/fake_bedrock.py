@@ -0,0 +1,151 @@
+"""
+Local stand-in for the Bedrock runtime invoke_model and
+invoke_model_with_response_stream APIs.
+
+Run it and point the backend at it to exercise the LLM scheduler without
+spending quota:
+
+    uvicorn fake_bedrock:app --port 8100
+    BEDROCK_ENDPOINT_URL=http://localhost:8100 python main.py
+
+Knobs (environment):
+    FAKE_BEDROCK_LATENCY        seconds per call (default 0.5)
+    FAKE_BEDROCK_RPM            requests per minute before throttling (default 60)
+    FAKE_BEDROCK_THROTTLE_RATE  extra random throttle probability 0..1 (default 0)
+
+Offer extraction and batched orchestrator advice get well-formed JSON back,
+so a load test makes the same number of calls per turn as with the model.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import struct
+import zlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from scheduler import TokenBucket
+
+LATENCY = float(os.environ.get("FAKE_BEDROCK_LATENCY", "0.5"))
+RPM = float(os.environ.get("FAKE_BEDROCK_RPM", "60"))
+THROTTLE_RATE = float(os.environ.get("FAKE_BEDROCK_THROTTLE_RATE", "0"))
+
+# Matches the batched request in OrchestratorAgent.advise_all.
+ADVICE_REQUEST = re.compile(r"each of these suppliers: (.+?)\. Reply with one JSON object")
+PRICE = re.compile(r"(\d+(?:\.\d+)?)\s*(EUR|USD|GBP|CHF)")
+
+app = FastAPI(title="Fake Bedrock", version="0.1.0")
+quota = TokenBucket(RPM)
+stats = {"calls": 0, "throttled": 0}
+
+
+def throttled() -> JSONResponse:
+    stats["throttled"] += 1
+    return JSONResponse(
+        status_code=429,
+        content={"message": "Too many requests, please wait before trying again."},
+        headers={"x-amzn-ErrorType": "ThrottlingException"},
+    )
+
+
+def admit() -> bool:
+    stats["calls"] += 1
+    if quota.delay(1) > 0 or random.random() < THROTTLE_RATE:
+        return False
+    quota.take(1)
+    return True
+
+
+def reply_text(model_id: str, messages: list[dict[str, str]]) -> str:
+    system = messages[0]["content"] if messages[0]["role"] == "system" else ""
+    prompt = messages[-1]["content"]
+    advice = ADVICE_REQUEST.search(prompt)
+    if advice:
+        return json.dumps(
+            {
+                sup_id: "Ask for a lower unit price and mention the competing offers."
+                for sup_id in advice.group(1).split(", ")
+            }
+        )
+    if "extract the commercial offer" in system:
+        price = PRICE.search(prompt)
+        if not price:
+            return "{}"
+        return json.dumps({"unit_price": float(price.group(1)), "currency": price.group(2)})
+    return f"[{model_id}] Thank you for your message. Could you confirm pricing?"
+
+
+def event_frame(payload: dict) -> bytes:
+    """Encode one `chunk` event in the AWS event-stream binary format."""
+    headers = b""
+    for name, value in (
+        (":event-type", "chunk"),
+        (":content-type", "application/json"),
+        (":message-type", "event"),
+    ):
+        headers += struct.pack("B", len(name)) + name.encode()
+        headers += struct.pack(">BH", 7, len(value)) + value.encode()
+    body = json.dumps(
+        {"bytes": base64.b64encode(json.dumps(payload).encode()).decode()}
+    ).encode()
+    total = 12 + len(headers) + len(body) + 4
+    prelude = struct.pack(">II", total, len(headers))
+    prelude += struct.pack(">I", zlib.crc32(prelude))
+    message = prelude + headers + body
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+@app.post("/model/{model_id}/invoke-with-response-stream")
+async def invoke_model_stream(model_id: str, request: Request):
+    if not admit():
+        return throttled()
+    body = await request.json()
+    words = reply_text(model_id, body["messages"]).split(" ")
+
+    async def frames():
+        for i, word in enumerate(words):
+            await asyncio.sleep(LATENCY / len(words))
+            text = word if i == 0 else f" {word}"
+            yield event_frame({"choices": [{"delta": {"content": text}}]})
+        yield event_frame(
+            {
+                "choices": [],
+                "amazon-bedrock-invocationMetrics": {
+                    "inputTokenCount": sum(len(m["content"]) for m in body["messages"]) // 4,
+                    "outputTokenCount": len(words),
+                },
+            }
+        )
+
+    return StreamingResponse(frames(), media_type="application/vnd.amazon.eventstream")
+
+
+@app.post("/model/{model_id}/invoke")
+async def invoke_model(model_id: str, request: Request) -> JSONResponse:
+    if not admit():
+        return throttled()
+
+    body = await request.json()
+    await asyncio.sleep(LATENCY)
+    prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+    content = reply_text(model_id, body["messages"])
+    return JSONResponse(
+        {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+    )
+
+
+@app.get("/stats")
+async def get_stats() -> dict[str, int]:
+    return stats
@@ -0,0 +1,330 @@
+"""
+Local SMTP and IMAP stand-in with scripted supplier bots.
+
+Mail sent to any address over SMTP is handed to the supplier bot for that
+address, which answers after a short delay by appending a reply (with
+In-Reply-To set) to the single buyer mailbox served over IMAP, including
+IDLE pushes. Nothing leaves the machine.
+
+    python fake_mail.py --smtp-port 2525 --imap-port 2143
+    SMTP_HOST=localhost SMTP_PORT=2525 SMTP_STARTTLS=0 SMTP_AUTH=0 \\
+    IMAP_HOST=localhost IMAP_PORT=2143 IMAP_SSL=0 python main.py
+
+Only the commands the backend's clients use are implemented (EHLO, MAIL,
+RCPT, DATA; LOGIN, SELECT, UID FETCH, IDLE). loadtest.py runs it in-process.
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections.abc import Awaitable, Callable
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from email.utils import make_msgid, parseaddr
+
+UID_SET = re.compile(r"^(\d+)(?::(\d+|\*))?$")
+SUPPLIER_PROMPT = """
+You are a sales manager at a supplier answering a buyer's email about an order. Reply with a
+short email body only. Always quote a concrete unit price in EUR and concede at most a few
+percent per round.
+"""
+
+
+class Mailbox:
+    """The buyer's INBOX: messages by UID plus a wake-up for idling sessions."""
+
+    def __init__(self) -> None:
+        self.uidvalidity = int(time.time())
+        self.messages: list[tuple[int, bytes]] = []
+        self.watchers: set[asyncio.Event] = set()
+
+    @property
+    def uidnext(self) -> int:
+        return self.messages[-1][0] + 1 if self.messages else 1
+
+    def append(self, raw: bytes) -> None:
+        self.messages.append((self.uidnext, raw))
+        for event in self.watchers:
+            event.set()
+
+    def range(self, start: int, end: int | None) -> list[tuple[int, int, bytes]]:
+        """(sequence number, uid, message) for `start:end`; `n:*` always matches the newest."""
+        found = [
+            (seq, uid, raw)
+            for seq, (uid, raw) in enumerate(self.messages, 1)
+            if uid >= start and (end is None or uid <= end)
+        ]
+        if not found and end is None and self.messages:
+            uid, raw = self.messages[-1]
+            found = [(len(self.messages), uid, raw)]
+        return found
+
+
+class SmtpServer:
+    """Accepts every message and passes it to `on_message`."""
+
+    def __init__(self, on_message: Callable[[EmailMessage], Awaitable[None]]) -> None:
+        self.on_message = on_message
+        self.received = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+
+        reply("220 fake-mail ESMTP ready")
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    reply("250-fake-mail")
+                    reply("250-8BITMIME")
+                    reply("250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    reply("250 fake-mail")
+                elif verb == "AUTH":
+                    if command.upper().startswith("AUTH LOGIN"):
+                        for prompt in ("VXNlcm5hbWU6", "UGFzc3dvcmQ6"):
+                            reply(f"334 {prompt}")
+                            await writer.drain()
+                            await reader.readline()
+                    reply("235 Authentication succeeded")
+                elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    lines = []
+                    while (data := await reader.readline()) not in (b".\r\n", b".\n", b""):
+                        lines.append(data[1:] if data.startswith(b"..") else data)
+                    self.received += 1
+                    message = message_from_bytes(b"".join(lines), policy=policy.default)
+                    asyncio.create_task(self.on_message(message))
+                    reply("250 OK queued")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+class ImapServer:
+    """One mailbox, any credentials, with IDLE."""
+
+    def __init__(self, mailbox: Mailbox) -> None:
+        self.mailbox = mailbox
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        def send(line: str | bytes) -> None:
+            writer.write((line.encode() if isinstance(line, str) else line) + b"\r\n")
+
+        seen = 0
+        wakeup = asyncio.Event()
+        self.mailbox.watchers.add(wakeup)
+        send("* OK [CAPABILITY IMAP4rev1 IDLE] fake-mail ready")
+        try:
+            while line := await reader.readline():
+                parts = line.decode(errors="replace").strip().split(" ", 2)
+                if len(parts) < 2:
+                    continue
+                tag, command = parts[0], parts[1].upper()
+                rest = parts[2] if len(parts) > 2 else ""
+                if command == "CAPABILITY":
+                    send("* CAPABILITY IMAP4rev1 IDLE")
+                    send(f"{tag} OK CAPABILITY completed")
+                elif command == "LOGIN":
+                    send(f"{tag} OK LOGIN completed")
+                elif command in ("SELECT", "EXAMINE"):
+                    seen = len(self.mailbox.messages)
+                    send(f"* {seen} EXISTS")
+                    send("* 0 RECENT")
+                    send("* FLAGS (\\Seen)")
+                    send(f"* OK [UIDVALIDITY {self.mailbox.uidvalidity}] UIDs valid")
+                    send(f"* OK [UIDNEXT {self.mailbox.uidnext}] Predicted next UID")
+                    send(f"{tag} OK [READ-WRITE] {command} completed")
+                elif command == "UID" and rest.upper().startswith("FETCH "):
+                    match = UID_SET.match(rest.split(" ")[1])
+                    if match is None:
+                        send(f"{tag} BAD Unsupported UID set")
+                    else:
+                        end = match.group(2)
+                        if end is None:
+                            end = match.group(1)
+                        found = self.mailbox.range(
+                            int(match.group(1)), None if end == "*" else int(end)
+                        )
+                        for seq, uid, raw in found:
+                            send(f"* {seq} FETCH (UID {uid} BODY[] {{{len(raw)}}}")
+                            writer.write(raw)
+                            send(")")
+                        seen = len(self.mailbox.messages)
+                        send(f"{tag} OK UID FETCH completed")
+                elif command == "IDLE":
+                    send("+ idling")
+                    await writer.drain()
+                    done = asyncio.create_task(reader.readline())
+                    while True:
+                        wakeup.clear()
+                        if len(self.mailbox.messages) > seen:
+                            seen = len(self.mailbox.messages)
+                            send(f"* {seen} EXISTS")
+                            await writer.drain()
+                        woken = asyncio.create_task(wakeup.wait())
+                        finished, _ = await asyncio.wait(
+                            {done, woken}, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if done in finished:
+                            woken.cancel()
+                            break
+                    if not done.result():
+                        break
+                    send(f"{tag} OK IDLE terminated")
+                elif command == "NOOP":
+                    send(f"{tag} OK NOOP completed")
+                elif command == "LOGOUT":
+                    send("* BYE fake-mail logging out")
+                    send(f"{tag} OK LOGOUT completed")
+                    await writer.drain()
+                    break
+                else:
+                    send(f"{tag} BAD {command} not supported")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.mailbox.watchers.discard(wakeup)
+            writer.close()
+
+
+class SupplierBot:
+    """
+    Rule-based supplier: answers every email with a slightly lower unit
+    price, up to `rounds` replies. With a `client` (an LLMGateway) the reply
+    is drafted by the model instead, still quoting the scripted price.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        mailbox: Mailbox,
+        rounds: int = 3,
+        delay: tuple[float, float] = (0.1, 0.5),
+        start_price: float = 20.0,
+        client=None,
+    ) -> None:
+        self.address = address
+        self.mailbox = mailbox
+        self.rounds = rounds
+        self.delay = delay
+        self.price = start_price * random.uniform(0.9, 1.1)
+        self.client = client
+        self.replies = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.replies >= self.rounds
+
+    async def compose(self, incoming: EmailMessage) -> str:
+        self.price *= random.uniform(0.95, 0.99)
+        quote = f"We can offer {self.price:.2f} EUR per unit for 5,000 units, 14 days lead time."
+        if self.client is None:
+            return f"Thank you for your message. {quote}\n\nBest regards,\nSales"
+        body = incoming.get_body(preferencelist=("plain",))
+        text = body.get_content() if body is not None else ""
+        draft = await self.client.complete(
+            f"Buyer email:\n{text}\n\nYour offer this round: {quote}",
+            SUPPLIER_PROMPT,
+            max_tokens=300,
+            lane="background",
+        )
+        return draft if "EUR" in draft else f"{draft}\n\n{quote}"
+
+    async def answer(self, incoming: EmailMessage) -> bool:
+        """Reply after the scripted delay; False once the bot has stopped replying."""
+        if self.finished:
+            return False
+        self.replies += 1
+        await asyncio.sleep(random.uniform(*self.delay))
+        reply = EmailMessage()
+        reply["From"] = self.address
+        reply["To"] = incoming["From"]
+        reply["Subject"] = f"Re: {incoming['Subject']}"
+        reply["Message-ID"] = make_msgid(domain=self.address.rsplit("@", 1)[-1])
+        if incoming["Message-ID"]:
+            reply["In-Reply-To"] = incoming["Message-ID"]
+            reply["References"] = incoming["Message-ID"]
+        reply.set_content(await self.compose(incoming))
+        self.mailbox.append(reply.as_bytes())
+        return True
+
+
+class FakeMail:
+    """SMTP and IMAP servers sharing one mailbox, with a bot per supplier address."""
+
+    def __init__(self, rounds: int = 3, delay: tuple[float, float] = (0.1, 0.5), client=None):
+        self.mailbox = Mailbox()
+        self.rounds = rounds
+        self.delay = delay
+        self.client = client
+        self.bots: dict[str, SupplierBot] = {}
+        self.on_received: Callable[[str, EmailMessage], None] | None = None
+        self.on_replied: Callable[[str], None] | None = None
+        self.smtp = SmtpServer(self._received)
+        self.imap = ImapServer(self.mailbox)
+        self.servers: list[asyncio.AbstractServer] = []
+
+    async def start(self, host: str, smtp_port: int, imap_port: int) -> None:
+        self.servers = [
+            await asyncio.start_server(self.smtp.handle, host, smtp_port),
+            await asyncio.start_server(self.imap.handle, host, imap_port),
+        ]
+
+    async def stop(self) -> None:
+        for server in self.servers:
+            server.close()
+
+    def bot(self, address: str) -> SupplierBot:
+        address = address.lower()
+        if address not in self.bots:
+            self.bots[address] = SupplierBot(
+                address, self.mailbox, self.rounds, self.delay, client=self.client
+            )
+        return self.bots[address]
+
+    async def _received(self, message: EmailMessage) -> None:
+        address = parseaddr(message.get("To", ""))[1].lower()
+        if self.on_received:
+            self.on_received(address, message)
+        try:
+            if await self.bot(address).answer(message) and self.on_replied:
+                self.on_replied(address)
+        except Exception as e:
+            print(f"Supplier bot {address} failed: {e!r}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--smtp-port", type=int, default=2525)
+    parser.add_argument("--imap-port", type=int, default=2143)
+    parser.add_argument("--rounds", type=int, default=3, help="replies per supplier thread")
+    parser.add_argument("--delay", type=float, nargs=2, default=(0.5, 2.0), metavar=("MIN", "MAX"))
+    args = parser.parse_args()
+
+    mail = FakeMail(args.rounds, tuple(args.delay))
+    mail.on_received = lambda address, message: print(f"-> {address}: {message['Subject']}")
+    mail.on_replied = lambda address: print(f"<- {address}")
+    await mail.start(args.host, args.smtp_port, args.imap_port)
+    print(f"SMTP on {args.host}:{args.smtp_port}, IMAP on {args.host}:{args.imap_port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
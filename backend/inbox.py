@@ -0,0 +1,273 @@
+import asyncio
+import re
+import time
+from collections.abc import Callable
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from email.utils import parseaddr
+
+import aioimaplib
+import asyncpg
+
+import db
+from email_client import IMAP_HOST, IMAP_MAILBOX, IMAP_PORT, IMAP_SSL
+from router import record_supplier_email
+from telemetry import EMAIL_RECEIVED, fail, tracer
+
+UIDVALIDITY = re.compile(rb"UIDVALIDITY (\d+)")
+UIDNEXT = re.compile(rb"UIDNEXT (\d+)")
+FETCH_UID = re.compile(rb"UID (\d+)")
+MESSAGE_IDS = re.compile(r"<[^>]+>")
+# "On Tue, 3 Mar 2026 at 10:12, Buyer <buyer@example.com> wrote:"
+QUOTE_HEADER = re.compile(r"^On .+wrote:\s*$", re.MULTILINE)
+
+ROUTE_BY_REFERENCE = db.Query(
+    "route_by_reference",
+    """
+    SELECT ng_id, sup_id FROM email_thread
+    WHERE message_id = ANY($1::text[])
+    ORDER BY created_at DESC
+    LIMIT 1
+    """,
+    timeout=5,
+)
+ROUTE_BY_SENDER = db.Query(
+    "route_by_sender",
+    """
+    SELECT ng_id, sup_id FROM email_thread
+    WHERE address = $1 AND direction = 'out'
+    ORDER BY created_at DESC
+    LIMIT 1
+    """,
+    timeout=5,
+)
+
+
+def reply_text(message: EmailMessage) -> str:
+    """The new text of a reply, without the quoted history below it."""
+    part = message.get_body(preferencelist=("plain", "html"))
+    text = part.get_content() if part is not None else ""
+    match = QUOTE_HEADER.search(text)
+    if match:
+        text = text[: match.start()]
+    return "\n".join(line for line in text.splitlines() if not line.startswith(">")).strip()
+
+
+def parse_fetch(lines: list) -> list[tuple[int, bytes]]:
+    """(uid, raw message) pairs from a `UID FETCH ... (UID BODY.PEEK[])` response."""
+    messages = []
+    for i, line in enumerate(lines[:-1]):
+        match = FETCH_UID.search(line) if isinstance(line, bytes) else None
+        if match and isinstance(lines[i + 1], bytearray):
+            messages.append((int(match.group(1)), bytes(lines[i + 1])))
+    return messages
+
+
+class InboxListener:
+    """
+    One long-lived IMAP IDLE connection per mailbox.
+
+    New mail is fetched by UID only, so each cycle downloads just the
+    messages that arrived. Replies are matched to their supplier thread
+    through In-Reply-To/References in `email_thread`, falling back to the
+    thread we last wrote to from the sender's address. The last processed
+    UID is stored in `imap_state`; after a dropped connection the listener
+    reconnects with backoff and resumes from there. Recording a message and
+    its Message-ID happens in one transaction, so a message is processed
+    once even if several listeners watch the same mailbox.
+    """
+
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        email: str,
+        password: str,
+        on_delivered: Callable[[str, str], None] | None = None,
+        host: str = IMAP_HOST,
+        port: int = IMAP_PORT,
+        ssl: bool = IMAP_SSL,
+        mailbox: str = IMAP_MAILBOX,
+        idle_timeout: float = 300,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+    ) -> None:
+        self.db_pool = db_pool
+        self.email = email
+        self.password = password
+        self.on_delivered = on_delivered
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.mailbox = mailbox
+        self.idle_timeout = idle_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.state_key = f"{email.lower()}/{mailbox}"
+        self.last_uid = 0
+        self.delivered = 0
+        self.unrouted = 0
+        self.task: asyncio.Task | None = None
+        self._delay = reconnect_delay
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self) -> None:
+        self._delay = self.reconnect_delay
+        while True:
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"IMAP listener for {self.state_key} disconnected: {e!r}")
+            await asyncio.sleep(self._delay)
+            self._delay = min(self._delay * 2, self.max_reconnect_delay)
+
+    async def _session(self) -> None:
+        if self.ssl:
+            imap = aioimaplib.IMAP4_SSL(host=self.host, port=self.port)
+        else:
+            imap = aioimaplib.IMAP4(host=self.host, port=self.port)
+        await imap.wait_hello_from_server()
+        try:
+            response = await imap.login(self.email, self.password)
+            if response.result != "OK":
+                raise ConnectionError(f"IMAP login failed: {response.lines}")
+            response = await imap.select(self.mailbox)
+            if response.result != "OK":
+                raise ConnectionError(f"IMAP select failed: {response.lines}")
+            await self._resume(
+                b"\n".join(line for line in response.lines if isinstance(line, bytes))
+            )
+            self._delay = self.reconnect_delay
+
+            while True:
+                await self._fetch_new(imap)
+                idle = await imap.idle_start(timeout=self.idle_timeout)
+                await imap.wait_server_push()
+                imap.idle_done()
+                await asyncio.wait_for(idle, 10)
+        finally:
+            try:
+                await imap.logout()
+            except Exception:
+                pass
+
+    async def _resume(self, select_response: bytes) -> None:
+        """Pick up after the last processed UID, or start from now on a new mailbox."""
+        validity = UIDVALIDITY.search(select_response)
+        uidnext = UIDNEXT.search(select_response)
+        uidvalidity = int(validity.group(1)) if validity else 0
+        state = await self.db_pool.fetchrow(
+            "SELECT uidvalidity, last_uid FROM imap_state WHERE mailbox = $1", self.state_key
+        )
+        if state is not None and state["uidvalidity"] == uidvalidity:
+            self.last_uid = state["last_uid"]
+            return
+        # First run, or the server renumbered the mailbox: older mail is not
+        # replayed, only what arrives from here on.
+        self.last_uid = int(uidnext.group(1)) - 1 if uidnext else 0
+        await self.db_pool.execute(
+            """
+            INSERT INTO imap_state (mailbox, uidvalidity, last_uid) VALUES ($1, $2, $3)
+            ON CONFLICT (mailbox) DO UPDATE
+            SET uidvalidity = EXCLUDED.uidvalidity, last_uid = EXCLUDED.last_uid,
+                updated_at = NOW()
+            """,
+            self.state_key,
+            uidvalidity,
+            self.last_uid,
+        )
+
+    async def _fetch_new(self, imap: aioimaplib.IMAP4) -> None:
+        response = await imap.uid("fetch", f"{self.last_uid + 1}:*", "(UID BODY.PEEK[])")
+        if response.result != "OK":
+            # Some servers answer NO to `n:*` on an empty mailbox.
+            return
+        # `n:*` always matches the newest message, even when it is older than n.
+        for uid, raw in sorted(parse_fetch(response.lines)):
+            if uid <= self.last_uid:
+                continue
+            await self._deliver(message_from_bytes(raw, policy=policy.default))
+            self.last_uid = uid
+            await self.db_pool.execute(
+                "UPDATE imap_state SET last_uid = $2, updated_at = NOW() WHERE mailbox = $1",
+                self.state_key,
+                uid,
+            )
+
+    async def _route(self, message: EmailMessage) -> asyncpg.Record | None:
+        """The (ng_id, sup_id) thread a supplier email belongs to."""
+        references = MESSAGE_IDS.findall(
+            f"{message.get('In-Reply-To', '')} {message.get('References', '')}"
+        )
+        if references:
+            row = await db.fetchrow(self.db_pool, ROUTE_BY_REFERENCE, references)
+            if row is not None:
+                return row
+        sender = parseaddr(message.get("From", ""))[1].lower()
+        return await db.fetchrow(self.db_pool, ROUTE_BY_SENDER, sender)
+
+    async def _deliver(self, message: EmailMessage) -> None:
+        # Each inbound email starts a trace; the job it enqueues carries the
+        # context on to the worker that runs the negotiator's turn.
+        start = time.perf_counter()
+        with tracer.start_as_current_span("email.receive") as span:
+            span.set_attribute("email.message_id", (message.get("Message-ID") or "").strip())
+            outcome = "error"
+            try:
+                outcome = await self._record(message)
+            except Exception as e:
+                fail(span, e)
+                raise
+            finally:
+                span.set_attribute("email.outcome", outcome)
+                EMAIL_RECEIVED.labels(outcome).observe(time.perf_counter() - start)
+
+    async def _record(self, message: EmailMessage) -> str:
+        sender = parseaddr(message.get("From", ""))[1].lower()
+        if sender == self.email.lower():
+            return "own"
+        route = await self._route(message)
+        if route is None:
+            self.unrouted += 1
+            return "unrouted"
+        ng_id, sup_id = str(route["ng_id"]), route["sup_id"]
+        header = (message.get("Message-ID") or "").strip()
+        async with self.db_pool.acquire() as conn:
+            async with conn.transaction():
+                if header:
+                    claimed = await conn.fetchval(
+                        """
+                        INSERT INTO email_thread (message_id, ng_id, sup_id, address, direction)
+                        VALUES ($1, $2, $3, $4, 'in')
+                        ON CONFLICT (message_id) DO NOTHING
+                        RETURNING message_id
+                        """,
+                        header,
+                        ng_id,
+                        sup_id,
+                        sender,
+                    )
+                    if claimed is None:
+                        return "duplicate"
+                await record_supplier_email(conn, ng_id, sup_id, reply_text(message))
+        self.delivered += 1
+        if self.on_delivered:
+            self.on_delivered(ng_id, sup_id)
+        return "delivered"
+
+    def metrics(self) -> dict[str, int | str]:
+        return {
+            "mailbox": self.state_key,
+            "last_uid": self.last_uid,
+            "delivered": self.delivered,
+            "unrouted": self.unrouted,
+        }
@@ -0,0 +1,255 @@
+import asyncio
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+from opentelemetry import trace
+
+import db
+from events import listen_forever
+from telemetry import AGENT_JOBS, extract, fail, inject, tracer
+
+CHANNEL = "agent_jobs"
+
+# Claims the oldest runnable jobs, at most one per supplier thread and none
+# for a thread that already has a turn running, skipping rows other workers
+# hold and tenants already at their running-turn cap ($3, NULL for none).
+# Only the head of each thread (its lowest queued job_id) can be claimed, and
+# only once its run_after has passed, so jobs run in the order they were
+# queued: a backed-off offer extraction holds back the reply after it. The
+# advisory lock keeps two workers claiming in the same instant from both
+# taking the same thread. The cap is checked per claim, so one batch can
+# overshoot it by its size.
+CLAIM_SQL = """
+WITH head AS (
+    SELECT DISTINCT ON (j.ng_id, j.sup_id) j.job_id, j.ng_id, j.sup_id, j.tenant, j.run_after
+    FROM agent_job j
+    WHERE j.status = 'queued'
+    ORDER BY j.ng_id, j.sup_id, j.job_id
+), next_job AS (
+    SELECT h.job_id, h.run_after
+    FROM head h
+    WHERE h.run_after <= NOW()
+      AND NOT EXISTS (
+          SELECT 1 FROM agent_job r
+          WHERE r.status = 'running' AND r.ng_id = h.ng_id AND r.sup_id = h.sup_id
+      )
+      AND ($3::int IS NULL OR (
+          SELECT count(*) FROM agent_job t WHERE t.status = 'running' AND t.tenant = h.tenant
+      ) < $3)
+)
+UPDATE agent_job SET status = 'running', locked_at = NOW(), locked_by = $1,
+                     attempts = attempts + 1
+WHERE job_id IN (
+    SELECT j.job_id FROM agent_job j
+    JOIN next_job n ON n.job_id = j.job_id
+    WHERE j.status = 'queued'
+      AND pg_try_advisory_xact_lock(hashtextextended(j.ng_id::text || j.sup_id, 0))
+    ORDER BY n.run_after, n.job_id
+    FOR UPDATE OF j SKIP LOCKED
+    LIMIT $2
+)
+RETURNING job_id, ng_id, sup_id, kind, message_id, attempts, trace_context
+"""
+CLAIM = db.Query("job_claim", CLAIM_SQL, timeout=10)
+ENQUEUE = db.Query(
+    "job_enqueue",
+    """
+    INSERT INTO agent_job (ng_id, sup_id, kind, message_id, trace_context, tenant)
+    SELECT $1, sup_id, $3, $4, $5,
+           COALESCE((SELECT tenant FROM negotiation WHERE ng_id = $1), 'default')
+    FROM unnest($2::text[]) AS sup_id
+    """,
+    timeout=5,
+)
+
+
+async def enqueue(
+    conn: asyncpg.Pool | asyncpg.Connection,
+    ng_id: str,
+    sup_ids: list[str],
+    kind: str,
+    message_id: str | None = None,
+) -> None:
+    """Queue one `kind` job per supplier; workers are woken by NOTIFY."""
+    await db.execute(conn, ENQUEUE, ng_id, sup_ids, kind, message_id, inject())
+
+
+JobHandler = Callable[[asyncpg.Record], Awaitable[None]]
+
+
+class JobWorker:
+    """
+    Runs queued agent turns with up to `concurrency` in flight.
+
+    Any number of these can run across processes and nodes. A running job's
+    lease is renewed every third of `lease_seconds`, so only a job whose
+    worker died is re-queued when it expires; failed jobs are retried with
+    exponential backoff up to `max_attempts`. Database errors are logged and
+    retried after `poll_interval` rather than stopping the worker. With
+    `tenant_max_running`, no tenant has more turns running across all
+    workers than that, so one tenant's burst cannot take every slot.
+    """
+
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        database_url: str,
+        handler: JobHandler,
+        concurrency: int = 8,
+        lease_seconds: float = 600,
+        poll_interval: float = 5.0,
+        max_attempts: int = 5,
+        tenant_max_running: int | None = None,
+    ) -> None:
+        self.db_pool = db_pool
+        self.database_url = database_url
+        self.handler = handler
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.tenant_max_running = tenant_max_running or None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.running: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+
+    async def run(self) -> None:
+        listener = asyncio.create_task(
+            listen_forever(
+                self.database_url,
+                {CHANNEL: lambda _: self._wakeup.set()},
+                on_connect=self._wakeup.set,
+            )
+        )
+        try:
+            while True:
+                try:
+                    await self._requeue_expired()
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                    print(f"Re-queuing expired agent jobs failed: {e}")
+                free = self.concurrency - len(self.running)
+                jobs = await self._claim(free) if free > 0 else []
+                for job in jobs:
+                    task = asyncio.create_task(self._execute(job))
+                    self.running.add(task)
+                    task.add_done_callback(self._finished)
+                if len(jobs) < free or free == 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+        finally:
+            listener.cancel()
+            for task in self.running:
+                task.cancel()
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self.running.discard(task)
+        self._wakeup.set()
+
+    async def _claim(self, limit: int) -> list[asyncpg.Record]:
+        try:
+            return await db.fetch(
+                self.db_pool, CLAIM, self.worker_id, limit, self.tenant_max_running
+            )
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            print(f"Claiming agent jobs failed: {e}")
+            return []
+
+    async def _requeue_expired(self) -> None:
+        # A job whose worker keeps dying never reaches the error path in
+        # `_attempt`, so its attempts are capped here the same way.
+        await self.db_pool.execute(
+            """
+            UPDATE agent_job SET
+                status = CASE WHEN attempts >= $2 THEN 'failed' ELSE 'queued' END,
+                run_after = NOW() + make_interval(secs => power(2, attempts) * 5),
+                locked_by = NULL,
+                last_error = 'lease expired'
+            WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => $1)
+            """,
+            self.lease_seconds,
+            self.max_attempts,
+        )
+
+    async def _execute(self, job: asyncpg.Record) -> None:
+        start = time.perf_counter()
+        with tracer.start_as_current_span(
+            f"job {job['kind']}", context=extract(job["trace_context"])
+        ) as span:
+            span.set_attribute("job.id", str(job["job_id"]))
+            span.set_attribute("job.attempt", job["attempts"])
+            span.set_attribute("negotiation.id", str(job["ng_id"]))
+            span.set_attribute("supplier.id", job["sup_id"])
+            outcome = await self._attempt(job, span)
+        AGENT_JOBS.labels(job["kind"], outcome).observe(time.perf_counter() - start)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        """Renew the lease on a running job so it is not handed to another worker."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.db_pool.execute(
+                    """
+                    UPDATE agent_job SET locked_at = NOW()
+                    WHERE job_id = $1 AND status = 'running' AND locked_by = $2
+                    """,
+                    job_id,
+                    self.worker_id,
+                )
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                print(f"Renewing the lease on agent job {job_id} failed: {e}")
+
+    async def _update(self, sql: str, *args, retries: int = 5) -> None:
+        """
+        Record a job's outcome, retrying transient errors. If it never lands
+        the job stays running and is re-queued when its lease expires.
+        """
+        for attempt in range(retries):
+            try:
+                await self.db_pool.execute(sql, *args)
+                return
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                print(f"Updating agent job {args[0]} failed: {e}")
+                await asyncio.sleep(min(2**attempt, self.poll_interval))
+
+    async def _attempt(self, job: asyncpg.Record, span: trace.Span) -> str:
+        heartbeat = asyncio.create_task(self._heartbeat(job["job_id"]))
+        try:
+            await self.handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job straight back to the queue.
+            await self._update(
+                "UPDATE agent_job SET status = 'queued', locked_by = NULL WHERE job_id = $1",
+                job["job_id"],
+                retries=1,
+            )
+            raise
+        except Exception as e:
+            print(f"Agent job {job['job_id']} ({job['kind']}) failed: {e!r}")
+            fail(span, e)
+            await self._update(
+                """
+                UPDATE agent_job SET
+                    status = CASE WHEN attempts >= $2 THEN 'failed' ELSE 'queued' END,
+                    run_after = NOW() + make_interval(secs => power(2, attempts) * 5),
+                    locked_by = NULL,
+                    last_error = $3
+                WHERE job_id = $1
+                """,
+                job["job_id"],
+                self.max_attempts,
+                repr(e),
+            )
+            return "failed"
+        finally:
+            heartbeat.cancel()
+        await self._update(
+            "UPDATE agent_job SET status = 'done', locked_by = NULL WHERE job_id = $1",
+            job["job_id"],
+        )
+        return "done"
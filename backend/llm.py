@@ -0,0 +1,345 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from response_cache import ResponseCache, cache_key
+from scheduler import LLMScheduler
+from telemetry import LLM_CALLS, LLM_TOKENS, fail, tracer
+
+MODEL_ID = "openai.gpt-oss-120b-1:0"
+THROTTLE_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+def estimate_tokens(messages: list[dict[str, str]], max_tokens: int) -> int:
+    """Rough upper bound for quota accounting: ~4 characters per token."""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+def is_throttle(e: Exception) -> bool:
+    response = getattr(e, "response", None) or {}
+    return response.get("Error", {}).get("Code") in THROTTLE_CODES
+
+
+class LLMTimeoutError(Exception):
+    pass
+
+
+def _outcome(e: Exception) -> str:
+    if isinstance(e, LLMTimeoutError):
+        return "timeout"
+    return "throttled" if is_throttle(e) else "error"
+
+
+_STREAM_END = object()
+
+
+class LLMGateway:
+    """
+    Shared async entry point for every Bedrock call.
+
+    boto3 is blocking, so invocations run on a bounded thread pool and the
+    event loop only awaits the result. Admission goes through the scheduler,
+    which enforces the concurrency cap and request/token quotas and serves
+    orchestrator calls before negotiator replies. Throttled calls are retried
+    with full-jitter backoff. With a `cache`, repeated deterministic calls are
+    answered without reaching Bedrock.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        max_workers: int = 32,
+        timeout: float = 60.0,
+        model_id: str = MODEL_ID,
+        scheduler: LLMScheduler | None = None,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 20.0,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        self.client = client
+        self.timeout = timeout
+        self.model_id = model_id
+        self.scheduler = scheduler or LLMScheduler(max_concurrency=max_workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bedrock"
+        )
+
+    def _invoke_sync(self, body: dict[str, Any]) -> dict[str, Any]:
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps(body),
+        )
+        return json.loads(response["body"].read())
+
+    async def invoke(
+        self,
+        messages: list[dict[str, str]],
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        timeout: float | None = None,
+        lane: str = "negotiator",
+        cache: bool | None = None,
+    ) -> str:
+        """
+        Run one chat completion and return the reply text.
+
+        Raises LLMTimeoutError when the call exceeds its timeout. Cancelling
+        the awaiting task abandons the result; the worker thread finishes on
+        its own and is bounded by the client's read timeout. `cache` forces
+        the response cache on or off for this call.
+        """
+        start = time.perf_counter()
+        key = self._cache_key(messages, max_tokens, temperature, cache)
+        if key is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                LLM_CALLS.labels(lane, "invoke", "cache").observe(time.perf_counter() - start)
+                return cached
+
+        body = {
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        est_tokens = estimate_tokens(messages, max_tokens)
+        attempt = 0
+        with tracer.start_as_current_span("bedrock.invoke_model") as span:
+            span.set_attribute("llm.model", self.model_id)
+            span.set_attribute("llm.lane", lane)
+            while True:
+                try:
+                    async with self.scheduler.slot(lane, est_tokens):
+                        result = await self._run(body, timeout)
+                    break
+                except Exception as e:
+                    try:
+                        await self._backoff(e, attempt)
+                    except Exception:
+                        self._observe(lane, "invoke", _outcome(e), start, span, attempt)
+                        fail(span, e)
+                        raise
+                    attempt += 1
+
+            usage = result.get("usage") or {}
+            if "total_tokens" in usage:
+                self.scheduler.settle(est_tokens, usage["total_tokens"])
+            self._observe(
+                lane,
+                "invoke",
+                "ok",
+                start,
+                span,
+                attempt,
+                usage.get("prompt_tokens", 0),
+                usage.get("completion_tokens", 0),
+            )
+        text = result["choices"][0]["message"]["content"]
+        if key is not None:
+            await self.cache.set(key, self.model_id, text)
+        return text
+
+    async def stream(
+        self,
+        messages: list[dict[str, str]],
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        timeout: float | None = None,
+        lane: str = "negotiator",
+        cache: bool | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield reply text as the model produces it.
+
+        Same admission and retry rules as invoke(), except that a throttle
+        is only retried before the first chunk has been yielded. `timeout`
+        bounds the gap between chunks rather than the whole reply. A cached
+        reply is yielded as a single chunk.
+        """
+        start = time.perf_counter()
+        key = self._cache_key(messages, max_tokens, temperature, cache)
+        if key is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                LLM_CALLS.labels(lane, "stream", "cache").observe(time.perf_counter() - start)
+                yield cached
+                return
+
+        body = {
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        est_tokens = estimate_tokens(messages, max_tokens)
+        # Not made current: a generator's context would leak into the
+        # consumer between chunks.
+        span = tracer.start_span("bedrock.invoke_model_with_response_stream")
+        span.set_attribute("llm.model", self.model_id)
+        span.set_attribute("llm.lane", lane)
+        usage: dict[str, int] = {}
+        attempt = 0
+        try:
+            while True:
+                emitted = False
+                try:
+                    parts = []
+                    async with self.scheduler.slot(lane, est_tokens):
+                        async for text in self._stream_once(body, est_tokens, timeout, usage):
+                            emitted = True
+                            parts.append(text)
+                            yield text
+                    if key is not None and parts:
+                        await self.cache.set(key, self.model_id, "".join(parts))
+                    self._observe(
+                        lane,
+                        "stream",
+                        "ok",
+                        start,
+                        span,
+                        attempt,
+                        usage.get("inputTokenCount", 0),
+                        usage.get("outputTokenCount", 0),
+                    )
+                    return
+                except Exception as e:
+                    try:
+                        if emitted:
+                            raise
+                        await self._backoff(e, attempt)
+                    except Exception:
+                        self._observe(lane, "stream", _outcome(e), start, span, attempt)
+                        fail(span, e)
+                        raise
+                    attempt += 1
+        finally:
+            span.end()
+
+    async def _stream_once(
+        self,
+        body: dict[str, Any],
+        est_tokens: int,
+        timeout: float | None,
+        usage: dict[str, int],
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def pump() -> None:
+            try:
+                response = self.client.invoke_model_with_response_stream(
+                    modelId=self.model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps(body),
+                )
+                for event in response["body"]:
+                    if stop.is_set():
+                        break
+                    if "chunk" in event:
+                        chunk = json.loads(event["chunk"]["bytes"])
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+
+        loop.run_in_executor(self._executor, pump)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout or self.timeout)
+                except asyncio.TimeoutError as e:
+                    raise LLMTimeoutError(
+                        f"Bedrock stream stalled for {timeout or self.timeout}s"
+                    ) from e
+                if item is _STREAM_END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                for choice in item.get("choices", []):
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        yield text
+                metrics = item.get("amazon-bedrock-invocationMetrics")
+                if metrics:
+                    usage.update(metrics)
+                    used = metrics.get("inputTokenCount", 0) + metrics.get("outputTokenCount", 0)
+                    self.scheduler.settle(est_tokens, used)
+        finally:
+            stop.set()
+
+    def _cache_key(
+        self,
+        messages: list[dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        cache: bool | None,
+    ) -> str | None:
+        if self.cache is None or not self.cache.applies(temperature, cache):
+            return None
+        return cache_key(self.model_id, messages, temperature, max_tokens)
+
+    def _observe(
+        self,
+        lane: str,
+        mode: str,
+        outcome: str,
+        start: float,
+        span: Any,
+        retries: int,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+    ) -> None:
+        LLM_CALLS.labels(lane, mode, outcome).observe(time.perf_counter() - start)
+        LLM_TOKENS.labels(lane, "input").inc(input_tokens)
+        LLM_TOKENS.labels(lane, "output").inc(output_tokens)
+        span.set_attribute("llm.retries", retries)
+        span.set_attribute("llm.input_tokens", input_tokens)
+        span.set_attribute("llm.output_tokens", output_tokens)
+
+    async def _backoff(self, e: Exception, attempt: int) -> None:
+        """Sleep before retrying a throttled call, re-raise anything else."""
+        if not is_throttle(e):
+            raise e
+        self.scheduler.throttled += 1
+        if attempt >= self.max_retries:
+            raise e
+        self.scheduler.retries += 1
+        cap = min(self.backoff_cap, self.backoff_base * 2**attempt)
+        await asyncio.sleep(random.uniform(0, cap))
+
+    async def _run(self, body: dict[str, Any], timeout: float | None) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._invoke_sync, body)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError as e:
+            raise LLMTimeoutError(
+                f"Bedrock call exceeded {timeout or self.timeout}s"
+            ) from e
+
+    async def complete(self, prompt: str, system_prompt: str = "", **kwargs: Any) -> str:
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return await self.invoke(messages, **kwargs)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,446 @@
+"""
+End-to-end negotiation load test against local stand-ins.
+
+Runs the real API (uvicorn main:app) against fake_bedrock.py and an
+in-process fake_mail.py SMTP/IMAP server whose supplier bots answer every
+email, in a scratch `loadtest` schema (the live tables are not touched).
+For each level it starts negotiations covering that many supplier threads,
+waits until every thread has had its opening email and `--rounds` replies
+answered, and records:
+
+- opening latency (`/negotiate` called -> first email at the supplier)
+- turn latency (supplier reply in the mailbox -> the agent's next email)
+- model calls per turn, and database queries and time per turn in the API
+- connection wait and event loop lag in the API process
+
+The report is written as JSON; `--compare` prints the change against an
+earlier report and flags regressions beyond `--tolerance`.
+
+    python loadtest.py                                   # 10, 100 and 1000 threads
+    python loadtest.py --threads 100 --report after.json --compare before.json
+    python loadtest.py --threads 50 --bedrock-latency 2 --bedrock-rpm 600 --bots llm
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+import asyncpg
+from dotenv import load_dotenv
+
+from fake_mail import FakeMail
+
+SCHEMA = "loadtest"
+BUYER = "buyer@loadtest.test"
+HOST = "127.0.0.1"
+BACKEND_DIR = Path(__file__).parent
+# Lower is better for all of these; they are what --compare checks.
+COMPARED = (
+    "opening_p50_s",
+    "opening_p95_s",
+    "turn_p50_s",
+    "turn_p95_s",
+    "turn_p99_s",
+    "llm_calls_per_turn",
+    "db_queries_per_turn",
+    "db_time_per_turn_ms",
+    "pool_wait_p95_s",
+    "loop_lag_p99_s",
+)
+
+
+def scoped_url(url: str, schema: str) -> str:
+    """DB_URL with `search_path` set; asyncpg passes unknown DSN parameters as settings."""
+    parts = urlsplit(url)
+    query = "&".join(filter(None, [parts.query, urlencode({"search_path": f"{schema},public"})]))
+    return urlunsplit(parts._replace(query=query))
+
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+
+async def http(method: str, url: str, body: dict | None = None) -> dict:
+    def call() -> dict:
+        request = urllib.request.Request(
+            url,
+            method=method,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=120) as response:
+            return json.loads(response.read())
+
+    return await asyncio.to_thread(call)
+
+
+async def wait_healthy(url: str, process: asyncio.subprocess.Process, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.returncode is not None:
+            raise RuntimeError(f"{url} exited with {process.returncode}; see the log directory")
+        try:
+            await http("GET", url)
+            return
+        except OSError:
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+class Threads:
+    """Per supplier thread: when the agent's next email is due and how long it took."""
+
+    def __init__(self, rounds: int) -> None:
+        self.rounds = rounds
+        self.waiting_since: dict[str, float] = {}
+        self.emails: dict[str, int] = {}
+        self.opening: list[float] = []
+        self.turns: list[float] = []
+        self.done = asyncio.Event()
+        self.expected = 0
+
+    def expect(self, addresses: list[str], since: float) -> None:
+        for address in addresses:
+            self.waiting_since[address] = since
+            self.emails[address] = 0
+        self.expected += len(addresses)
+
+    def received(self, address: str, message: EmailMessage) -> None:
+        since = self.waiting_since.pop(address, None)
+        if since is None:
+            return
+        latency = time.monotonic() - since
+        (self.turns if self.emails[address] else self.opening).append(latency)
+        self.emails[address] += 1
+        if self.complete == self.expected:
+            self.done.set()
+
+    def replied(self, address: str) -> None:
+        self.waiting_since[address] = time.monotonic()
+
+    @property
+    def complete(self) -> int:
+        return sum(1 for count in self.emails.values() if count > self.rounds)
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.url = scoped_url(os.environ["DB_URL"], SCHEMA)
+        self.api = f"http://{HOST}:{args.api_port}"
+        self.bedrock = f"http://{HOST}:{args.bedrock_port}"
+        self.log_dir = Path(args.log_dir)
+        self.processes: list[asyncio.subprocess.Process] = []
+
+    def env(self) -> dict[str, str]:
+        args = self.args
+        return {
+            **os.environ,
+            "DB_URL": self.url,
+            "MIGRATE_ON_STARTUP": "1",
+            "BEDROCK_ENDPOINT_URL": self.bedrock,
+            "BEDROCK_RPM": str(args.bedrock_rpm),
+            "BEDROCK_TPM": str(args.bedrock_rpm * 10_000),
+            "AWS_ACCESS_KEY_ID": os.environ.get("AWS_ACCESS_KEY_ID", "loadtest"),
+            "AWS_SECRET_ACCESS_KEY": os.environ.get("AWS_SECRET_ACCESS_KEY", "loadtest"),
+            "LLM_CACHE": "off",
+            "FAKE_BEDROCK_LATENCY": str(args.bedrock_latency),
+            "FAKE_BEDROCK_RPM": str(args.bedrock_rpm),
+            "FAKE_BEDROCK_THROTTLE_RATE": str(args.throttle_rate),
+            "EMAIL_ADDRESS": BUYER,
+            "EMAIL_PASSWORD": "loadtest",
+            "SMTP_HOST": HOST,
+            "SMTP_PORT": str(args.smtp_port),
+            "SMTP_STARTTLS": "0",
+            "SMTP_AUTH": "0",
+            "IMAP_HOST": HOST,
+            "IMAP_PORT": str(args.imap_port),
+            "IMAP_SSL": "0",
+            "EMBEDDED_WORKER_CONCURRENCY": str(args.worker_concurrency),
+            # Every level is started at once; measure the pipeline, not admission.
+            "MAX_ACTIVE_NEGOTIATIONS": "0",
+            "TENANT_MAX_ACTIVE_NEGOTIATIONS": "0",
+            "MAX_PENDING_TURNS": "0",
+            "TENANT_MAX_PENDING_TURNS": "0",
+            "TENANT_MAX_RUNNING_TURNS": "0",
+        }
+
+    async def spawn(self, name: str, *command: str) -> asyncio.subprocess.Process:
+        log = open(self.log_dir / f"{name}.log", "ab")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, *command, cwd=BACKEND_DIR, env=self.env(), stdout=log, stderr=log
+        )
+        self.processes.append(process)
+        return process
+
+    async def stop_processes(self) -> None:
+        for process in self.processes:
+            if process.returncode is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                await asyncio.wait_for(process.wait(), 15)
+            except asyncio.TimeoutError:
+                process.kill()
+        self.processes = []
+
+    async def serve(self, name: str, app: str, port: int) -> asyncio.subprocess.Process:
+        return await self.spawn(
+            name, "-m", "uvicorn", app, f"--host={HOST}", f"--port={port}", "--log-level=warning"
+        )
+
+    async def start_stack(self) -> None:
+        """Fresh fake Bedrock, API and workers, so every level starts from zero."""
+        args = self.args
+        bedrock = await self.serve("fake_bedrock", "fake_bedrock:app", args.bedrock_port)
+        await wait_healthy(f"{self.bedrock}/stats", bedrock, 30)
+        api = await self.serve("api", "main:app", args.api_port)
+        await wait_healthy(f"{self.api}/health", api, 60)
+        for i in range(args.workers):
+            await self.spawn(
+                f"worker-{i}", "worker.py", "--concurrency", str(args.worker_concurrency)
+            )
+
+    async def seed(self, count: int) -> list[tuple[str, str]]:
+        """(supplier_id, address) pairs, one supplier and mail domain per thread."""
+        suppliers = [
+            (f"lt-sup-{i:05d}", f"sales@lt-sup-{i:05d}.test") for i in range(1, count + 1)
+        ]
+        conn = await asyncpg.connect(self.url)
+        try:
+            await conn.executemany(
+                """
+                INSERT INTO supplier (supplier_id, supplier_name, email, insights)
+                VALUES ($1, $1, $2, 'Load test supplier; concedes a few percent per round.')
+                ON CONFLICT (supplier_id) DO NOTHING
+                """,
+                suppliers,
+            )
+        finally:
+            await conn.close()
+        return suppliers
+
+    async def metrics(self) -> dict:
+        llm, database, runtime, bedrock = await asyncio.gather(
+            http("GET", f"{self.api}/llm/metrics"),
+            http("GET", f"{self.api}/db/metrics"),
+            http("GET", f"{self.api}/runtime/metrics"),
+            http("GET", f"{self.bedrock}/stats"),
+        )
+        return {"llm": llm, "db": database, "runtime": runtime, "bedrock": bedrock}
+
+    async def failed_jobs(self) -> int:
+        conn = await asyncpg.connect(self.url)
+        try:
+            return await conn.fetchval("SELECT count(*) FROM agent_job WHERE status = 'failed'")
+        finally:
+            await conn.close()
+
+    async def run_level(self, threads: int, suppliers: list[tuple[str, str]], mail: FakeMail):
+        args = self.args
+        state = Threads(args.rounds)
+        mail.bots.clear()
+        mail.on_received = state.received
+        mail.on_replied = state.replied
+        failed_before = await self.failed_jobs()
+        before = await self.metrics()
+
+        per = args.suppliers_per_negotiation
+        groups = [suppliers[i : i + per] for i in range(0, threads, per)]
+        negotiate_latency: list[float] = []
+        gate = asyncio.Semaphore(args.request_concurrency)
+
+        async def negotiate(group: list[tuple[str, str]]) -> None:
+            async with gate:
+                start = time.monotonic()
+                # Before the request: a fast worker can email before it returns.
+                state.expect([address for _, address in group], start)
+                await http(
+                    "POST",
+                    f"{self.api}/negotiate",
+                    {
+                        "product": "Espresso Machine",
+                        "prompt": "Buy 5,000 units at the lowest unit price.",
+                        "tactics": "Play suppliers against each other.",
+                        "suppliers": [sup_id for sup_id, _ in group],
+                    },
+                )
+                negotiate_latency.append(time.monotonic() - start)
+
+        started = time.monotonic()
+        await asyncio.gather(*(negotiate(group) for group in groups))
+        try:
+            await asyncio.wait_for(state.done.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            print(f"  timed out with {state.complete}/{threads} threads complete")
+        duration = time.monotonic() - started
+        after = await self.metrics()
+
+        turns = len(state.opening) + len(state.turns)
+        llm_calls = after["bedrock"]["calls"] - before["bedrock"]["calls"]
+        queries = after["db"]["queries"] - before["db"]["queries"]
+        db_time = after["db"]["query_time_s"] - before["db"]["query_time_s"]
+        return {
+            "threads": threads,
+            "negotiations": len(groups),
+            "complete_threads": state.complete,
+            "turns": turns,
+            "duration_s": duration,
+            "turns_per_s": turns / duration if duration else 0.0,
+            "negotiate_p50_s": percentile(negotiate_latency, 0.50),
+            "negotiate_p95_s": percentile(negotiate_latency, 0.95),
+            "opening_p50_s": percentile(state.opening, 0.50),
+            "opening_p95_s": percentile(state.opening, 0.95),
+            "turn_p50_s": percentile(state.turns, 0.50),
+            "turn_p95_s": percentile(state.turns, 0.95),
+            "turn_p99_s": percentile(state.turns, 0.99),
+            "turn_mean_s": statistics.fmean(state.turns) if state.turns else 0.0,
+            "llm_calls_per_turn": llm_calls / turns if turns else 0.0,
+            "llm_throttled": after["bedrock"]["throttled"] - before["bedrock"]["throttled"],
+            "db_queries_per_turn": queries / turns if turns else 0.0,
+            "db_time_per_turn_ms": db_time * 1000 / turns if turns else 0.0,
+            "pool_wait_p95_s": after["db"]["wait_p95_s"],
+            "pool_acquire_timeouts": after["db"]["acquire_timeouts"]
+            - before["db"]["acquire_timeouts"],
+            "loop_lag_p99_s": after["runtime"]["loop"]["lag_p99_s"],
+            "loop_lag_max_s": after["runtime"]["loop"]["lag_max_s"],
+            "failed_jobs": await self.failed_jobs() - failed_before,
+        }
+
+    async def run(self) -> dict:
+        args = self.args
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        conn = await asyncpg.connect(os.environ["DB_URL"])
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+        await conn.close()
+
+        client = None
+        if args.bots == "llm":
+            from config import build_llm
+
+            client = build_llm()
+        mail = FakeMail(args.rounds, tuple(args.reply_delay), client)
+        await mail.start(HOST, args.smtp_port, args.imap_port)
+        levels = []
+        try:
+            for threads in args.threads:
+                print(f"\n{threads} supplier threads")
+                await self.start_stack()
+                try:
+                    suppliers = await self.seed(threads)
+                    level = await self.run_level(threads, suppliers, mail)
+                finally:
+                    await self.stop_processes()
+                levels.append(level)
+                print(format_level(level))
+        finally:
+            await mail.stop()
+            if client is not None:
+                client.close()
+            if not args.keep:
+                conn = await asyncpg.connect(os.environ["DB_URL"])
+                await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                await conn.close()
+        return {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "settings": {
+                key: value for key, value in vars(args).items() if key not in ("compare", "report")
+            },
+            "levels": levels,
+        }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_level(level: dict) -> str:
+    return "\n".join(
+        f"  {key:<24} {value:12.4f}" if isinstance(value, float) else f"  {key:<24} {value:12}"
+        for key, value in level.items()
+    )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print each compared metric next to the baseline; return the regressions."""
+    regressions = []
+    previous = {level["threads"]: level for level in baseline["levels"]}
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} ({baseline['created_at']}):")
+    for level in report["levels"]:
+        old = previous.get(level["threads"])
+        if old is None:
+            continue
+        print(f"\n{level['threads']} supplier threads")
+        for key in COMPARED:
+            before, after = old.get(key), level[key]
+            if not before:
+                continue
+            change = (after - before) / before
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{level['threads']} threads: {key} {change:+.0%}")
+            print(f"  {key:<24} {before:10.4f} -> {after:10.4f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--suppliers-per-negotiation", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3, help="supplier replies per thread")
+    parser.add_argument("--reply-delay", type=float, nargs=2, default=(0.1, 0.5))
+    parser.add_argument("--bots", choices=("rule", "llm"), default="rule")
+    parser.add_argument("--bedrock-latency", type=float, default=0.5)
+    parser.add_argument("--bedrock-rpm", type=float, default=100_000)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--worker-concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=0, help="extra worker.py processes")
+    parser.add_argument("--request-concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=900, help="seconds per level")
+    parser.add_argument("--api-port", type=int, default=8200)
+    parser.add_argument("--bedrock-port", type=int, default=8300)
+    parser.add_argument("--smtp-port", type=int, default=2525)
+    parser.add_argument("--imap-port", type=int, default=2143)
+    parser.add_argument("--log-dir", default="loadtest-logs")
+    parser.add_argument("--report", default="loadtest-report.json")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--keep", action="store_true", help="keep the loadtest schema")
+    args = parser.parse_args()
+
+    load_dotenv()
+    report = await LoadTest(args).run()
+    Path(args.report).write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {args.report}")
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            sys.exit("Regressions: " + "; ".join(regressions))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
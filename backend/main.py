@@ -1,65 +1,161 @@
+import asyncio
 import json
 import os
 import uuid
 from contextlib import asynccontextmanager
+from datetime import datetime
 from typing import Any
 
-from dotenv import load_dotenv
 from pydantic import BaseModel
-from fastapi import HTTPException, FastAPI
+from fastapi import Depends, Header, HTTPException, FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import asyncpg
-import boto3
 
 # Local imports
+from config import (
+    ADMISSION_LIMITS,
+    DATABASE_URL,
+    EMAIL_ADDRESS,
+    EMAIL_PASSWORD,
+    EMBEDDED_WORKER_CONCURRENCY,
+    EXPORT_DATABASE_URL,
+    EXPORT_MAX_CONCURRENT,
+    MIGRATE_ON_STARTUP,
+    FRONTEND_ORIGINS,
+    NEGOTIATOR_AGENT_SYSTEM_PROMPT,
+    SESSION_CACHE_SIZE,
+    SESSION_IDLE_TIMEOUT,
+    TENANT_API_KEYS,
+    build_llm,
+    create_db_pool,
+)
+import db
+from admission import AdmissionController, AdmissionRejected, tenant_for_key
+from db import DatabasePool, PoolTimeoutError, QueryTimeoutError
 from email_client import EmailClient
-from agents import NegotiationAgent, OrchestratorAgent
-from router import EmailEventRouter, NegotiationSession
-
-load_dotenv()
-
-DATABASE_URL = os.environ["DB_URL"]
-AWS_REGION = os.environ.get("AWS_REGION", "eu-west-1")
-FRONTEND_ORIGINS = os.environ.get("FRONTEND_ORIGINS", "")
-
-NEGOTIATOR_AGENT_SYSTEM_PROMPT = """
-You are a skilled negotation agent representing a buyer in a procurment process. Your goal is to win the best possible deal for the
-the company. While your are negotiating an Supervisor agent is monetoring your progress and giving you new 
-instructions every new step of the negotiation. Follow their instructions carefully and adapt your strategy accordingly
-Further instructions might be provided following this. Make sure to follow them closely.
-"""
-
-OCHESTRATOR_AGENT_SYSTEM_PROMPT = """
-Your are a negotiationg orchestration agent. The company you are are working for is looking to procure a product. Your goal is to 
-be a consultant to other agents each responsible for one particular supplier of that product.
-You will have to follow the main instructions given to you and when asked to reflect them also in the advice you 
-give to the other agents.
-Make sure to gain understanding of the overall negotiation progress and give strategic advice to the other agents when asked.
-You might want to give them information about the progress of other agents as well as additional instructions. Use this to guide
-their behavior and if requested by the user make smart decisions on how to reduce to overall price of the product through clever
-negotiation tactics advice to the other agents, which might include the recommendation to present the supplier with a  
-competing offer from another supplier that your agents are alo negotiating with.
-"""
-
-bedrock_client = boto3.client("bedrock-runtime", region_name=AWS_REGION)
-
-pool: asyncpg.Pool | None = None
+from catalog import CatalogCache
+from events import NegotiationEventBus
+from export import FORMATS, ExportFilter, Exporter, parse_cursor
+from inbox import InboxListener
+from jobs import JobWorker, enqueue
+from migrate import migrate
+from monitor import LoopLagMonitor
+from queries import (
+    CONVERSATION_AFTER_QUERY,
+    CONVERSATION_QUERY,
+    NEGOTIATION_STATUS_QUERY,
+    negotiation_list_query,
+)
+from responses import OrjsonResponse
+from search import search_products
+from streams import TokenStreamHub
+from telemetry import MetricsMiddleware, metrics_body, register_gauges, setup_tracing
+from sessions import ACTIVE_STATUSES, SessionRegistry
+from worker import TurnRunner
+
+llm = build_llm()
+llm_scheduler = llm.scheduler
+
+pool: DatabasePool | None = None
 # --- Initialize Email Client ---
-email_client = EmailClient()
-email_router = EmailEventRouter()
-active_sessions: dict[str, NegotiationSession] = {}
+email_client = EmailClient(EMAIL_ADDRESS, EMAIL_PASSWORD)
+inbox: InboxListener | None = None
+active_sessions = SessionRegistry(SESSION_CACHE_SIZE, SESSION_IDLE_TIMEOUT)
+background_tasks: set[asyncio.Task] = set()
+token_streams = TokenStreamHub()
+event_bus = NegotiationEventBus(DATABASE_URL)
+catalog = CatalogCache(DATABASE_URL)
+loop_monitor = LoopLagMonitor()
+admission = AdmissionController(ADMISSION_LIMITS, llm_scheduler, email_client)
+exporter = Exporter(EXPORT_DATABASE_URL, EXPORT_MAX_CONCURRENT)
+
+register_gauges(
+    db_pool_size=lambda: pool.get_size() if pool else 0,
+    db_pool_idle=lambda: pool.get_idle_size() if pool else 0,
+    db_pool_max_size=lambda: pool.get_max_size() if pool else 0,
+    db_pool_waiting=lambda: pool.stats.waiting if pool else 0,
+    llm_in_flight=lambda: llm_scheduler.in_flight,
+    llm_queue_depth=lambda: llm_scheduler.metrics()["queue_depth"],
+    outbox_queue_depth=lambda: email_client.outbox.pending if email_client.outbox else 0,
+    active_sessions=lambda: len(active_sessions),
+)
+
+
+def on_supplier_email(ng_id: str, sup_id: str) -> None:
+    session = active_sessions.peek(ng_id)
+    if session is not None:
+        session.invalidate_advice()
+
+
+def on_negotiation_event(ng_id: str, event: dict[str, Any]) -> None:
+    # A finished negotiation gets no more turns; free its session now
+    # rather than when it ages out.
+    if event["type"] == "status.changed" and event["data"]["status"] not in ACTIVE_STATUSES:
+        active_sessions.remove(ng_id)
+
+
+async def start_inbox(email: str, password: str) -> None:
+    """(Re)start the IDLE listener for the logged-in mailbox."""
+    global inbox
+    if inbox is not None:
+        await inbox.stop()
+    inbox = InboxListener(await get_pool(), email, password, on_delivered=on_supplier_email)
+    inbox.start()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global pool
-    pool = await asyncpg.create_pool(DATABASE_URL)
+    setup_tracing("negotiation-api")
+    loop_monitor.start()
+    pool = await create_db_pool()
+    if MIGRATE_ON_STARTUP:
+        for name in await migrate(pool):
+            print(f"Applied migration {name}")
+    if llm.cache:
+        llm.cache.attach(pool)
+    email_client.attach(pool)
+    event_bus.on_event = on_negotiation_event
+    await event_bus.start(pool)
+    active_sessions.start()
+    await catalog.start(pool)
+    if EMBEDDED_WORKER_CONCURRENCY > 0:
+        # Turns started here stream tokens to /stream; sessions are shared
+        # with the status events through active_sessions.
+        runner = TurnRunner(
+            pool, llm, catalog, email_client, active_sessions, token_streams
+        )
+        worker = JobWorker(
+            pool,
+            DATABASE_URL,
+            runner,
+            concurrency=EMBEDDED_WORKER_CONCURRENCY,
+            tenant_max_running=ADMISSION_LIMITS.tenant_max_running_turns,
+        )
+        run_in_background(worker.run())
+    if email_client.email and email_client.password:
+        await start_inbox(email_client.email, email_client.password)
     yield
+    if inbox is not None:
+        await inbox.stop()
+    await email_client.close()
+    for task in background_tasks:
+        task.cancel()
+    await catalog.stop()
+    await event_bus.stop()
+    await active_sessions.stop()
+    llm.close()
     if pool:
         await pool.close()
+    await loop_monitor.stop()
 
 
-app = FastAPI(title="Health API", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="Health API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse,
+)
 
 allowed_origins = [
     origin.strip() for origin in FRONTEND_ORIGINS.split(",") if origin.strip()
@@ -85,81 +181,130 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+# Added last so it wraps CORS too and times every request.
+app.add_middleware(MetricsMiddleware)
 
 
-async def get_pool() -> asyncpg.Pool:
+async def get_pool() -> DatabasePool:
     if pool is None:
         raise RuntimeError("Database pool not initialized")
     return pool
 
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_handler(request: Request, exc: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(QueryTimeoutError)
+async def query_timeout_handler(request: Request, exc: QueryTimeoutError) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
 @app.get("/health")
 async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
-@app.get("/suppliers")
-async def list_suppliers() -> list[dict[str, Any]]:
-    db = await get_pool()
-    rows = await db.fetch("SELECT * FROM supplier")
-    return [dict(row) for row in rows]
+@app.get("/llm/metrics")
+async def llm_metrics() -> dict[str, Any]:
+    metrics = llm_scheduler.metrics()
+    if llm.cache:
+        metrics["cache"] = llm.cache.metrics()
+    return metrics
 
 
-@app.get("/products")
-async def list_products() -> list[dict[str, Any]]:
-    db = await get_pool()
-    rows = await db.fetch("SELECT * FROM product")
-    return [dict(row) for row in rows]
+@app.get("/db/metrics")
+async def db_metrics() -> dict[str, Any]:
+    """Pool size, connection wait times and prepared statement counters."""
+    return (await get_pool()).metrics()
 
 
-@app.get("/search")
-async def search_items(product: str) -> list[dict[str, Any]]:
-    db = await get_pool()
-    rows = await db.fetch(
-        "SELECT * FROM product WHERE product_name ILIKE $1", f"%{product}%"
-    )
-    return [dict(row) for row in rows]
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Prometheus exposition of the HTTP, DB, LLM, email and loop histograms."""
+    body, content_type = metrics_body()
+    return Response(content=body, media_type=content_type)
+
+
+def request_tenant(x_api_key: str | None = Header(None)) -> str:
+    """The caller's tenant, from its API key rather than anything it can just claim."""
+    tenant = tenant_for_key(TENANT_API_KEYS, x_api_key)
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Unknown or missing X-API-Key")
+    return tenant
+
 
+@app.get("/admin/admission", dependencies=[Depends(request_tenant)])
+async def admission_status() -> dict[str, Any]:
+    """Admission limits, backlog per tenant, LLM and outbox queues, rejections."""
+    return await admission.status(await get_pool())
 
-def call_bedrock(prompt: str, system_prompt: str = "") -> str:
-    """Call Amazon Bedrock gpt-oss-120b model and return response text."""
-    messages = [{"role": "user", "content": prompt}]
-    if system_prompt:
-        messages.insert(0, {"role": "system", "content": system_prompt})
 
-    body = {
-        "messages": messages,
-        "max_tokens": 1024,
-        "temperature": 0.7,
+@app.get("/runtime/metrics")
+async def runtime_metrics() -> dict[str, Any]:
+    """Event loop lag, in-process session counts and sizes, running exports."""
+    return {
+        "loop": loop_monitor.metrics(),
+        "active_sessions": len(active_sessions),
+        "sessions": active_sessions.metrics(),
+        "background_tasks": len(background_tasks),
+        "exports": exporter.metrics(),
     }
 
-    try:
-        response = bedrock_client.invoke_model(
-            modelId="openai.gpt-oss-120b-1:0",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(body),
-        )
-    except Exception as e:
-        return f"Bedrock service is currently unavailable. {e}"
 
-    result = json.loads(response["body"].read())
-    return result["choices"][0]["message"]["content"]
+def catalog_response(table: str, request: Request) -> Response:
+    snapshot = catalog.snapshot(table)
+    # no-cache makes browsers revalidate with If-None-Match on every fetch
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+@app.get("/suppliers")
+async def list_suppliers(request: Request) -> Response:
+    return catalog_response("supplier", request)
+
 
+@app.get("/suppliers/{supplier_id}")
+async def get_supplier(supplier_id: str) -> dict[str, Any]:
+    supplier = catalog.supplier(supplier_id)
+    if supplier is None:
+        raise HTTPException(status_code=404, detail="Supplier not found")
+    return supplier
 
-# FIXED SYNTAX ERROR HERE
-async def crate_negotiation_agent(supplier_id: str, tactics: str, product: str) -> str:
-    db = await get_pool()
-    row = await db.fetch(
-        "SELECT * FROM supplier WHERE supplier_name = $1 LIMIT 1", supplier_id
+
+@app.get("/products")
+async def list_products(request: Request) -> Response:
+    return catalog_response("product", request)
+
+
+SEARCH_LIMIT_MAX = 200
+
+
+@app.get("/search")
+async def search_items(
+    product: str, limit: int = 50, include_supplier: bool = True
+) -> Response:
+    """Fuzzy product search ranked by trigram word similarity."""
+    if not product.strip():
+        return OrjsonResponse([])
+    rows = await search_products(
+        await get_pool(), product, max(1, min(limit, SEARCH_LIMIT_MAX)), include_supplier
     )
-    if not row:
-        return ""
-    insights = row[0]["insights"]
-    prompt = f"""
-    Negotiate for {product} with tactics {tactics}. Insights: {insights}
-    """
-    return prompt
+    return OrjsonResponse(rows)
 
 
 # --- NEW EMAIL ENDPOINTS ---
@@ -177,9 +322,18 @@ async def email_login_endpoint(creds: LoginRequest):
     """
     try:
         await email_client.email_login(creds.email, creds.password)
-        return {"status": "success", "message": "Logged in successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await start_inbox(creds.email, creds.password)
+    return {"status": "success", "message": "Logged in successfully"}
+
+
+@app.get("/email/inbox")
+async def email_inbox_status() -> dict[str, Any]:
+    """Progress of the inbound mail listener."""
+    if inbox is None:
+        return {"status": "not listening"}
+    return {"status": "listening", **inbox.metrics()}
 
 
 class SendEmailRequest(BaseModel):
@@ -191,15 +345,22 @@ class SendEmailRequest(BaseModel):
 @app.post("/email/send")
 async def email_send_endpoint(req: SendEmailRequest):
     """
-    Exposed endpoint to send emails using logged in credentials.
+    Queue an email from the logged in account; returns once it is queued.
     """
+    admission.admit_email()
     try:
-        await email_client.email_send(req.to_email, req.subject, req.body)
-        return {"status": "success"}
+        message_id = await email_client.email_send(req.to_email, req.subject, req.body)
+        return {"status": "queued", "message_id": message_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/email/outbox")
+async def email_outbox_status() -> dict[str, Any]:
+    """Send queue depth and delivery counters."""
+    return email_client.metrics()
+
+
 # ---------------------------
 
 
@@ -210,138 +371,323 @@ class NegotiationRequest(BaseModel):
     suppliers: list[str]
 
 
-@app.post("/negotiate")
-async def trigger_negotiations(request: NegotiationRequest) -> dict[str, Any]:
-    db = await get_pool()
-
-    ng_id = str(uuid.uuid4())
-
-    # Save negotiation to DB
-    await db.execute(
-        """
-        INSERT INTO negotiation (ng_id, product, strategy, status)
-        VALUES ($1, $2, $3, 'active')
-        """,
-        ng_id,
-        request.product,
-        request.tactics,
-    )
+def run_in_background(coro) -> asyncio.Task:
+    """Start `coro` without awaiting it, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
 
-    orchestrator = OrchestratorAgent(
-        client=bedrock_client,
-        strategy=request.tactics,
-        product=request.product,
-        sys_promt=OCHESTRATOR_AGENT_SYSTEM_PROMPT,
-        db_pool=db,
-        ng_id=ng_id,
-    )
+    def done(task: asyncio.Task) -> None:
+        background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Background task failed: {task.exception()!r}")
 
-    # Create a session to manage this negotiation
-    session = NegotiationSession(
-        db_pool=db,
-        client=bedrock_client,
-        ng_id=ng_id,
-        orchestrator=orchestrator,
-        router=email_router,
-    )
+    task.add_done_callback(done)
+    return task
 
-    for supplier in request.suppliers:
-        # Save negotiator agent to DB
-        await db.execute(
-            """
-            INSERT INTO agent (ng_id, sup_id, sys_prompt, role)
-            VALUES ($1, $2, $3, 'negotiator')
-            """,
-            ng_id,
-            supplier,
-            NEGOTIATOR_AGENT_SYSTEM_PROMPT,
-        )
 
-        agent = NegotiationAgent(
-            db_pool=db,
-            sys_prompt=NEGOTIATOR_AGENT_SYSTEM_PROMPT,
-            ng_id=ng_id,
-            sup_id=supplier,
-            client=bedrock_client,
-            product=request.product,
-        )
-        # Register agent with session - this sets up the email handler
-        session.add_agent(supplier, agent)
+@app.post("/negotiate")
+async def trigger_negotiations(
+    request: NegotiationRequest, tenant: str = Depends(request_tenant)
+) -> dict[str, Any]:
+    pool = await get_pool()
 
-    # Store session for later reference
-    active_sessions[ng_id] = session
+    ng_id = str(uuid.uuid4())
+    suppliers = list(dict.fromkeys(request.suppliers))
+
+    # Negotiation, agent rows and the opening turns in one transaction, so a
+    # negotiation is never recorded without its work queued. Admission is
+    # checked in the same transaction; a rejection rolls it back (429).
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await admission.admit_negotiation(conn, tenant, len(suppliers))
+            await conn.execute(
+                """
+                INSERT INTO negotiation (ng_id, product, strategy, status, tenant)
+                VALUES ($1, $2, $3, 'active', $4)
+                """,
+                ng_id,
+                request.product,
+                request.tactics,
+                tenant,
+            )
+            await conn.execute(
+                """
+                INSERT INTO agent (ng_id, sup_id, sys_prompt, role)
+                SELECT $1, sup_id, $3, 'negotiator' FROM unnest($2::text[]) AS sup_id
+                """,
+                ng_id,
+                suppliers,
+                NEGOTIATOR_AGENT_SYSTEM_PROMPT,
+            )
+            # Opening emails are drafted by whichever worker claims them;
+            # progress arrives on /events.
+            await enqueue(conn, ng_id, suppliers, "opening")
 
     return {
         "negotiation_id": ng_id,
         "status": "started",
-        "suppliers": request.suppliers,
+        "suppliers": suppliers,
     }
 
 
+CONVERSATION_PAGE_MAX = 500
+
+
+def parse_keyset_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Split a pagination cursor of the form `<created_at>,<uuid>`."""
+    try:
+        created_at, row_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
 @app.get("/conversation/{negotiation_id}/{supplier_id}")
-async def get_conversation(negotiation_id: str, supplier_id: str) -> dict[str, Any]:
-    db = await get_pool()
+async def get_conversation(
+    negotiation_id: str,
+    supplier_id: str,
+    after: str | None = None,
+    limit: int = 100,
+) -> Response:
+    """
+    One page of a supplier thread in chronological order.
+
+    Pass the returned `next_cursor` as `after` to get the next page or,
+    once `has_more` is false, only messages added since.
+    """
+    limit = max(1, min(limit, CONVERSATION_PAGE_MAX))
+    pool = await get_pool()
     try:
-        # Try with negotiation_id first
-        messages = await db.fetch(
-            "SELECT * FROM message WHERE negotiation_id = $1 AND supplier_id = $2 ORDER BY created_at ASC, timestamp ASC",
-            negotiation_id,
-            supplier_id,
-        )
-        # If no results, try with ng_id
-        if not messages:
+        if after:
+            created_at, message_id = parse_keyset_cursor(after)
             messages = await db.fetch(
-                "SELECT * FROM message WHERE ng_id = $1 AND supplier_id = $2 ORDER BY created_at ASC, timestamp ASC",
+                pool,
+                CONVERSATION_AFTER_QUERY,
                 negotiation_id,
                 supplier_id,
+                created_at,
+                message_id,
+                limit,
             )
-        return {"message": [dict(message) for message in messages]}
+        else:
+            messages = await db.fetch(
+                pool,
+                CONVERSATION_QUERY,
+                negotiation_id,
+                supplier_id,
+                limit,
+            )
+    except (HTTPException, PoolTimeoutError, QueryTimeoutError):
+        raise
     except Exception as e:
         print(f"Error fetching conversation: {e}")
         import traceback
         traceback.print_exc()
-        return {"message": []}
+        return OrjsonResponse({"message": [], "next_cursor": after, "has_more": False})
+
+    next_cursor = after
+    if messages:
+        last = messages[-1]
+        next_cursor = f"{last['created_at'].isoformat()},{last['message_id']}"
+    # Records are encoded directly; see responses.py.
+    return OrjsonResponse(
+        {
+            "message": messages,
+            "next_cursor": next_cursor,
+            "has_more": len(messages) == limit,
+        }
+    )
+
+
+@app.get("/events/{negotiation_id}")
+async def negotiation_events(
+    negotiation_id: str, request: Request, last_event_id: int | None = None
+) -> StreamingResponse:
+    """
+    Server-Sent Events feed of `message.created` and `status.changed` events.
+
+    Reconnecting clients send the Last-Event-ID header (EventSource does this
+    automatically) or `?last_event_id=` and receive everything after it.
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+
+    async def events():
+        yield "retry: 3000\n\n"
+        async for event in event_bus.subscribe(negotiation_id, last_event_id):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield (
+                    f"id: {event['id']}\nevent: {event['type']}\n"
+                    f"data: {json.dumps(event['data'])}\n\n"
+                )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/stream/{negotiation_id}/{supplier_id}")
+async def stream_reply(negotiation_id: str, supplier_id: str, request: Request) -> StreamingResponse:
+    """
+    Server-Sent Events feed of the negotiator's reply while it is generated.
+
+    Emits `token` events with partial text, then `done` with the id of the
+    persisted message (or `error` if generation failed). Only turns run by
+    this process's embedded worker are streamed.
+    """
+
+    async def events():
+        async for event in token_streams.subscribe(negotiation_id, supplier_id):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/negotiation_status/{negotiation_id}")
 async def negotiation_status(negotiation_id: str) -> dict[str, Any]:
-    db = await get_pool()
-    rows = await db.fetch("SELECT * FROM agent WHERE ng_id = $1", negotiation_id)
+    """
+    Per-supplier progress for one negotiation.
 
-    response = []
-    for row in rows:
-        messages = await db.fetch(
-            "SELECT * FROM message WHERE ng_id = $1 AND supplier_id = $2",
-            negotiation_id,
-            row["sup_id"],
-        )
-        response.append(
-            {
-                "supplier_id": str(row["sup_id"]),
-                "message_count": len(messages),
-            }
-        )
+    Reads the summary columns maintained on `agent` by the message trigger
+    (migrations/0003_agent_summary.sql), so the cost does not grow with
+    transcript length.
+    `latest_offer` is the start of the supplier's most recent email and
+    `best_offer` the lowest unit price parsed into the offer ledger.
+    """
+    rows = await db.fetch(await get_pool(), NEGOTIATION_STATUS_QUERY, negotiation_id)
+
+    response = [
+        {
+            "supplier_id": str(row["sup_id"]),
+            "message_count": row["message_count"],
+            "last_message_at": row["last_message_at"],
+            "last_sender": row["last_sender"],
+            "latest_offer": row["latest_offer"],
+            "best_offer": row["best_unit_price"],
+        }
+        for row in rows
+    ]
 
     return {"negotiation_id": negotiation_id, "agents": response}
 
 
+NEGOTIATION_PAGE_MAX = 200
+
+
 @app.get("/get_negotations")
-async def get_negotations() -> dict[str, Any]:
-    db = await get_pool()
-    rows = await db.fetch("SELECT * FROM negotiation")
+async def get_negotations(
+    status: str | None = None,
+    product: str | None = None,
+    before: str | None = None,
+    limit: int = 50,
+) -> Response:
+    """
+    Newest-first page of negotiations with their summary columns.
+
+    Counts come from columns maintained by
+    migrations/0006_negotiation_summary.sql, so a page is one index range
+    scan. Pass `next_cursor` back as `before` for
+    the following page.
+    """
+    limit = max(1, min(limit, NEGOTIATION_PAGE_MAX))
+    args: list[Any] = []
+    if status:
+        args.append(status)
+    if product:
+        args.append(product)
+    if before:
+        args.extend(parse_keyset_cursor(before))
+    args.append(limit)
+    query = negotiation_list_query(bool(status), bool(product), bool(before))
+    rows = await db.fetch(await get_pool(), query, *args)
 
     response = []
     for row in rows:
+        suppliers = []
+        for sup_id in row["supplier_ids"]:
+            supplier = catalog.supplier(str(sup_id)) or {}
+            suppliers.append(
+                {
+                    "supplier_id": str(sup_id),
+                    "supplier_name": supplier.get("supplier_name"),
+                }
+            )
         response.append(
             {
                 "negotiation_id": str(row["ng_id"]),
                 "product": row["product"],
                 "strategy": row["strategy"],
                 "status": row["status"],
+                "created_at": row["created_at"],
+                "supplier_count": row["supplier_count"],
+                "message_count": row["message_count"],
+                "last_message_at": row["last_message_at"],
+                "best_offer": row["best_offer"],
+                "suppliers": suppliers,
             }
         )
 
-    return {"negotiations": response}
+    next_cursor = before
+    if rows:
+        last = rows[-1]
+        next_cursor = f"{last['created_at'].isoformat()},{last['ng_id']}"
+    return OrjsonResponse(
+        {
+            "negotiations": response,
+            "next_cursor": next_cursor,
+            "has_more": len(rows) == limit,
+        }
+    )
+
+
+@app.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    status: str | None = None,
+    after: str | None = None,
+    tenant: str = Depends(request_tenant),
+) -> StreamingResponse:
+    """
+    Stream every row of `negotiations`, `messages` or `offers` for the
+    caller's negotiations matching the filters, oldest negotiation first.
+
+    Rows carry `negotiation_created_at` and `ng_id`; joined with a comma
+    they are the `after` cursor that resumes with the next negotiation.
+    """
+    try:
+        cursor = parse_cursor(after) if after else None
+        body = exporter.open(
+            dataset, format, ExportFilter(since, until, status, tenant, cursor)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        body,
+        media_type=FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{dataset}.{format}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 def main() -> None:
@@ -0,0 +1,203 @@
+"""
+Apply the versioned schema migrations in `migrations/` and check that hot
+queries are index-backed.
+
+Migrations are `NNNN_name.sql` files applied in order, each in its own
+transaction, and recorded in `schema_migration`. The API runs them at
+startup unless MIGRATE_ON_STARTUP=0.
+
+    python migrate.py                # apply pending migrations
+    python migrate.py --status       # list applied and pending migrations
+    python migrate.py --check-plans  # fail if a hot query needs a seq scan
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+import admission
+import context
+import events
+import inbox
+import jobs
+import offers
+import search
+from db import DatabasePool, Query
+from queries import (
+    CONVERSATION_AFTER_QUERY,
+    CONVERSATION_QUERY,
+    NEGOTIATION_STATUS_QUERY,
+    negotiation_list_query,
+)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+# Serializes concurrent runs, e.g. several API replicas starting at once.
+LOCK_KEY = 0x6D696772
+
+SCHEMA_MIGRATION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migration (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE.match(path.name)
+        if not match:
+            raise ValueError(f"Unexpected migration file name: {path.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), path.read_text()))
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("Duplicate migration versions")
+    return migrations
+
+
+async def migrate(db: DatabasePool | asyncpg.Pool | asyncpg.Connection) -> list[str]:
+    """Apply pending migrations and return their names."""
+    if isinstance(db, (DatabasePool, asyncpg.Pool)):
+        async with db.acquire() as conn:
+            return await migrate(conn)
+
+    await db.execute(SCHEMA_MIGRATION_SQL)
+    await db.execute("SELECT pg_advisory_lock($1)", LOCK_KEY)
+    try:
+        applied = {
+            row["version"]: row["checksum"]
+            for row in await db.fetch("SELECT version, checksum FROM schema_migration")
+        }
+        done = []
+        for migration in load_migrations():
+            if migration.version in applied:
+                if applied[migration.version] != migration.checksum:
+                    print(
+                        f"Warning: migration {migration.version:04d}_{migration.name} "
+                        "changed after it was applied"
+                    )
+                continue
+            async with db.transaction():
+                await db.execute(migration.sql)
+                await db.execute(
+                    "INSERT INTO schema_migration (version, name, checksum) VALUES ($1, $2, $3)",
+                    migration.version,
+                    migration.name,
+                    migration.checksum,
+                )
+            done.append(f"{migration.version:04d}_{migration.name}")
+        return done
+    finally:
+        await db.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
+
+
+# Hot queries with representative arguments. These are the statements the
+# app runs, so a changed query is checked as it is, not as it once was.
+SAMPLE_NG = uuid.UUID(int=1)
+SAMPLE_MESSAGE = uuid.UUID(int=2)
+SAMPLE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+HOT_QUERIES: dict[str, tuple[Query, tuple]] = {
+    "conversation page": (CONVERSATION_QUERY, (SAMPLE_NG, "sup-1", 100)),
+    "conversation next page": (
+        CONVERSATION_AFTER_QUERY,
+        (SAMPLE_NG, "sup-1", SAMPLE_TIME, SAMPLE_MESSAGE, 100),
+    ),
+    "negotiation status": (NEGOTIATION_STATUS_QUERY, (SAMPLE_NG,)),
+    "negotiation listing": (negotiation_list_query(True, False, False), ("active", 50)),
+    "negotiation listing next page": (
+        negotiation_list_query(False, False, True),
+        (SAMPLE_TIME, SAMPLE_NG, 50),
+    ),
+    "negotiation events": (events.DRAIN_QUERY, (0, 500, [])),
+    "negotiation event replay": (events.REPLAY_QUERY, (SAMPLE_NG, 0, 500)),
+    "ledger version": (offers.LEDGER_VERSION, (SAMPLE_NG,)),
+    "offer snapshot": (offers.LEDGER_SNAPSHOT, (SAMPLE_NG,)),
+    "agent history": (context.HISTORY_AFTER, (SAMPLE_NG, "sup-1", SAMPLE_TIME, SAMPLE_MESSAGE)),
+    "agent context state": (context.CONTEXT_STATE, (SAMPLE_NG, "sup-1")),
+    "product search": (search.SEARCH_WITH_SUPPLIER, ("espresso", "%espresso%", 50)),
+    "job claim": (jobs.CLAIM, ("check", 4, 8)),
+    "admission counts": (admission.COUNTS, ("default", 300)),
+    "email routing by reference": (inbox.ROUTE_BY_REFERENCE, (["<check@example.com>"],)),
+    "email routing by sender": (inbox.ROUTE_BY_SENDER, ("sales@example.com",)),
+}
+
+
+async def check_plans(conn: asyncpg.Connection) -> list[str]:
+    """
+    Names of hot queries whose plan contains a sequential scan.
+
+    Sequential scans are priced out with `enable_seqscan = off`, so one that
+    still shows up means no index can serve the query, regardless of how
+    small the tables are in the database being checked.
+    """
+    failures = []
+    async with conn.transaction():
+        await conn.execute("SET LOCAL enable_seqscan = off")
+        for name, (query, args) in HOT_QUERIES.items():
+            plan = "\n".join(
+                row[0] for row in await conn.fetch("EXPLAIN " + query.sql, *args)
+            )
+            if "Seq Scan" in plan:
+                failures.append(name)
+                print(f"{name}: sequential scan\n{plan}\n")
+    return failures
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    parser.add_argument("--check-plans", action="store_true", help="EXPLAIN the hot queries")
+    args = parser.parse_args()
+
+    load_dotenv()
+    conn = await asyncpg.connect(os.environ["DB_URL"])
+    try:
+        if args.status:
+            await conn.execute(SCHEMA_MIGRATION_SQL)
+            applied = {
+                row["version"]: row["applied_at"]
+                for row in await conn.fetch("SELECT version, applied_at FROM schema_migration")
+            }
+            for migration in load_migrations():
+                when = applied.get(migration.version)
+                state = f"applied {when:%Y-%m-%d %H:%M}" if when else "pending"
+                print(f"{migration.version:04d}_{migration.name:<28} {state}")
+            return
+
+        for name in await migrate(conn):
+            print(f"applied {name}")
+        if args.check_plans:
+            failures = await check_plans(conn)
+            if failures:
+                sys.exit(f"Sequential scans in: {', '.join(failures)}")
+            print(f"All {len(HOT_QUERIES)} hot queries are index-backed")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
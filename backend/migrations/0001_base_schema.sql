@@ -0,0 +1,40 @@
+-- Core tables. Later migrations add summary columns, triggers and indexes.
+CREATE TABLE IF NOT EXISTS supplier (
+    supplier_id TEXT PRIMARY KEY,
+    supplier_name TEXT NOT NULL,
+    email TEXT,
+    insights TEXT
+);
+
+CREATE TABLE IF NOT EXISTS product (
+    product_id TEXT PRIMARY KEY,
+    product_name TEXT NOT NULL,
+    supplier_id TEXT REFERENCES supplier (supplier_id),
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS negotiation (
+    ng_id UUID PRIMARY KEY,
+    product TEXT NOT NULL,
+    strategy TEXT,
+    status TEXT NOT NULL DEFAULT 'active'
+);
+
+-- sup_id is a supplier id or, for older negotiations, a supplier name.
+CREATE TABLE IF NOT EXISTS agent (
+    ng_id UUID NOT NULL REFERENCES negotiation (ng_id) ON DELETE CASCADE,
+    sup_id TEXT NOT NULL,
+    sys_prompt TEXT,
+    role TEXT NOT NULL,
+    PRIMARY KEY (ng_id, sup_id, role)
+);
+
+-- role is 'negotiator' (our emails) or 'supplier' (their replies).
+CREATE TABLE IF NOT EXISTS message (
+    message_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    ng_id UUID NOT NULL REFERENCES negotiation (ng_id) ON DELETE CASCADE,
+    supplier_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
@@ -0,0 +1,57 @@
+-- Event log behind the /events push channel. Triggers record every new
+-- message and negotiation status change and wake listening API workers with
+-- NOTIFY; clients resume from the last event_id they saw.
+CREATE TABLE IF NOT EXISTS negotiation_event (
+    event_id BIGSERIAL PRIMARY KEY,
+    ng_id UUID NOT NULL,
+    type TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_negotiation_event_ng ON negotiation_event (ng_id, event_id);
+CREATE INDEX IF NOT EXISTS idx_negotiation_event_created_at ON negotiation_event (created_at);
+
+CREATE OR REPLACE FUNCTION record_message_created() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO negotiation_event (ng_id, type, payload)
+    VALUES (
+        NEW.ng_id,
+        'message.created',
+        jsonb_build_object(
+            'message_id', NEW.message_id,
+            'supplier_id', NEW.supplier_id,
+            'role', NEW.role,
+            'content', NEW.content,
+            'created_at', NEW.created_at
+        )
+    );
+    PERFORM pg_notify('negotiation_events', NEW.ng_id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_message_created ON message;
+CREATE TRIGGER trg_message_created
+    AFTER INSERT ON message
+    FOR EACH ROW EXECUTE FUNCTION record_message_created();
+
+CREATE OR REPLACE FUNCTION record_negotiation_status() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO negotiation_event (ng_id, type, payload)
+    VALUES (
+        NEW.ng_id,
+        'status.changed',
+        jsonb_build_object('status', NEW.status, 'previous', OLD.status)
+    );
+    PERFORM pg_notify('negotiation_events', NEW.ng_id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_negotiation_status ON negotiation;
+CREATE TRIGGER trg_negotiation_status
+    AFTER UPDATE OF status ON negotiation
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION record_negotiation_status();
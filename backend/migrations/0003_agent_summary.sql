@@ -0,0 +1,49 @@
+-- Per-supplier progress kept on the agent row so /negotiation_status reads
+-- one small row per supplier instead of counting transcripts.
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS last_sender TEXT;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS latest_offer TEXT;
+-- Supplier emails received; orchestrator advice rounds go stale when it moves.
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS inbound_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_agent_ng_sup ON agent (ng_id, sup_id);
+
+CREATE OR REPLACE FUNCTION update_agent_summary() RETURNS trigger AS $$
+BEGIN
+    UPDATE agent SET
+        message_count = message_count + 1,
+        inbound_count = inbound_count + (NEW.role = 'supplier')::int,
+        last_message_at = NEW.created_at,
+        last_sender = NEW.role,
+        latest_offer = CASE WHEN NEW.role = 'supplier' THEN left(NEW.content, 500) ELSE latest_offer END
+    WHERE ng_id = NEW.ng_id AND sup_id = NEW.supplier_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_agent_summary ON message;
+CREATE TRIGGER trg_agent_summary
+    AFTER INSERT ON message
+    FOR EACH ROW EXECUTE FUNCTION update_agent_summary();
+
+-- Backfill existing negotiations.
+UPDATE agent a SET
+    message_count = s.message_count,
+    inbound_count = s.inbound_count,
+    last_message_at = s.last_message_at,
+    last_sender = s.last_sender,
+    latest_offer = s.latest_offer
+FROM (
+    SELECT
+        m.ng_id,
+        m.supplier_id,
+        count(*) AS message_count,
+        count(*) FILTER (WHERE m.role = 'supplier') AS inbound_count,
+        max(m.created_at) AS last_message_at,
+        (array_agg(m.role ORDER BY m.created_at DESC))[1] AS last_sender,
+        left((array_agg(m.content ORDER BY m.created_at DESC) FILTER (WHERE m.role = 'supplier'))[1], 500) AS latest_offer
+    FROM message m
+    GROUP BY m.ng_id, m.supplier_id
+) s
+WHERE a.ng_id = s.ng_id AND a.sup_id = s.supplier_id;
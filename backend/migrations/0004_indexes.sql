@@ -0,0 +1,10 @@
+-- Indexes for the hot read paths in main.py.
+
+-- Keyset pagination of a supplier thread: /conversation?after=<created_at,message_id>
+CREATE INDEX IF NOT EXISTS idx_message_ng_sup_keyset
+    ON message (ng_id, supplier_id, created_at, message_id);
+
+-- Fuzzy product search: `<%` word similarity and ILIKE '%q%' in search.py
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_product_name_trgm
+    ON product USING gin (product_name gin_trgm_ops);
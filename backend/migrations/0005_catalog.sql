@@ -0,0 +1,18 @@
+-- Tell API workers to reload their in-memory supplier/product catalog.
+-- Statement-level, so a bulk import sends one notification per table.
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_supplier_changed ON supplier;
+CREATE TRIGGER trg_supplier_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON supplier
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+DROP TRIGGER IF EXISTS trg_product_changed ON product;
+CREATE TRIGGER trg_product_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON product
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
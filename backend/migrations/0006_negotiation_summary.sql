@@ -0,0 +1,47 @@
+-- Summary columns on negotiation so the history listing is a single
+-- keyset-paginated read with no per-row joins or counts.
+ALTER TABLE negotiation ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE negotiation ADD COLUMN IF NOT EXISTS supplier_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE negotiation ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE negotiation ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+-- Lowest unit price offered so far; maintained by the offer ledger.
+ALTER TABLE negotiation ADD COLUMN IF NOT EXISTS best_offer NUMERIC;
+
+CREATE INDEX IF NOT EXISTS idx_negotiation_created ON negotiation (created_at DESC, ng_id DESC);
+CREATE INDEX IF NOT EXISTS idx_negotiation_status_created ON negotiation (status, created_at DESC, ng_id DESC);
+CREATE INDEX IF NOT EXISTS idx_negotiation_product_created ON negotiation (product, created_at DESC, ng_id DESC);
+
+CREATE OR REPLACE FUNCTION count_negotiation_supplier() RETURNS trigger AS $$
+BEGIN
+    IF NEW.role = 'negotiator' THEN
+        UPDATE negotiation SET supplier_count = supplier_count + 1 WHERE ng_id = NEW.ng_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_negotiation_supplier_count ON agent;
+CREATE TRIGGER trg_negotiation_supplier_count
+    AFTER INSERT ON agent
+    FOR EACH ROW EXECUTE FUNCTION count_negotiation_supplier();
+
+CREATE OR REPLACE FUNCTION count_negotiation_message() RETURNS trigger AS $$
+BEGIN
+    UPDATE negotiation SET
+        message_count = message_count + 1,
+        last_message_at = NEW.created_at
+    WHERE ng_id = NEW.ng_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_negotiation_message_count ON message;
+CREATE TRIGGER trg_negotiation_message_count
+    AFTER INSERT ON message
+    FOR EACH ROW EXECUTE FUNCTION count_negotiation_message();
+
+-- Backfill existing negotiations.
+UPDATE negotiation n SET
+    supplier_count = (SELECT count(*) FROM agent a WHERE a.ng_id = n.ng_id AND a.role = 'negotiator'),
+    message_count = (SELECT count(*) FROM message m WHERE m.ng_id = n.ng_id),
+    last_message_at = (SELECT max(m.created_at) FROM message m WHERE m.ng_id = n.ng_id);
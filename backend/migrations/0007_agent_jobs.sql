@@ -0,0 +1,35 @@
+-- Durable queue of agent turns, claimed by API and worker processes with
+-- FOR UPDATE SKIP LOCKED (see jobs.py).
+CREATE TABLE IF NOT EXISTS agent_job (
+    job_id BIGSERIAL PRIMARY KEY,
+    ng_id UUID NOT NULL,
+    sup_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    locked_by TEXT,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Set on jobs about one message, e.g. offer extraction.
+ALTER TABLE agent_job ADD COLUMN IF NOT EXISTS message_id UUID;
+
+CREATE INDEX IF NOT EXISTS idx_agent_job_queued
+    ON agent_job (run_after, job_id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_agent_job_running
+    ON agent_job (ng_id, sup_id) WHERE status = 'running';
+
+CREATE OR REPLACE FUNCTION notify_agent_job() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('agent_jobs', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_agent_job_queued ON agent_job;
+CREATE TRIGGER trg_agent_job_queued
+    AFTER INSERT ON agent_job
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_agent_job();
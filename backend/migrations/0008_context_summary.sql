@@ -0,0 +1,6 @@
+-- Rolling conversation summary per supplier thread (see context.py). The
+-- (summarized_at, summarized_id) cursor marks the last message folded in.
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS context_summary TEXT;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS context_offers JSONB NOT NULL DEFAULT '[]';
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS summarized_at TIMESTAMPTZ;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS summarized_id UUID;
@@ -0,0 +1,47 @@
+-- Offers parsed from supplier emails (see offers.py). Triggers keep the
+-- best and latest offer on the agent row and the lowest price on the
+-- negotiation, so readers never scan transcripts.
+CREATE TABLE IF NOT EXISTS offer (
+    offer_id BIGSERIAL PRIMARY KEY,
+    ng_id UUID NOT NULL,
+    sup_id TEXT NOT NULL,
+    message_id UUID NOT NULL UNIQUE,
+    unit_price NUMERIC,
+    currency TEXT,
+    quantity INTEGER,
+    lead_time_days INTEGER,
+    terms TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_offer_ng_sup ON offer (ng_id, sup_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_offer_ng_price ON offer (ng_id, unit_price) WHERE unit_price IS NOT NULL;
+
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS best_offer_id BIGINT;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS best_unit_price NUMERIC;
+ALTER TABLE agent ADD COLUMN IF NOT EXISTS latest_offer_id BIGINT;
+
+CREATE OR REPLACE FUNCTION record_offer() RETURNS trigger AS $$
+BEGIN
+    UPDATE agent SET
+        latest_offer_id = NEW.offer_id,
+        best_offer_id = CASE
+            WHEN NEW.unit_price IS NOT NULL AND (best_unit_price IS NULL OR NEW.unit_price < best_unit_price)
+            THEN NEW.offer_id ELSE best_offer_id END,
+        best_unit_price = CASE
+            WHEN NEW.unit_price IS NOT NULL AND (best_unit_price IS NULL OR NEW.unit_price < best_unit_price)
+            THEN NEW.unit_price ELSE best_unit_price END
+    WHERE ng_id = NEW.ng_id AND sup_id = NEW.sup_id;
+    IF NEW.unit_price IS NOT NULL THEN
+        -- LEAST ignores NULL, so the first offer sets it.
+        UPDATE negotiation SET best_offer = LEAST(best_offer, NEW.unit_price)
+        WHERE ng_id = NEW.ng_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_offer_recorded ON offer;
+CREATE TRIGGER trg_offer_recorded
+    AFTER INSERT ON offer
+    FOR EACH ROW EXECUTE FUNCTION record_offer();
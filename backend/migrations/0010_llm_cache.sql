@@ -0,0 +1,10 @@
+-- Shared tier of the LLM response cache (see response_cache.py).
+CREATE TABLE IF NOT EXISTS llm_response (
+    key TEXT PRIMARY KEY,
+    model_id TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_expires ON llm_response (expires_at);
@@ -0,0 +1,22 @@
+-- Routing index for inbound mail (see inbox.py): every Message-ID we send or
+-- receive maps to its supplier thread, so replies are matched through
+-- In-Reply-To/References. Inbound rows double as the dedup record.
+CREATE TABLE IF NOT EXISTS email_thread (
+    message_id TEXT PRIMARY KEY,
+    ng_id UUID NOT NULL,
+    sup_id TEXT NOT NULL,
+    address TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_thread_address
+    ON email_thread (address, created_at DESC) WHERE direction = 'out';
+
+-- Last UID processed per mailbox, so a reconnecting listener resumes there.
+CREATE TABLE IF NOT EXISTS imap_state (
+    mailbox TEXT PRIMARY KEY,
+    uidvalidity BIGINT NOT NULL,
+    last_uid BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
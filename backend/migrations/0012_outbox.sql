@@ -0,0 +1,7 @@
+-- Delivery status of negotiator emails, written back by the outbox
+-- (see outbox.py): queued, retrying, sent or failed.
+ALTER TABLE message ADD COLUMN IF NOT EXISTS email_message_id TEXT;
+ALTER TABLE message ADD COLUMN IF NOT EXISTS delivery_status TEXT;
+ALTER TABLE message ADD COLUMN IF NOT EXISTS delivery_attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE message ADD COLUMN IF NOT EXISTS delivery_error TEXT;
+ALTER TABLE message ADD COLUMN IF NOT EXISTS delivered_at TIMESTAMPTZ;
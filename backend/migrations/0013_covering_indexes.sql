@@ -0,0 +1,12 @@
+-- /negotiation_status reads every agent of a negotiation in sup_id order;
+-- with the summary columns included it is an index-only scan.
+CREATE INDEX IF NOT EXISTS idx_agent_status_covering
+    ON agent (ng_id, sup_id)
+    INCLUDE (role, message_count, last_message_at, last_sender, latest_offer, best_unit_price);
+DROP INDEX IF EXISTS idx_agent_ng_sup;
+
+-- Product listing by supplier and the catalog join in search.py.
+CREATE INDEX IF NOT EXISTS idx_product_supplier ON product (supplier_id);
+
+-- Supplier lookup by name when an agent was created with the name as sup_id.
+CREATE INDEX IF NOT EXISTS idx_supplier_name ON supplier (supplier_name);
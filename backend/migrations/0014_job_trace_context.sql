@@ -0,0 +1,3 @@
+-- W3C traceparent of the span that queued the job (the inbound email or the
+-- API request), so the worker's turn joins the same trace.
+ALTER TABLE agent_job ADD COLUMN IF NOT EXISTS trace_context TEXT;
@@ -0,0 +1,14 @@
+-- Owner of each negotiation, from the caller's X-API-Key, copied onto its
+-- jobs so admission control and job claiming can count per tenant.
+ALTER TABLE negotiation ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE agent_job ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'default';
+
+-- Active negotiations and pending turns, globally and per tenant (admission.py).
+CREATE INDEX IF NOT EXISTS idx_negotiation_active_tenant
+    ON negotiation (tenant) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_agent_job_pending_tenant
+    ON agent_job (tenant) WHERE status IN ('queued', 'running');
+
+-- Recent turn throughput, for Retry-After.
+CREATE INDEX IF NOT EXISTS idx_agent_job_done
+    ON agent_job (locked_at) WHERE status = 'done';
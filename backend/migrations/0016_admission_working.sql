@@ -0,0 +1,6 @@
+-- Admission now counts a negotiation as active while it has queued or
+-- running jobs, rather than by negotiation.status (admission.py).
+CREATE INDEX IF NOT EXISTS idx_agent_job_pending_tenant_ng
+    ON agent_job (tenant, ng_id) WHERE status IN ('queued', 'running');
+DROP INDEX IF EXISTS idx_agent_job_pending_tenant;
+DROP INDEX IF EXISTS idx_negotiation_active_tenant;
@@ -0,0 +1,4 @@
+-- Head of each supplier thread's queue, for the job claim (jobs.CLAIM_SQL):
+-- lowest queued job_id per (ng_id, sup_id), whether or not it is due yet.
+CREATE INDEX IF NOT EXISTS idx_agent_job_thread_head
+    ON agent_job (ng_id, sup_id, job_id) WHERE status = 'queued';
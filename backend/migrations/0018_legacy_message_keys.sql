@@ -0,0 +1,34 @@
+-- Databases created before ng_id became the only key of a message may
+-- still have rows keyed by the legacy negotiation_id column, ordered by
+-- the legacy "timestamp" column. /conversation and the agents read only
+-- ng_id and created_at, so copy those over. Values that are not a UUID of
+-- a known negotiation are left alone.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'message'
+          AND column_name = 'negotiation_id'
+    ) THEN
+        EXECUTE $sql$
+            UPDATE message m SET ng_id = m.negotiation_id::text::uuid
+            WHERE m.ng_id IS NULL
+              AND m.negotiation_id::text ~* '^[0-9a-f]{8}-([0-9a-f]{4}-){3}[0-9a-f]{12}$'
+              AND EXISTS (
+                  SELECT 1 FROM negotiation n WHERE n.ng_id = m.negotiation_id::text::uuid
+              )
+        $sql$;
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'message'
+          AND column_name = 'timestamp'
+    ) THEN
+        EXECUTE $sql$
+            UPDATE message SET created_at = "timestamp"::timestamptz
+            WHERE created_at IS NULL AND "timestamp" IS NOT NULL
+        $sql$;
+        -- Keyset paging compares created_at, so no row may be left without one.
+        UPDATE message SET created_at = clock_timestamp() WHERE created_at IS NULL;
+    END IF;
+END $$;
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from telemetry import LOOP_LAG
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: how late a `sleep(interval)` wakes up.
+
+    Lag is time the loop spent running other callbacks, i.e. blocking work
+    such as JSON encoding, regex over long transcripts or a stray sync call,
+    during which no request or email could make progress.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 3000) -> None:
+        self.interval = interval
+        self.samples: deque[float] = deque(maxlen=window)
+        self.lag_max = 0.0
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            self.samples.append(lag)
+            self.lag_max = max(self.lag_max, lag)
+            LOOP_LAG.observe(lag)
+
+    def metrics(self) -> dict[str, Any]:
+        lags = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            return lags[min(len(lags) - 1, int(p * len(lags)))] if lags else 0.0
+
+        return {
+            "lag_p50_s": percentile(0.50),
+            "lag_p95_s": percentile(0.95),
+            "lag_p99_s": percentile(0.99),
+            "lag_max_s": self.lag_max,
+            "samples": len(lags),
+        }
@@ -0,0 +1,185 @@
+import json
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+import asyncpg
+
+import db
+from llm import LLMGateway
+from patterns import PRICE_PATTERN
+
+EXTRACTION_SYSTEM_PROMPT = """
+You extract the commercial offer from a supplier email. Reply with one JSON object and nothing else:
+{"unit_price": number or null, "currency": "EUR"/"USD"/... or null, "quantity": integer or null,
+ "lead_time_days": integer or null, "terms": short string or null}
+Use the per-unit price. If the email contains no offer, reply with {}.
+"""
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+# Range of the offer table's INTEGER columns.
+INT_MAX = 2**31 - 1
+
+LEDGER_VERSION = db.Query(
+    "ledger_version",
+    """
+    SELECT COALESCE(sum(inbound_count), 0) AS inbound,
+           COALESCE(max(latest_offer_id), 0) AS latest_offer
+    FROM agent
+    WHERE ng_id = $1
+    """,
+    timeout=5,
+)
+LEDGER_SNAPSHOT = db.Query(
+    "ledger_snapshot",
+    """
+    SELECT a.sup_id, a.message_count, a.last_sender,
+           b.unit_price AS best_price, b.currency AS best_currency,
+           b.quantity AS best_quantity, b.lead_time_days AS best_lead_time_days,
+           b.terms AS best_terms,
+           l.unit_price AS latest_price, l.created_at AS latest_at
+    FROM agent a
+    LEFT JOIN offer b ON b.offer_id = a.best_offer_id
+    LEFT JOIN offer l ON l.offer_id = a.latest_offer_id
+    WHERE a.ng_id = $1 AND a.role = 'negotiator'
+    ORDER BY a.best_unit_price NULLS LAST, a.sup_id
+    """,
+    timeout=5,
+)
+OFFER_MESSAGE = db.Query(
+    "offer_message",
+    """
+    SELECT ng_id, supplier_id, role, content FROM message
+    WHERE message_id = $1
+    """,
+    timeout=5,
+)
+SAVE_OFFER = db.Query(
+    "offer_save",
+    """
+    INSERT INTO offer (ng_id, sup_id, message_id, unit_price, currency,
+                       quantity, lead_time_days, terms)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+    ON CONFLICT (message_id) DO NOTHING
+    """,
+    timeout=5,
+)
+
+
+def parse_offer(text: str) -> dict[str, Any]:
+    """Pick the offer fields out of the model's reply, dropping anything malformed."""
+    match = JSON_OBJECT.search(text)
+    if not match:
+        return {}
+    try:
+        raw = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+
+    offer: dict[str, Any] = {}
+    # json.loads accepts Infinity and NaN, so every number is range-checked.
+    try:
+        if raw.get("unit_price") is not None:
+            price = Decimal(str(raw["unit_price"]).replace(",", ""))
+            if price.is_finite():
+                offer["unit_price"] = price
+    except InvalidOperation:
+        pass
+    for key in ("quantity", "lead_time_days"):
+        try:
+            if raw.get(key) is not None:
+                value = int(float(str(raw[key]).replace(",", "")))
+                if 0 <= value <= INT_MAX:
+                    offer[key] = value
+        except (ValueError, OverflowError):
+            pass
+    for key in ("currency", "terms"):
+        if isinstance(raw.get(key), str) and raw[key].strip():
+            offer[key] = raw[key].strip()[:500]
+    return offer
+
+
+class OfferLedger:
+    """
+    Parses each supplier email once into the `offer` table and serves the
+    orchestrator a compact per-supplier ranking built from the agent rows.
+    """
+
+    def __init__(self, client: LLMGateway, db_pool: asyncpg.Pool) -> None:
+        self.client = client
+        self.db_pool = db_pool
+
+    async def extract(self, message_id: str) -> dict[str, Any] | None:
+        """Record the offer in one supplier message; None if it contains none."""
+        message = await db.fetchrow(self.db_pool, OFFER_MESSAGE, message_id)
+        # Emails without any amount in them are not worth a model call.
+        if message is None or message["role"] != "supplier":
+            return None
+        if not PRICE_PATTERN.search(message["content"]):
+            return None
+
+        reply = await self.client.complete(
+            message["content"],
+            EXTRACTION_SYSTEM_PROMPT,
+            max_tokens=200,
+            temperature=0.0,
+            lane="background",
+        )
+        offer = parse_offer(reply)
+        if not offer:
+            return None
+
+        await db.execute(
+            self.db_pool,
+            SAVE_OFFER,
+            message["ng_id"],
+            message["supplier_id"],
+            message_id,
+            offer.get("unit_price"),
+            offer.get("currency"),
+            offer.get("quantity"),
+            offer.get("lead_time_days"),
+            offer.get("terms"),
+        )
+        return offer
+
+    async def version(self, ng_id: str) -> tuple[int, int]:
+        """Changes whenever a supplier email arrives or an offer is recorded."""
+        row = await db.fetchrow(self.db_pool, LEDGER_VERSION, ng_id)
+        return int(row["inbound"]), int(row["latest_offer"])
+
+    async def snapshot(self, ng_id: str) -> list[dict[str, Any]]:
+        """Best and latest offer per supplier, cheapest first."""
+        rows = await db.fetch(self.db_pool, LEDGER_SNAPSHOT, ng_id)
+        return [dict(row) for row in rows]
+
+
+def format_snapshot(snapshot: list[dict[str, Any]]) -> str:
+    """One line per supplier for the orchestrator prompt."""
+    lines = []
+    for rank, row in enumerate(snapshot, 1):
+        if row["best_price"] is None:
+            offer = "no offer yet"
+        else:
+            currency = f" {row['best_currency']}" if row["best_currency"] else ""
+            offer = f"best {row['best_price']}{currency}/unit"
+            if row["best_quantity"]:
+                offer += f" for {row['best_quantity']} units"
+            if row["best_lead_time_days"]:
+                offer += f", {row['best_lead_time_days']} days lead time"
+            if row["best_terms"]:
+                offer += f", terms: {row['best_terms']}"
+            if row["latest_price"] is not None and row["latest_price"] != row["best_price"]:
+                offer += f" (latest {row['latest_price']})"
+        if row["last_sender"] is None:
+            waiting = "not contacted yet"
+        elif row["last_sender"] == "negotiator":
+            waiting = "awaiting supplier"
+        else:
+            waiting = "awaiting us"
+        lines.append(
+            f"{rank}. {row['sup_id']}: {offer}; {row['message_count']} messages, {waiting}"
+        )
+    return "\n".join(lines)
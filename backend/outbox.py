@@ -0,0 +1,330 @@
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Any
+
+import aiosmtplib
+import asyncpg
+from opentelemetry import context
+from opentelemetry.context import Context
+
+from telemetry import EMAIL_SENT, fail, tracer
+
+
+class SmtpConnectionPool:
+    """
+    Up to `size` authenticated SMTP sessions kept open between sends.
+
+    Connections idle for longer than `idle_timeout` are dropped rather than
+    reused, since servers close quiet sessions after a few minutes.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        size: int = 4,
+        start_tls: bool | None = None,
+        idle_timeout: float = 120.0,
+    ) -> None:
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.start_tls = start_tls
+        self.idle_timeout = idle_timeout
+        self.opened = 0
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=self.start_tls,
+        )
+        await smtp.connect()
+        self.opened += 1
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        async with self._slots:
+            smtp = None
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if candidate.is_connected and time.monotonic() - last_used < self.idle_timeout:
+                    smtp = candidate
+                    break
+                candidate.close()
+            if smtp is None:
+                smtp = await self._connect()
+            try:
+                yield smtp
+            except (aiosmtplib.SMTPServerDisconnected, OSError):
+                smtp.close()
+                raise
+            except aiosmtplib.SMTPResponseException:
+                # The session is still usable after a rejected message.
+                self._idle.append((smtp, time.monotonic()))
+                raise
+            except BaseException:
+                smtp.close()
+                raise
+            else:
+                self._idle.append((smtp, time.monotonic()))
+
+    @property
+    def idle_connections(self) -> int:
+        return len(self._idle)
+
+    async def close(self) -> None:
+        while self._idle:
+            smtp, _ = self._idle.pop()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+@dataclass
+class OutgoingEmail:
+    message: EmailMessage
+    row_id: str | None = None
+    attempts: int = 0
+    # Trace context of the turn that queued the email, so the send shows
+    # up under it even though a queue worker performs it.
+    context: Context | None = None
+
+
+def _domain(item: OutgoingEmail) -> str:
+    return item.message["To"].rsplit("@", 1)[-1].strip(" >").lower()
+
+
+class Outbox:
+    """
+    Bounded send queue drained over a `SmtpConnectionPool`.
+
+    `put` returns as soon as the message is queued and blocks only while the
+    queue is full. At most `per_domain` messages go to one recipient domain
+    at a time; further mail for a busy domain is parked and sent by the
+    worker that finishes with it, so a slow domain never holds the workers
+    other domains are waiting on. Temporary failures (4xx replies, dropped
+    connections) are retried with jittered exponential backoff; the outcome
+    is written to the `message` row the email was drafted from, if any.
+
+    The queue lives in memory. `stop` waits up to `drain_timeout` for it to
+    empty; mail still unsent then, including retries waiting out their
+    backoff, is dropped and marked failed on its `message` row.
+    """
+
+    def __init__(
+        self,
+        smtp: SmtpConnectionPool,
+        db_pool: asyncpg.Pool | None = None,
+        queue_size: int = 1000,
+        per_domain: int = 2,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_cap: float = 300.0,
+        drain_timeout: float = 30.0,
+    ) -> None:
+        self.smtp = smtp
+        self.db_pool = db_pool
+        self.queue: asyncio.Queue[OutgoingEmail] = asyncio.Queue(maxsize=queue_size)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.drain_timeout = drain_timeout
+        self.per_domain = per_domain
+        self.in_flight: Counter[str] = Counter()
+        self.parked: defaultdict[str, deque[OutgoingEmail]] = defaultdict(deque)
+        # Messages out of the queue but not yet settled, by id(), so that
+        # whatever is left when the outbox stops can be marked failed.
+        self.delivering: dict[int, OutgoingEmail] = {}
+        self.retrying: dict[int, OutgoingEmail] = {}
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.recent_sends: deque[float] = deque(maxlen=1000)
+        self.tasks: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        for _ in range(self.smtp.size):
+            self._spawn(self._worker())
+
+    async def stop(self) -> None:
+        try:
+            await asyncio.wait_for(self._drain(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        unsent = [*self.delivering.values(), *self.retrying.values()]
+        unsent += [item for parked in self.parked.values() for item in parked]
+        while not self.queue.empty():
+            unsent.append(self.queue.get_nowait())
+        if unsent:
+            print(f"Outbox stopped with {len(unsent)} emails unsent")
+        for item in unsent:
+            self.failed += 1
+            await self._status(
+                item.row_id, "failed", attempts=item.attempts, error="outbox stopped"
+            )
+        await self.smtp.close()
+
+    async def _drain(self) -> None:
+        """Wait until nothing is queued, parked or being sent; retries are not waited for."""
+        while self.queue.qsize() or self.delivering or any(self.parked.values()):
+            await asyncio.sleep(0.1)
+
+    @property
+    def pending(self) -> int:
+        """Messages accepted but not yet sent or given up on."""
+        parked = sum(len(items) for items in self.parked.values())
+        return self.queue.qsize() + parked + len(self.delivering) + len(self.retrying)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def put(self, message: EmailMessage, row_id: str | None = None) -> None:
+        await self._status(row_id, "queued", message_id=message["Message-ID"])
+        await self.queue.put(OutgoingEmail(message, row_id, context=context.get_current()))
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self.queue.get()
+            self.queue.task_done()
+            domain = _domain(item)
+            if self.in_flight[domain] >= self.per_domain:
+                self.parked[domain].append(item)
+                continue
+            self.in_flight[domain] += 1
+            try:
+                while item is not None:
+                    await self._settle(item)
+                    parked = self.parked.get(domain)
+                    item = parked.popleft() if parked else None
+            finally:
+                self.in_flight[domain] -= 1
+                if not self.in_flight[domain]:
+                    del self.in_flight[domain]
+                if domain in self.parked and not self.parked[domain]:
+                    del self.parked[domain]
+
+    async def _settle(self, item: OutgoingEmail) -> None:
+        self.delivering[id(item)] = item
+        try:
+            await self._deliver(item)
+        except Exception as e:
+            print(f"Outbox delivery of {item.message['Message-ID']} crashed: {e!r}")
+        # Not reached if cancelled, so an interrupted send counts as unsent.
+        del self.delivering[id(item)]
+
+    async def _deliver(self, item: OutgoingEmail) -> None:
+        item.attempts += 1
+        domain = _domain(item)
+        start = time.perf_counter()
+        with tracer.start_as_current_span("email.send", context=item.context) as span:
+            span.set_attribute("email.domain", domain)
+            span.set_attribute("email.attempt", item.attempts)
+            try:
+                async with self.smtp.connection() as smtp:
+                    await smtp.send_message(item.message)
+            except aiosmtplib.SMTPResponseException as e:
+                fail(span, e)
+                EMAIL_SENT.labels("rejected").observe(time.perf_counter() - start)
+                if 400 <= e.code < 500:
+                    await self._retry(item, f"{e.code} {e.message}")
+                else:
+                    await self._fail(item, f"{e.code} {e.message}")
+            except (aiosmtplib.SMTPException, OSError) as e:
+                fail(span, e)
+                EMAIL_SENT.labels("error").observe(time.perf_counter() - start)
+                await self._retry(item, repr(e))
+            else:
+                EMAIL_SENT.labels("sent").observe(time.perf_counter() - start)
+                self.sent += 1
+                self.recent_sends.append(time.monotonic())
+                await self._status(item.row_id, "sent", attempts=item.attempts)
+
+    async def _retry(self, item: OutgoingEmail, error: str) -> None:
+        if item.attempts >= self.max_attempts:
+            await self._fail(item, error)
+            return
+        self.retries += 1
+        await self._status(item.row_id, "retrying", attempts=item.attempts, error=error)
+        cap = min(self.backoff_cap, self.backoff_base * 2**item.attempts)
+        self.retrying[id(item)] = item
+        self._spawn(self._requeue(item, random.uniform(cap / 2, cap)))
+
+    async def _requeue(self, item: OutgoingEmail, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.queue.put(item)
+        del self.retrying[id(item)]
+
+    async def _fail(self, item: OutgoingEmail, error: str) -> None:
+        self.failed += 1
+        print(f"Giving up on {item.message['Message-ID']} to {item.message['To']}: {error}")
+        await self._status(item.row_id, "failed", attempts=item.attempts, error=error)
+
+    async def _status(
+        self,
+        row_id: str | None,
+        status: str,
+        attempts: int = 0,
+        error: str | None = None,
+        message_id: str | None = None,
+    ) -> None:
+        if row_id is None or self.db_pool is None:
+            return
+        try:
+            await self.db_pool.execute(
+                """
+                UPDATE message SET
+                    delivery_status = $2,
+                    delivery_attempts = $3,
+                    delivery_error = $4,
+                    email_message_id = COALESCE($5, email_message_id),
+                    delivered_at = CASE WHEN $2 = 'sent' THEN NOW() END
+                WHERE message_id = $1
+                """,
+                row_id,
+                status,
+                attempts,
+                error,
+                message_id,
+            )
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f"Recording delivery status of {row_id} failed: {e}")
+
+    def send_rate(self, window: float = 60.0) -> float:
+        """Emails sent per second over the last `window` seconds."""
+        cutoff = time.monotonic() - window
+        return sum(1 for sent_at in self.recent_sends if sent_at > cutoff) / window
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "parked": sum(len(items) for items in self.parked.values()),
+            "awaiting_retry": len(self.retrying),
+            "pending": self.pending,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "connections_opened": self.smtp.opened,
+            "idle_connections": self.smtp.idle_connections,
+        }
@@ -0,0 +1,8 @@
+import re
+
+# Amounts like "$12.50", "EUR 1,200" or "9.80 CHF".
+PRICE_PATTERN = re.compile(
+    r"(?:[$€£]|\b(?:USD|EUR|CHF|GBP)\b)\s?\d[\d,.']*"
+    r"|\d[\d,.']*\s?(?:[$€£]|\b(?:USD|EUR|CHF|GBP)\b)",
+    re.IGNORECASE,
+)
@@ -0,0 +1,81 @@
+"""
+Named statements behind the API endpoints in main.py, kept here so that
+migrate.py can check their plans without importing the app.
+"""
+
+from functools import cache
+
+from db import Query
+
+CONVERSATION_QUERY = Query(
+    "conversation_page",
+    """
+    SELECT message_id, ng_id, supplier_id, role, content, created_at, delivery_status
+    FROM message
+    WHERE ng_id = $1 AND supplier_id = $2
+    ORDER BY created_at, message_id
+    LIMIT $3
+    """,
+    timeout=5,
+)
+CONVERSATION_AFTER_QUERY = Query(
+    "conversation_page_after",
+    """
+    SELECT message_id, ng_id, supplier_id, role, content, created_at, delivery_status
+    FROM message
+    WHERE ng_id = $1 AND supplier_id = $2
+      AND (created_at, message_id) > ($3, $4)
+    ORDER BY created_at, message_id
+    LIMIT $5
+    """,
+    timeout=5,
+)
+
+NEGOTIATION_STATUS_QUERY = Query(
+    "negotiation_status",
+    """
+    SELECT sup_id, message_count, last_message_at, last_sender, latest_offer,
+           best_unit_price
+    FROM agent
+    WHERE ng_id = $1
+    ORDER BY sup_id
+    """,
+    timeout=2,
+)
+
+
+@cache
+def negotiation_list_query(status: bool, product: bool, before: bool) -> Query:
+    """
+    The newest-first negotiation page for one combination of filters. Its
+    arguments are the status, the product and the `before` cursor's
+    (created_at, ng_id), each only if filtered on, then the page size.
+    """
+    conditions = []
+    for flag, condition in ((status, "n.status = ${}"), (product, "n.product = ${}")):
+        if flag:
+            conditions.append(condition.format(len(conditions) + 1))
+    arg = len(conditions)
+    if before:
+        conditions.append(f"(n.created_at, n.ng_id) < (${arg + 1}, ${arg + 2})")
+        arg += 2
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    filters = "".join(flag for flag, on in (("s", status), ("p", product), ("b", before)) if on)
+    return Query(
+        f"negotiation_list_{filters or 'all'}",
+        f"""
+        SELECT n.ng_id, n.product, n.strategy, n.status, n.created_at,
+               n.supplier_count, n.message_count, n.last_message_at, n.best_offer,
+               ARRAY(
+                   SELECT a.sup_id FROM agent a
+                   WHERE a.ng_id = n.ng_id AND a.role = 'negotiator'
+                   ORDER BY a.sup_id
+               ) AS supplier_ids
+        FROM negotiation n
+        {where}
+        ORDER BY n.created_at DESC, n.ng_id DESC
+        LIMIT ${arg + 1}
+        """,
+        timeout=5,
+    )
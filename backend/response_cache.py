@@ -0,0 +1,116 @@
+import hashlib
+import json
+import time
+from typing import Any
+
+import asyncpg
+
+from cache import TTLCache
+
+
+def cache_key(
+    model_id: str, messages: list[dict[str, str]], temperature: float, max_tokens: int
+) -> str:
+    """Content address of one completion request; the system prompt is in `messages`."""
+    payload = json.dumps(
+        [model_id, messages, temperature, max_tokens],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of model replies keyed by `cache_key`.
+
+    An in-process LRU sits in front of the `llm_response` table shared by
+    every API and worker process; both expire entries after `ttl` seconds.
+    Only deterministic calls (temperature 0) are cached unless `force` is
+    set, which replays sampled replies too, e.g. for repeated demo runs.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86_400, force: bool = False) -> None:
+        self.ttl = ttl
+        self.force = force
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.db_pool: asyncpg.Pool | None = None
+        self.db_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.errors = 0
+        self._next_prune = 0.0
+
+    def attach(self, db_pool: asyncpg.Pool) -> None:
+        """Enable the shared tier once the pool exists."""
+        self.db_pool = db_pool
+
+    def applies(self, temperature: float, cache: bool | None) -> bool:
+        """Whether a call should go through the cache (`cache` overrides)."""
+        if cache is not None:
+            use = cache
+        else:
+            use = temperature == 0 or self.force
+        if not use:
+            self.bypassed += 1
+        return use
+
+    async def get(self, key: str) -> str | None:
+        text = self.memory.get(key)
+        if text is not None:
+            return text
+        if self.db_pool is not None:
+            try:
+                text = await self.db_pool.fetchval(
+                    "SELECT response FROM llm_response WHERE key = $1 AND expires_at > NOW()",
+                    key,
+                )
+            except (OSError, asyncpg.PostgresError) as e:
+                self.errors += 1
+                print(f"LLM cache lookup failed: {e}")
+            if text is not None:
+                self.db_hits += 1
+                self.memory.set(key, text)
+                return text
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, model_id: str, text: str) -> None:
+        self.memory.set(key, text)
+        self.stores += 1
+        if self.db_pool is None:
+            return
+        try:
+            await self.db_pool.execute(
+                """
+                INSERT INTO llm_response (key, model_id, response, expires_at)
+                VALUES ($1, $2, $3, NOW() + make_interval(secs => $4))
+                ON CONFLICT (key) DO UPDATE
+                SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at
+                """,
+                key,
+                model_id,
+                text,
+                self.ttl,
+            )
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + 3600
+                await self.db_pool.execute("DELETE FROM llm_response WHERE expires_at < NOW()")
+        except (OSError, asyncpg.PostgresError) as e:
+            self.errors += 1
+            print(f"LLM cache store failed: {e}")
+
+    def metrics(self) -> dict[str, Any]:
+        lookups = self.memory.hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory.hits + self.db_hits) / lookups if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "errors": self.errors,
+            "memory_entries": len(self.memory),
+        }
@@ -0,0 +1,246 @@
+import asyncio
+import sys
+import time
+from collections import defaultdict
+
+import asyncpg
+
+import db
+from agents import SAVE_MESSAGE, NegotiationAgent, OrchestratorAgent
+from catalog import CatalogCache
+from email_client import EmailClient
+from jobs import enqueue
+from llm import LLMGateway
+from offers import OfferLedger
+from streams import TokenStreamHub
+from telemetry import tracer
+
+# Lets the inbox listener match the supplier's answer to an outgoing email.
+RECORD_THREAD = db.Query(
+    "email_thread_out",
+    """
+    INSERT INTO email_thread (message_id, ng_id, sup_id, address, direction)
+    VALUES ($1, $2, $3, lower($4), 'out')
+    ON CONFLICT (message_id) DO NOTHING
+    """,
+    timeout=5,
+)
+# Every turn answers an empty thread or a supplier email, so a thread that
+# ends in a negotiator message is a retry of a turn that already drafted it.
+LAST_MESSAGE = db.Query(
+    "thread_last_message",
+    """
+    SELECT message_id, role, content, email_message_id FROM message
+    WHERE ng_id = $1 AND supplier_id = $2
+    ORDER BY created_at DESC, message_id DESC
+    LIMIT 1
+    """,
+    timeout=5,
+)
+
+
+async def record_supplier_email(
+    conn: asyncpg.Connection, ng_id: str, sup_id: str, body: str
+) -> str:
+    """Store a supplier email and queue its offer extraction and reply turn."""
+    message_id = await db.fetchval(conn, SAVE_MESSAGE, ng_id, sup_id, "supplier", body)
+    # Queued first so the offer is in the ledger before the reply.
+    await enqueue(conn, ng_id, [sup_id], "offer", message_id)
+    await enqueue(conn, ng_id, [sup_id], "reply")
+    return str(message_id)
+
+
+class NegotiationSession:
+    """
+    Live state of one negotiation: the orchestrator plus one agent per supplier.
+
+    Turns for different suppliers run concurrently; turns for the same
+    supplier are serialized so replies never interleave in a thread. Any
+    process can rebuild a session from the database with `load`.
+
+    Orchestrator advice is produced in rounds covering every supplier: turns
+    that start while a round is current share it, and a round is replaced
+    (and cancelled if still running) once a supplier email or a new offer
+    makes its snapshot stale.
+
+    Sessions are cheap to drop: everything but in-flight work lives in the
+    database, and `SessionRegistry` (sessions.py) evicts idle ones.
+    """
+
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        client: LLMGateway,
+        ng_id: str,
+        orchestrator: OrchestratorAgent,
+        email_client: EmailClient | None = None,
+    ) -> None:
+        self.db_pool = db_pool
+        self.client = client
+        self.ng_id = ng_id
+        self.orchestrator = orchestrator
+        self.email_client = email_client
+        self.agents: dict[str, NegotiationAgent] = {}
+        self.addresses: dict[str, str] = {}
+        # Created on a supplier's first turn, not per agent up front.
+        self.locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.advice_round: tuple[tuple[int, int], asyncio.Task] | None = None
+        self.last_advice: dict[str, str] = {}
+        self.turns = 0
+        self.last_used = time.monotonic()
+        self.closing = False
+
+    @property
+    def busy(self) -> bool:
+        """A turn is running, so the session must stay resident."""
+        return self.turns > 0
+
+    @classmethod
+    async def load(
+        cls,
+        db_pool: asyncpg.Pool,
+        client: LLMGateway,
+        ng_id: str,
+        orchestrator_prompt: str,
+        catalog: CatalogCache,
+        email_client: EmailClient | None = None,
+        streams: TokenStreamHub | None = None,
+        ledger: OfferLedger | None = None,
+    ) -> "NegotiationSession | None":
+        """
+        Rebuild a session from the negotiation and agent rows, or None if
+        unknown. Supplier addresses and insights come from `catalog`.
+        """
+        negotiation = await db_pool.fetchrow(
+            "SELECT product, strategy FROM negotiation WHERE ng_id = $1", ng_id
+        )
+        if negotiation is None:
+            return None
+        agents = await db_pool.fetch(
+            """
+            SELECT sup_id, sys_prompt FROM agent
+            WHERE ng_id = $1 AND role = 'negotiator'
+            ORDER BY sup_id
+            """,
+            ng_id,
+        )
+
+        orchestrator = OrchestratorAgent(
+            client=client,
+            strategy=negotiation["strategy"],
+            product=negotiation["product"],
+            sys_promt=orchestrator_prompt,
+            db_pool=db_pool,
+            ng_id=ng_id,
+            ledger=ledger,
+        )
+        session = cls(db_pool, client, ng_id, orchestrator, email_client)
+        for row in agents:
+            supplier = catalog.supplier(row["sup_id"]) or {}
+            agent = NegotiationAgent(
+                client=client,
+                db_pool=db_pool,
+                sys_prompt=row["sys_prompt"],
+                ng_id=ng_id,
+                sup_id=row["sup_id"],
+                product=negotiation["product"],
+                insights=supplier.get("insights") or "",
+                streams=streams,
+            )
+            session.add_agent(row["sup_id"], agent, address=supplier.get("email"))
+        return session
+
+    def add_agent(self, sup_id: str, agent: NegotiationAgent, address: str | None = None) -> None:
+        self.agents[sup_id] = agent
+        self.addresses[sup_id] = sys.intern(address or sup_id)
+
+    def invalidate_advice(self) -> None:
+        """Drop the current advice round, e.g. because a supplier replied."""
+        if self.advice_round is not None:
+            self.advice_round[1].cancel()
+            self.advice_round = None
+
+    async def advice(self, sup_id: str) -> str:
+        """
+        This supplier's instructions from the current advice round.
+
+        While the model backlog is high, a stale round is not replaced:
+        the last completed round's advice is reused so the model's capacity
+        goes to the replies themselves.
+        """
+        while True:
+            version = await self.orchestrator.ledger.version(self.ng_id)
+            if self.advice_round is None or self.advice_round[0] != version:
+                scheduler = self.client.scheduler
+                if scheduler.backlogged and sup_id in self.last_advice:
+                    scheduler.deferred += 1
+                    return self.last_advice[sup_id]
+                self.invalidate_advice()
+                task = asyncio.create_task(self.orchestrator.advise_all(list(self.agents)))
+                self.advice_round = (version, task)
+            task = self.advice_round[1]
+            # wait() leaves the shared round running if this turn is cancelled.
+            await asyncio.wait({task})
+            if not task.cancelled():
+                if task.exception() is not None:
+                    # Forget the failed round so the next turn starts a new
+                    # one instead of re-raising this error.
+                    if self.advice_round is not None and self.advice_round[1] is task:
+                        self.advice_round = None
+                    raise task.exception()
+                self.last_advice = task.result()
+                return self.last_advice.get(sup_id, "")
+            # Superseded by a newer round while waiting: join that one.
+
+    async def take_turn(self, sup_id: str) -> str | None:
+        self.turns += 1
+        try:
+            return await self._take_turn(sup_id)
+        finally:
+            self.turns -= 1
+            self.last_used = time.monotonic()
+            if self.closing and not self.busy:
+                self.close()
+
+    async def _take_turn(self, sup_id: str) -> str | None:
+        with tracer.start_as_current_span("negotiation.turn") as span:
+            span.set_attribute("negotiation.id", self.ng_id)
+            span.set_attribute("supplier.id", sup_id)
+            async with self.locks[sup_id]:
+                last = await db.fetchrow(self.db_pool, LAST_MESSAGE, self.ng_id, sup_id)
+                if last is not None and last["role"] == "negotiator":
+                    # The reply was saved but the turn failed after that:
+                    # send it (once) rather than draft and save another.
+                    span.set_attribute("negotiation.turn.resumed", True)
+                    row_id, reply = str(last["message_id"]), last["content"]
+                    message_id = last["email_message_id"]
+                else:
+                    with tracer.start_as_current_span("orchestrator.advice"):
+                        advice = await self.advice(sup_id)
+                    with tracer.start_as_current_span("negotiator.reply"):
+                        sent = await self.agents[sup_id].send_message(advice)
+                    if sent is None:
+                        return None
+                    row_id, reply = sent
+                    message_id = None
+            span.set_attribute("message.id", str(row_id))
+            if self.email_client and self.email_client.email:
+                address = self.addresses[sup_id]
+                if message_id is None:
+                    message_id = await self.email_client.email_send(
+                        address, f"RFQ: {self.orchestrator.product}", reply, row_id=row_id
+                    )
+                await db.execute(
+                    self.db_pool, RECORD_THREAD, message_id, self.ng_id, sup_id, address
+                )
+            return reply
+
+    def close_when_idle(self) -> None:
+        """Close now, or once the turns in progress have finished."""
+        if self.busy:
+            self.closing = True
+        else:
+            self.close()
+
+    def close(self) -> None:
+        self.invalidate_advice()
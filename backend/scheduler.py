@@ -0,0 +1,167 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+# Lower value is served first. Orchestrator advice unblocks a whole round of
+# negotiator turns, so it jumps ahead of routine replies.
+LANES = {"orchestrator": 0, "negotiator": 1, "background": 2}
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute` units per minute up to `capacity`."""
+
+    def __init__(self, per_minute: float, capacity: float | None = None) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` units are available, 0 if they are now."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LaneStats:
+    def __init__(self) -> None:
+        self.waiting = 0
+        self.served = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.waiting,
+            "served": self.served,
+            "wait_avg_s": self.wait_total / self.served if self.served else 0.0,
+            "wait_max_s": self.wait_max,
+        }
+
+
+class LLMScheduler:
+    """
+    Admits model calls under a global concurrency cap and per-minute request
+    and token budgets, serving waiting callers in lane priority order.
+
+    With `defer_depth`, the scheduler reports itself `backlogged` once that
+    many calls are waiting, and callers skip work that can wait, such as
+    refreshing orchestrator advice.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        requests_per_minute: float = 120,
+        tokens_per_minute: float = 200_000,
+        defer_depth: int = 0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.defer_depth = defer_depth
+        self.deferred = 0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        self.throttled = 0
+        self.retries = 0
+        self.lanes = {lane: LaneStats() for lane in LANES}
+        self._queue: list[tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._queue and self.in_flight < self.max_concurrency:
+            _, _, est_tokens, future = self._queue[0]
+            if future.cancelled():
+                heapq.heappop(self._queue)
+                continue
+            delay = max(self.requests.delay(1), self.tokens.delay(est_tokens))
+            if delay > 0:
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(est_tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _kick(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._kick()
+
+    @asynccontextmanager
+    async def slot(self, lane: str = "negotiator", est_tokens: float = 0) -> AsyncIterator[None]:
+        """Wait for admission, hold a concurrency slot for the duration of the block."""
+        stats = self.lanes[lane]
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (LANES[lane], next(self._seq), est_tokens, future))
+        stats.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            self._kick()
+            await future
+        except asyncio.CancelledError:
+            # Admitted just before the cancel landed: give the slot back.
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            stats.waiting -= 1
+
+        waited = time.monotonic() - queued_at
+        stats.served += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(stats.waiting for stats in self.lanes.values())
+
+    @property
+    def backlogged(self) -> bool:
+        return 0 < self.defer_depth <= self.queue_depth
+
+    def settle(self, est_tokens: float, used_tokens: float) -> None:
+        """Give back the part of an estimate the call did not use."""
+        if used_tokens < est_tokens:
+            self.tokens.refund(est_tokens - used_tokens)
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "defer_depth": self.defer_depth,
+            "deferred": self.deferred,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "lanes": {lane: stats.as_dict() for lane, stats in self.lanes.items()},
+        }
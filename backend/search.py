@@ -0,0 +1,58 @@
+import asyncpg
+
+import db
+from cache import TTLCache
+from db import Query
+
+# Both predicates are served by the GIN trigram index on product_name
+# (migrations/0004_indexes.sql): `<%` matches typos, ILIKE catches short
+# substrings that score low on word similarity.
+SEARCH_WITH_SUPPLIER_SQL = """
+SELECT p.product_id, p.product_name, p.supplier_id, s.supplier_name,
+       word_similarity($1, p.product_name) AS similarity_score
+FROM product p
+LEFT JOIN supplier s ON s.supplier_id = p.supplier_id
+WHERE $1 <% p.product_name OR p.product_name ILIKE $2
+ORDER BY similarity_score DESC, p.product_name
+LIMIT $3
+"""
+
+SEARCH_SQL = """
+SELECT p.product_id, p.product_name, p.supplier_id,
+       word_similarity($1, p.product_name) AS similarity_score
+FROM product p
+WHERE $1 <% p.product_name OR p.product_name ILIKE $2
+ORDER BY similarity_score DESC, p.product_name
+LIMIT $3
+"""
+
+SEARCH_WITH_SUPPLIER = Query("product_search_supplier", SEARCH_WITH_SUPPLIER_SQL, timeout=3)
+SEARCH = Query("product_search", SEARCH_SQL, timeout=3)
+
+search_cache = TTLCache(maxsize=2048, ttl=30.0)
+
+
+def like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def search_products(
+    pool: asyncpg.Pool, query: str, limit: int = 50, include_supplier: bool = True
+) -> list[asyncpg.Record]:
+    """Similarity-ranked product matches, cached briefly per normalized query."""
+    query = " ".join(query.split()).lower()
+    key = (query, limit, include_supplier)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = await db.fetch(
+        pool,
+        SEARCH_WITH_SUPPLIER if include_supplier else SEARCH,
+        query,
+        like_pattern(query),
+        limit,
+    )
+    search_cache.set(key, rows)
+    return rows
@@ -0,0 +1,195 @@
+import asyncio
+import sys
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from types import FunctionType, MethodType, ModuleType
+from typing import Any
+
+from router import NegotiationSession
+
+SessionLoader = Callable[[str], Awaitable[NegotiationSession | None]]
+
+# Statuses a negotiation can be worked on in; a change to anything else
+# (see the status.changed event) drops its session.
+ACTIVE_STATUSES = {"active"}
+
+
+def session_size(session: NegotiationSession) -> int:
+    """
+    Approximate bytes held by `session` alone: its agents, their state,
+    locks and strings, but not the pool, gateway, email client or stream hub it
+    shares with every other session.
+    """
+    shared = {
+        id(session.db_pool),
+        id(session.client),
+        id(session.email_client),
+        id(session.orchestrator.ledger),
+        id(asyncio.get_running_loop()),
+    }
+    for agent in session.agents.values():
+        shared.add(id(agent.streams))
+        # Interned, so held once for all agents rather than by this one.
+        shared.add(id(agent.sys_prompt))
+    return _sizeof(session, shared)
+
+
+def _sizeof(obj: Any, seen: set[int]) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, type, ModuleType, FunctionType, MethodType)):
+        return size
+    if isinstance(obj, dict):
+        children = [*obj.keys(), *obj.values()]
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        children = list(obj)
+    else:
+        children = [
+            getattr(obj, name)
+            for cls in type(obj).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if hasattr(obj, name)
+        ]
+        if hasattr(obj, "__dict__"):
+            children.append(vars(obj))
+    return size + sum(_sizeof(child, seen) for child in children)
+
+
+class SessionRegistry:
+    """
+    Resident NegotiationSessions, bounded by count and idle time.
+
+    Sessions are rebuilt from the database on demand (`get_or_load`), so an
+    evicted session costs one reload the next time its negotiation has work,
+    e.g. when a supplier email queues a reply turn. Once more than
+    `max_sessions` are resident the least recently used ones are evicted,
+    and `start` runs a sweep that evicts any unused for `idle_timeout`
+    seconds. Sessions with a turn in progress are never evicted.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        idle_timeout: float = 1800.0,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.loads = 0
+        self.evicted: Counter[str] = Counter()
+        self.task: asyncio.Task | None = None
+        self._sessions: OrderedDict[str, NegotiationSession] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, ng_id: str) -> bool:
+        return ng_id in self._sessions
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        for ng_id in list(self._sessions):
+            self._sessions.pop(ng_id).close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+    def peek(self, ng_id: str) -> NegotiationSession | None:
+        """The resident session, without counting it as used."""
+        return self._sessions.get(ng_id)
+
+    def get(self, ng_id: str) -> NegotiationSession | None:
+        session = self._sessions.get(ng_id)
+        if session is not None:
+            self._sessions.move_to_end(ng_id)
+            session.last_used = time.monotonic()
+        return session
+
+    async def get_or_load(self, ng_id: str, loader: SessionLoader) -> NegotiationSession | None:
+        """
+        The resident session, or one rebuilt by `loader`. Concurrent callers
+        for the same negotiation share one load; None if it does not exist.
+        """
+        session = self.get(ng_id)
+        if session is not None:
+            self.hits += 1
+            return session
+        task = self._loading.get(ng_id)
+        if task is None:
+            task = asyncio.create_task(self._load(ng_id, loader))
+            self._loading[ng_id] = task
+        # Shielded so one cancelled caller does not abort the others' load.
+        return await asyncio.shield(task)
+
+    async def _load(self, ng_id: str, loader: SessionLoader) -> NegotiationSession | None:
+        try:
+            session = await loader(ng_id)
+            if session is not None:
+                self.loads += 1
+                self.put(ng_id, session)
+            return session
+        finally:
+            self._loading.pop(ng_id, None)
+
+    def put(self, ng_id: str, session: NegotiationSession) -> None:
+        previous = self._sessions.get(ng_id)
+        if previous is not None and previous is not session:
+            previous.close_when_idle()
+        self._sessions[ng_id] = session
+        self._sessions.move_to_end(ng_id)
+        session.last_used = time.monotonic()
+        excess = len(self._sessions) - self.max_sessions
+        if excess > 0:
+            for victim in [i for i, s in self._sessions.items() if not s.busy][:excess]:
+                self._evict(victim, "lru")
+
+    def remove(self, ng_id: str) -> None:
+        """Drop a session whose negotiation has ended; a running turn finishes first."""
+        if ng_id in self._sessions:
+            self._evict(ng_id, "closed")
+
+    def sweep(self) -> None:
+        # Scans every session: a turn finishing refreshes last_used without
+        # moving its session in the LRU order, so order says nothing of age.
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [
+            ng_id
+            for ng_id, session in self._sessions.items()
+            if session.last_used <= cutoff and not session.busy
+        ]
+        for ng_id in expired:
+            self._evict(ng_id, "idle")
+
+    def _evict(self, ng_id: str, reason: str) -> None:
+        self._sessions.pop(ng_id).close_when_idle()
+        self.evicted[reason] += 1
+
+    def metrics(self, sample: int = 20) -> dict[str, Any]:
+        """Counters plus session size averaged over the `sample` most recently used."""
+        recent = list(self._sessions.values())[-sample:]
+        per_session = sum(map(session_size, recent)) // len(recent) if recent else 0
+        return {
+            "resident": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout_s": self.idle_timeout,
+            "loading": len(self._loading),
+            "hits": self.hits,
+            "loads": self.loads,
+            "evicted": dict(self.evicted),
+            "bytes_per_session": per_session,
+            "bytes_resident": per_session * len(self._sessions),
+        }
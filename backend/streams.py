@@ -0,0 +1,48 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+StreamKey = tuple[str, str]
+
+
+class TokenStreamHub:
+    """
+    Fans out partial negotiator replies to SSE subscribers, keyed by
+    (ng_id, supplier_id).
+
+    The text produced so far is kept until the reply finishes, so a client
+    that connects mid-reply first receives everything it missed.
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: dict[StreamKey, set[asyncio.Queue]] = {}
+        self.partial: dict[StreamKey, str] = {}
+
+    def publish(self, ng_id: str, sup_id: str, event: dict[str, Any]) -> None:
+        key = (ng_id, sup_id)
+        if event["type"] == "token":
+            self.partial[key] = self.partial.get(key, "") + event["text"]
+        else:
+            self.partial.pop(key, None)
+        for queue in self.subscribers.get(key, ()):
+            queue.put_nowait(event)
+
+    async def subscribe(
+        self, ng_id: str, sup_id: str, keepalive: float = 15.0
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        """Yield events as they arrive, or None every `keepalive` seconds of silence."""
+        key = (ng_id, sup_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(key, set()).add(queue)
+        try:
+            if key in self.partial:
+                yield {"type": "token", "text": self.partial[key]}
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.subscribers[key].discard(queue)
+            if not self.subscribers[key]:
+                del self.subscribers[key]
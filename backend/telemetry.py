@@ -0,0 +1,156 @@
+import os
+import time
+from collections.abc import Callable
+from typing import Any
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Spans go nowhere until a tracer provider is installed (see setup_tracing),
+# so the calls below cost a no-op object each when tracing is off.
+tracer = trace.get_tracer("negotiation")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+HTTP_REQUESTS = Histogram(
+    "http_request_duration_seconds",
+    "Time to response headers per route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "db_query_duration_seconds",
+    "Query execution time by db.Query name; 'other' for ad-hoc SQL.",
+    ["query"],
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_acquire_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    buckets=FAST_BUCKETS,
+)
+LLM_CALLS = Histogram(
+    "llm_call_duration_seconds",
+    "Model calls including scheduler wait and throttle retries.",
+    ["lane", "mode", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "Tokens reported by Bedrock.",
+    ["lane", "direction"],
+)
+EMAIL_SENT = Histogram(
+    "email_send_duration_seconds",
+    "SMTP delivery attempts.",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+EMAIL_RECEIVED = Histogram(
+    "email_receive_duration_seconds",
+    "Routing and recording of inbound email.",
+    ["outcome"],
+    buckets=FAST_BUCKETS,
+)
+AGENT_JOBS = Histogram(
+    "agent_job_duration_seconds",
+    "Agent jobs by kind and outcome.",
+    ["kind", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late a periodic event loop timer fired.",
+    buckets=FAST_BUCKETS,
+)
+
+
+def register_gauges(**sources: Callable[[], float]) -> None:
+    """
+    Gauges read at scrape time, e.g. `register_gauges(db_pool_idle=pool.get_idle_size)`.
+
+    Nothing is updated on the hot path; each callable runs once per scrape.
+    """
+    for name, source in sources.items():
+        gauge = Gauge(name, name.replace("_", " ").capitalize() + ".")
+        gauge.set_function(source)
+
+
+def metrics_body() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def inject() -> str | None:
+    """W3C traceparent of the current span, for work handed to another process."""
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier.get("traceparent")
+
+
+def extract(traceparent: str | None) -> Context:
+    return propagate.extract({"traceparent": traceparent} if traceparent else {})
+
+
+def fail(span: trace.Span, e: BaseException) -> None:
+    span.record_exception(e)
+    span.set_status(trace.Status(trace.StatusCode.ERROR, repr(e)))
+
+
+def setup_tracing(service_name: str) -> None:
+    """
+    Export spans over OTLP when OTEL_EXPORTER_OTLP_ENDPOINT is set.
+
+    Needs `opentelemetry-sdk` and `opentelemetry-exporter-otlp`; without
+    them, or without the endpoint, tracing stays a no-op.
+    """
+    if not os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        print("OTEL_EXPORTER_OTLP_ENDPOINT is set but the OpenTelemetry SDK is not installed")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every request and wrapping it in a span.
+
+    The histogram records time to response headers, so long-lived SSE
+    streams count their setup rather than their lifetime. Routes are
+    labelled by their template (`/conversation/{negotiation_id}/...`).
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        method = scope["method"]
+
+        with tracer.start_as_current_span(f"HTTP {method}", kind=trace.SpanKind.SERVER) as span:
+
+            async def send_timed(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    route = getattr(scope.get("route"), "path", "unmatched")
+                    status = message["status"]
+                    HTTP_REQUESTS.labels(method, route, status).observe(
+                        time.perf_counter() - start
+                    )
+                    span.update_name(f"HTTP {method} {route}")
+                    span.set_attribute("http.route", route)
+                    span.set_attribute("http.status_code", status)
+                await send(message)
+
+            await self.app(scope, receive, send_timed)
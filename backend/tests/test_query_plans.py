@@ -0,0 +1,33 @@
+"""
+Index usage of the hot queries, against the database in DB_URL.
+
+Applies pending migrations first, as the API does on startup, then runs the
+same check as `python migrate.py --check-plans`. Skipped without DB_URL.
+"""
+
+import asyncio
+import os
+
+import pytest
+
+
+async def _failures(dsn: str) -> list[str]:
+    import asyncpg
+
+    from migrate import check_plans, migrate
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await migrate(conn)
+        return await check_plans(conn)
+    finally:
+        await conn.close()
+
+
+def test_hot_queries_use_indexes() -> None:
+    dsn = os.environ.get("DB_URL")
+    if not dsn:
+        pytest.skip("DB_URL is not set")
+    pytest.importorskip("asyncpg")
+    failures = asyncio.run(_failures(dsn))
+    assert not failures, f"Sequential scans in: {', '.join(failures)}"
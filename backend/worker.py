@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+
+import asyncpg
+from prometheus_client import start_http_server
+
+from config import (
+    ADMISSION_LIMITS,
+    DATABASE_URL,
+    DB_POOL_MAX_SIZE,
+    EMAIL_ADDRESS,
+    EMAIL_PASSWORD,
+    OCHESTRATOR_AGENT_SYSTEM_PROMPT,
+    SESSION_CACHE_SIZE,
+    SESSION_IDLE_TIMEOUT,
+    build_llm,
+    create_db_pool,
+)
+from catalog import CatalogCache
+from email_client import EmailClient
+from jobs import JobWorker
+from llm import LLMGateway
+from monitor import LoopLagMonitor
+from offers import OfferLedger
+from router import NegotiationSession
+from sessions import SessionRegistry
+from streams import TokenStreamHub
+from telemetry import register_gauges, setup_tracing
+
+
+class TurnRunner:
+    """
+    Job handler for agent turns and offer extraction. Sessions are loaded
+    into the registry on a negotiation's first job and again after eviction.
+    """
+
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        client: LLMGateway,
+        catalog: CatalogCache,
+        email_client: EmailClient | None = None,
+        sessions: SessionRegistry | None = None,
+        streams: TokenStreamHub | None = None,
+    ) -> None:
+        self.db_pool = db_pool
+        self.client = client
+        self.catalog = catalog
+        self.email_client = email_client
+        self.sessions = sessions if sessions is not None else SessionRegistry()
+        self.streams = streams
+        self.ledger = OfferLedger(client, db_pool)
+
+    async def session(self, ng_id: str) -> NegotiationSession | None:
+        return await self.sessions.get_or_load(ng_id, self._load)
+
+    async def _load(self, ng_id: str) -> NegotiationSession | None:
+        return await NegotiationSession.load(
+            self.db_pool,
+            self.client,
+            ng_id,
+            OCHESTRATOR_AGENT_SYSTEM_PROMPT,
+            self.catalog,
+            self.email_client,
+            self.streams,
+            self.ledger,
+        )
+
+    async def __call__(self, job: asyncpg.Record) -> None:
+        if job["kind"] == "offer":
+            await self.ledger.extract(job["message_id"])
+            return
+        ng_id = str(job["ng_id"])
+        session = await self.session(ng_id)
+        if session is None or job["sup_id"] not in session.agents:
+            print(
+                f"Dropping {job['kind']} job {job['job_id']}: "
+                f"no agent for {job['sup_id']} in {ng_id}"
+            )
+            return
+        reply = await session.take_turn(job["sup_id"])
+        if reply is None:
+            # Nothing was saved, so the turn is safe to retry.
+            raise RuntimeError("Negotiator produced no reply")
+
+
+async def run(concurrency: int, metrics_port: int | None = None) -> None:
+    setup_tracing("negotiation-worker")
+    llm = build_llm()
+    pool = await create_db_pool(max_size=max(DB_POOL_MAX_SIZE, concurrency))
+    if llm.cache:
+        llm.cache.attach(pool)
+    email_client = EmailClient(EMAIL_ADDRESS, EMAIL_PASSWORD, pool)
+    sessions = SessionRegistry(SESSION_CACHE_SIZE, SESSION_IDLE_TIMEOUT)
+    # Supplier addresses and insights for rebuilt sessions.
+    catalog = CatalogCache(DATABASE_URL)
+    await catalog.start(pool)
+    runner = TurnRunner(pool, llm, catalog, email_client, sessions)
+    worker = JobWorker(
+        pool,
+        DATABASE_URL,
+        runner,
+        concurrency=concurrency,
+        tenant_max_running=ADMISSION_LIMITS.tenant_max_running_turns,
+    )
+    loop_monitor = LoopLagMonitor()
+    if metrics_port:
+        register_gauges(
+            db_pool_size=pool.get_size,
+            db_pool_idle=pool.get_idle_size,
+            db_pool_max_size=pool.get_max_size,
+            db_pool_waiting=lambda: pool.stats.waiting,
+            llm_in_flight=lambda: llm.scheduler.in_flight,
+            llm_queue_depth=lambda: llm.scheduler.metrics()["queue_depth"],
+            outbox_queue_depth=lambda: email_client.outbox.pending if email_client.outbox else 0,
+            agent_jobs_running=lambda: len(worker.running),
+            active_sessions=lambda: len(sessions),
+        )
+        start_http_server(metrics_port)
+        loop_monitor.start()
+    print(f"Worker {worker.worker_id} running {concurrency} agent turns at a time")
+    sessions.start()
+    try:
+        await worker.run()
+    finally:
+        await sessions.stop()
+        await catalog.stop()
+        await loop_monitor.stop()
+        await email_client.close()
+        llm.close()
+        await pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process queued negotiation turns.")
+    parser.add_argument("--concurrency", type=int, default=8, help="agent turns in flight")
+    parser.add_argument(
+        "--metrics-port", type=int, help="serve Prometheus metrics on this port"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.concurrency, args.metrics_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
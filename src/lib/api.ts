@@ -1,4 +1,7 @@
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5147';
+// Sent as X-API-Key where the backend resolves the tenant (TENANT_API_KEYS).
+const API_KEY: string | undefined = import.meta.env.VITE_API_KEY;
+const AUTH_HEADERS: Record<string, string> = API_KEY ? { 'X-API-Key': API_KEY } : {};
 
 /**
  * Check if the backend API is available
@@ -95,8 +98,12 @@ export async function getSuppliers(): Promise<Supplier[]> {
  */
 export async function getSupplierById(supplierId: string): Promise<Supplier | null> {
   try {
-    const suppliers = await getSuppliers();
-    return suppliers.find(s => s.supplier_id === supplierId) || null;
+    const response = await fetch(`${API_BASE_URL}/suppliers/${encodeURIComponent(supplierId)}`);
+    if (response.status === 404) return null;
+    if (!response.ok) {
+      throw new Error(`Failed to fetch supplier: ${response.statusText}`);
+    }
+    return (await response.json()) as Supplier;
   } catch (error) {
     console.error('Error fetching supplier:', error);
     return null;
@@ -132,11 +139,46 @@ export interface Message {
   text?: string;
   timestamp?: string;
   created_at?: string;
+  delivery_status?: "queued" | "retrying" | "sent" | "failed" | null;
   [key: string]: unknown;
 }
 
 export interface ConversationResponse {
   message: Message[];
+  next_cursor?: string | null;
+  has_more?: boolean;
+}
+
+export interface ConversationPage {
+  messages: Message[];
+  nextCursor: string | null;
+  hasMore: boolean;
+}
+
+/**
+ * Fetch one page of a supplier thread, oldest first. Pass the returned
+ * `nextCursor` back as `after` to get the following page, or only the
+ * messages added since once `hasMore` is false.
+ */
+export async function getConversationPage(
+  negotiationId: string,
+  supplierId: string,
+  after: string | null = null,
+  limit = 100
+): Promise<ConversationPage> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (after) params.set('after', after);
+  const url = `${API_BASE_URL}/conversation/${encodeURIComponent(negotiationId)}/${encodeURIComponent(supplierId)}?${params}`;
+  const response = await fetch(url, { method: 'GET' });
+  if (!response.ok) {
+    throw new Error(`Failed to fetch conversation: ${response.status} ${response.statusText}`);
+  }
+  const data = (await response.json()) as ConversationResponse;
+  return {
+    messages: Array.isArray(data.message) ? data.message : [],
+    nextCursor: data.next_cursor ?? after,
+    hasMore: !!data.has_more,
+  };
 }
 
 /**
@@ -226,11 +268,83 @@ export async function getConversation(negotiationId: string, supplierId: string)
 }
 
 
+export interface ReplyStreamHandlers {
+  onToken: (text: string) => void;
+  onDone?: (messageId: string) => void;
+  onError?: () => void;
+}
+
+/**
+ * Subscribe to the negotiator's reply as it is generated (Server-Sent Events).
+ * Returns a function that closes the stream.
+ */
+export function subscribeToReplyStream(
+  negotiationId: string,
+  supplierId: string,
+  handlers: ReplyStreamHandlers
+): () => void {
+  const url = `${API_BASE_URL}/stream/${encodeURIComponent(negotiationId)}/${encodeURIComponent(supplierId)}`;
+  const source = new EventSource(url);
+  source.addEventListener('token', (e) => {
+    const data = JSON.parse((e as MessageEvent).data) as { text: string };
+    handlers.onToken(data.text);
+  });
+  source.addEventListener('done', (e) => {
+    const data = JSON.parse((e as MessageEvent).data) as { message_id: string };
+    handlers.onDone?.(data.message_id);
+  });
+  source.addEventListener('error', () => {
+    handlers.onError?.();
+  });
+  return () => source.close();
+}
+
+export interface MessageCreatedEvent extends Message {
+  message_id: string;
+  supplier_id: string;
+  role: string;
+  content: string;
+  created_at: string;
+}
+
+export interface StatusChangedEvent {
+  status: string;
+  previous: string | null;
+}
+
+export interface NegotiationEventHandlers {
+  onMessage?: (message: MessageCreatedEvent) => void;
+  onStatus?: (event: StatusChangedEvent) => void;
+}
+
+/**
+ * Subscribe to pushed negotiation events (Server-Sent Events). The browser
+ * reconnects on its own and resumes from the last event id it received.
+ * Returns a function that closes the stream.
+ */
+export function subscribeToNegotiationEvents(
+  negotiationId: string,
+  handlers: NegotiationEventHandlers
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/events/${encodeURIComponent(negotiationId)}`);
+  source.addEventListener('message.created', (e) => {
+    handlers.onMessage?.(JSON.parse((e as MessageEvent).data) as MessageCreatedEvent);
+  });
+  source.addEventListener('status.changed', (e) => {
+    handlers.onStatus?.(JSON.parse((e as MessageEvent).data) as StatusChangedEvent);
+  });
+  return () => source.close();
+}
+
 // ---- Additional helper endpoints for fallback JSON display ----
 
 export interface NegotiationStatusAgent {
   supplier_id: string;
   message_count: number;
+  last_message_at?: string | null;
+  last_sender?: string | null;
+  latest_offer?: string | null;
+  best_offer?: number | null;
   [key: string]: unknown;
 }
 
@@ -375,6 +489,11 @@ export async function listNegotiations(): Promise<NegotiationItem[]> {
 }
 
 
+export interface NegotiationSupplierRef {
+  supplier_id: string;
+  supplier_name: string | null;
+}
+
 export interface Negotiation {
   negotiation_id: string | number;
   prompt: string;
@@ -383,6 +502,9 @@ export interface Negotiation {
   status: string;
   created_at?: string;
   updated_at?: string;
+  suppliers?: NegotiationSupplierRef[];
+  message_count?: number;
+  best_offer?: number | null;
 }
 
 export interface CreateNegotiationRequest {
@@ -399,10 +521,67 @@ export interface BackendNegotiation {
   product: string;
   strategy: string;
   status: string;
+  created_at?: string;
+  supplier_count?: number;
+  message_count?: number;
+  last_message_at?: string | null;
+  best_offer?: number | null;
+  suppliers?: NegotiationSupplierRef[];
 }
 
 export interface BackendNegotiationsResponse {
   negotiations: BackendNegotiation[];
+  next_cursor?: string | null;
+  has_more?: boolean;
+}
+
+export interface NegotiationPageQuery {
+  status?: string;
+  product?: string;
+  before?: string | null;
+  limit?: number;
+}
+
+export interface NegotiationPage {
+  negotiations: Negotiation[];
+  nextCursor: string | null;
+  hasMore: boolean;
+}
+
+function toNegotiation(ng: BackendNegotiation): Negotiation {
+  return {
+    negotiation_id: ng.negotiation_id,
+    prompt: ng.product || '', // Use product as prompt
+    supplier_ids: (ng.suppliers || []).map((s) => s.supplier_id),
+    modes: ng.strategy ? ng.strategy.split(', ').filter(m => m.trim()) : [],
+    status: ng.status || 'pending',
+    created_at: ng.created_at,
+    updated_at: ng.last_message_at || ng.created_at,
+    suppliers: ng.suppliers || [],
+    message_count: ng.message_count,
+    best_offer: ng.best_offer,
+  };
+}
+
+/**
+ * Fetch one newest-first page of negotiations. Supplier ids and names,
+ * counts and best offer come back in the same response.
+ */
+export async function listNegotiationPage(query: NegotiationPageQuery = {}): Promise<NegotiationPage> {
+  const params = new URLSearchParams({ limit: String(query.limit ?? 50) });
+  if (query.status) params.set('status', query.status);
+  if (query.product) params.set('product', query.product);
+  if (query.before) params.set('before', query.before);
+  const response = await fetch(`${API_BASE_URL}/get_negotations?${params}`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch negotiations: ${response.status} ${response.statusText}`);
+  }
+  const data = (await response.json()) as BackendNegotiationsResponse;
+  return {
+    negotiations: (data.negotiations || []).map(toNegotiation),
+    nextCursor: data.next_cursor ?? null,
+    hasMore: !!data.has_more,
+  };
 }
 
 // ---- Negotiation tactics / prompt helper ----
@@ -465,6 +644,7 @@ export async function createNegotiation(request: CreateNegotiationRequest): Prom
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        ...AUTH_HEADERS,
       },
       body: JSON.stringify({
         product: product,
@@ -517,61 +697,9 @@ export async function getNegotiations(): Promise<Negotiation[]> {
     }
 
     const data: BackendNegotiationsResponse = await response.json();
-    
-    // Map backend format to frontend format
-    // Backend returns: { negotiations: [{ negotiation_id, product, strategy, status }] }
-    // Frontend expects: [{ negotiation_id, prompt, supplier_ids, modes, status, created_at, updated_at }]
-    const negotiations: Negotiation[] = (data.negotiations || []).map((ng) => ({
-      negotiation_id: ng.negotiation_id,
-      prompt: ng.product || '', // Use product as prompt
-      supplier_ids: [], // Will need to fetch from agent table separately
-      modes: ng.strategy ? ng.strategy.split(', ').filter(m => m.trim()) : [],
-      status: ng.status || 'pending',
-      created_at: new Date().toISOString(), // Backend doesn't provide this yet
-      updated_at: new Date().toISOString(),
-    }));
-
-    // Try to fetch supplier_ids from agent table for each negotiation
-    // This is a workaround since the backend doesn't return supplier_ids directly
-    try {
-      // Use Promise.all to fetch all supplier_ids in parallel for better performance
-      const supplierPromises = negotiations.map(async (ng) => {
-        try {
-          const statusResponse = await fetch(`${API_BASE_URL}/negotiation_status/${ng.negotiation_id}`, {
-            method: 'GET',
-            headers: {
-              'Content-Type': 'application/json',
-            },
-          });
-          
-          if (statusResponse.ok) {
-            const statusData = (await statusResponse.json()) as {
-              agents?: Array<{ supplier_id?: string | number | null; sup_id?: string | number | null }>;
-            };
-            // Backend returns sup_id, but we need to handle both supplier_id and sup_id
-            const supplierIds = (statusData.agents || [])
-              .map((a) => String(a.supplier_id ?? a.sup_id ?? ''))
-              .filter((id) => id && id !== 'undefined' && id !== 'null');
-            return { negotiationId: ng.negotiation_id, supplierIds };
-          }
-        } catch (err) {
-          console.warn(`Failed to fetch supplier_ids for negotiation ${ng.negotiation_id}:`, err);
-        }
-        return { negotiationId: ng.negotiation_id, supplierIds: [] };
-      });
 
-      const supplierResults = await Promise.all(supplierPromises);
-      
-      // Map supplier_ids back to negotiations
-      supplierResults.forEach((result) => {
-        const negotiation = negotiations.find(ng => String(ng.negotiation_id) === String(result.negotiationId));
-        if (negotiation) {
-          negotiation.supplier_ids = result.supplierIds;
-        }
-      });
-    } catch (err) {
-      console.warn('Could not fetch supplier_ids for negotiations:', err);
-    }
+    // Backend rows already carry supplier ids, counts and timestamps
+    const negotiations: Negotiation[] = (data.negotiations || []).map(toNegotiation);
 
     return negotiations;
   } catch (error) {
@@ -6,7 +6,7 @@ import { NegotiationSidebar } from '@/components/NegotiationSidebar';
 import { Navbar } from '@/components/Navbar';
 import { mockSuppliers, mockConversations } from '@/lib/mockData';
 import { ProductCategory, Supplier } from '@/types/procurement';
-import { createNegotiation, getNegotiations, getNegotiationById, getSuppliers, getProducts, getNegotiationTactics, getNegotiationStatus, type Negotiation, type NegotiationStatusResponse, type ProductRow } from '@/lib/api';
+import { createNegotiation, getNegotiations, getNegotiationById, getSuppliers, getProducts, getNegotiationTactics, getNegotiationStatus, subscribeToNegotiationEvents, type Negotiation, type NegotiationStatusResponse, type ProductRow } from '@/lib/api';
 import OrchestrationVisual from '@/components/OrchestrationVisual';
 
 interface SupplierWithProducts {
@@ -210,40 +210,44 @@ export default function NegotiationPage() {
     }
   };
 
-  // Poll negotiation_status every 3 seconds when we have a currentNegotiationId
+  // Load negotiation_status once, then keep message counts current from pushed events
   useEffect(() => {
-    let intervalId: number | undefined;
-    let stopped = false;
-
-    const poll = async () => {
-      if (!currentNegotiationId) return;
-      try {
-        const res = await getNegotiationStatus(String(currentNegotiationId));
-        if (res) {
-          setNegotiationStatusJson(res);
-          // Stop polling if backend reports completion
-          if (res.all_completed) {
-            if (intervalId) window.clearInterval(intervalId);
-            intervalId = undefined;
-            stopped = true;
-          }
-        }
-      } catch (e) {
-        console.warn('Polling negotiation_status failed', e);
-      }
-    };
-
-    if (currentNegotiationId) {
-      // Immediate fetch
-      poll();
-      // Then interval
-      intervalId = window.setInterval(poll, 3000);
-    }
-
-    return () => {
-      if (intervalId) window.clearInterval(intervalId);
-      stopped = true;
-    };
+    if (!currentNegotiationId) return;
+    const negotiationId = String(currentNegotiationId);
+
+    getNegotiationStatus(negotiationId)
+      .then((res) => {
+        if (res) setNegotiationStatusJson(res);
+      })
+      .catch((e) => console.warn('Fetching negotiation_status failed', e));
+
+    return subscribeToNegotiationEvents(negotiationId, {
+      onMessage: (message) => {
+        setNegotiationStatusJson((prev) => {
+          if (!prev) return prev;
+          const known = prev.agents.some((a) => a.supplier_id === message.supplier_id);
+          const agents = known
+            ? prev.agents.map((a) =>
+                a.supplier_id === message.supplier_id
+                  ? {
+                      ...a,
+                      message_count: a.message_count + 1,
+                      last_message_at: message.created_at,
+                      last_sender: message.role,
+                      latest_offer: message.role === 'supplier' ? message.content.slice(0, 500) : a.latest_offer,
+                    }
+                  : a
+              )
+            : [...prev.agents, { supplier_id: message.supplier_id, message_count: 1 }];
+          return { ...prev, agents };
+        });
+      },
+      onStatus: (event) => {
+        setNegotiationStatusJson((prev) =>
+          prev ? { ...prev, status: event.status, all_completed: event.status === 'completed' } : prev
+        );
+      },
+    });
   }, [currentNegotiationId]);
 
   const handleSupplierClick = (supplierId: string) => {
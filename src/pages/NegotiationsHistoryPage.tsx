@@ -6,8 +6,8 @@ import { Card } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Input } from '@/components/ui/input';
 import { Navbar } from '@/components/Navbar';
-import { getNegotiations, getNegotiationById, getSuppliers, getProducts, type Negotiation } from '@/lib/api';
-import { Supplier, ProductCategory } from '@/types/procurement';
+import { listNegotiationPage, type Negotiation } from '@/lib/api';
+import { Supplier } from '@/types/procurement';
 import { cn } from '@/lib/utils';
 
 export default function NegotiationsHistoryPage() {
@@ -16,28 +16,48 @@ export default function NegotiationsHistoryPage() {
   const [loading, setLoading] = useState(true);
   const [searchQuery, setSearchQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState<string>('all');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
 
+  // Status is filtered server-side; each page is one request with supplier names and counts included
   useEffect(() => {
     const fetchNegotiations = async () => {
       try {
         setLoading(true);
-        const data = await getNegotiations();
-        console.log('Fetched negotiations:', data);
-        // Log supplier_ids for debugging
-        data?.forEach(ng => {
-          console.log(`Negotiation ${ng.negotiation_id} has ${ng.supplier_ids.length} suppliers:`, ng.supplier_ids);
-        });
-        setNegotiations(data || []);
+        const page = await listNegotiationPage({ status: statusFilter === 'all' ? undefined : statusFilter });
+        setNegotiations(page.negotiations);
+        setNextCursor(page.nextCursor);
+        setHasMore(page.hasMore);
       } catch (error) {
         console.error('Error fetching negotiations:', error);
         setNegotiations([]);
+        setHasMore(false);
       } finally {
         setLoading(false);
       }
     };
 
     fetchNegotiations();
-  }, []);
+  }, [statusFilter]);
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await listNegotiationPage({
+        status: statusFilter === 'all' ? undefined : statusFilter,
+        before: nextCursor,
+      });
+      setNegotiations((prev) => [...prev, ...page.negotiations]);
+      setNextCursor(page.nextCursor);
+      setHasMore(page.hasMore);
+    } catch (error) {
+      console.error('Error loading more negotiations:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const formatDate = (dateString?: string) => {
     if (!dateString) return 'Unknown date';
@@ -66,132 +86,39 @@ export default function NegotiationsHistoryPage() {
     return text.substring(0, maxLength) + '...';
   };
 
-  const handleNegotiationClick = async (negotiationId: string | number) => {
-    try {
-      console.log('Opening negotiation:', negotiationId);
-      const negotiation = await getNegotiationById(negotiationId);
-      if (!negotiation) {
-        console.warn('Negotiation not found', negotiationId);
-        return;
-      }
-
-      console.log('Negotiation data:', negotiation);
-      console.log('Supplier IDs:', negotiation.supplier_ids);
-
-      let supplierList: any[] = [];
-      let products: any[] = [];
-      try {
-        const apiSuppliers = await getSuppliers();
-        supplierList = Array.isArray(apiSuppliers)
-          ? apiSuppliers
-          : (apiSuppliers as any)?.suppliers || [];
-        console.log('Fetched suppliers:', supplierList.length);
-      } catch (err) {
-        console.warn('Failed to fetch suppliers, falling back to ids only', err);
-      }
-      try {
-        products = await getProducts();
-        console.log('Fetched products:', products.length);
-      } catch (err) {
-        console.warn('Failed to fetch products for supplier names', err);
-      }
-
-      // Normalize supplier list for easier lookup
-      const supplierMap = new Map<string, Supplier>();
-      supplierList.forEach((s: any) => {
-        const id = String(s?.supplier_id || s?.id || s?.supplier_name || '').trim();
-        if (!id) return;
-        const normalized: Supplier = {
-          id,
-          name: s?.supplier_name || s?.name || id,
-          category: (s?.category as ProductCategory) || 'electronics',
-          rating: s?.rating || 0,
-          responseTime: s?.response_time || s?.responseTime || '',
-          priceRange: s?.price_range || s?.priceRange || '',
-          location: s?.location || '',
-        };
-        supplierMap.set(id, normalized);
-        if (s?.supplier_name) supplierMap.set(String(s.supplier_name), normalized);
-      });
-
-      const mappedSuppliers: Supplier[] = (negotiation.supplier_ids || []).map((id) => {
-        const key = String(id).trim();
-        if (!key || key === 'undefined' || key === 'null') {
-          console.warn('Invalid supplier ID:', id);
-          return null;
-        }
-
-        // Always try to derive the name from products by supplier_id
-        const productMatch = products.find((p: any) => {
-          const pSupplierId = String(p?.supplier_id || '').trim();
-          return pSupplierId === key;
-        });
-        if (productMatch) {
-          console.log(`Found supplier ${key} in products:`, productMatch.supplier_name);
-          return {
-            id: key,
-            name: productMatch.supplier_name || `Supplier ${key}`,
-            category: (productMatch.category as ProductCategory) || 'electronics',
-            rating: 0,
-            responseTime: '',
-            priceRange: '',
-            location: '',
-          };
-        }
-
-        // Fallback to supplier map
-        const match = supplierMap.get(key);
-        if (match) {
-          console.log(`Found supplier ${key} in supplier map:`, match.name);
-          return match;
-        }
-
-        console.warn(`Could not find supplier ${key}, using fallback`);
-        return {
-          id: key,
-          name: `Supplier ${key}`,
-          category: 'electronics',
-          rating: 0,
-          responseTime: '',
-          priceRange: '',
-          location: '',
-        };
-      }).filter((s): s is Supplier => s !== null);
-
-      console.log('Mapped suppliers:', mappedSuppliers.length, mappedSuppliers);
-
-      if (mappedSuppliers.length === 0) {
-        console.error('No suppliers found for negotiation!', negotiation);
-        alert('No suppliers found for this negotiation. Please check the backend data.');
-        return;
-      }
+  const handleNegotiationClick = (negotiation: Negotiation) => {
+    const mappedSuppliers: Supplier[] = (negotiation.suppliers || []).map((s) => ({
+      id: s.supplier_id,
+      name: s.supplier_name || `Supplier ${s.supplier_id}`,
+      category: 'electronics',
+      rating: 0,
+      responseTime: '',
+      priceRange: '',
+      location: '',
+    }));
 
-      navigate('/negotiation', {
-        state: {
-          suppliers: mappedSuppliers,
-          negotiationPrompt: negotiation.prompt,
-          negotiationTones: negotiation.modes || [],
-          fromHistory: true, // Flag to indicate this came from history page
-        },
-      });
-    } catch (error) {
-      console.error('Error opening negotiation', error);
+    if (mappedSuppliers.length === 0) {
+      console.error('No suppliers found for negotiation!', negotiation);
+      alert('No suppliers found for this negotiation. Please check the backend data.');
+      return;
     }
-  };
 
-  // Filter negotiations
-  const filteredNegotiations = negotiations.filter((ng) => {
-    const matchesSearch = 
-      ng.prompt.toLowerCase().includes(searchQuery.toLowerCase()) ||
-      ng.modes.some(mode => mode.toLowerCase().includes(searchQuery.toLowerCase()));
-    const matchesStatus = statusFilter === 'all' || ng.status === statusFilter;
-    return matchesSearch && matchesStatus;
-  });
+    navigate('/negotiation', {
+      state: {
+        suppliers: mappedSuppliers,
+        negotiationPrompt: negotiation.prompt,
+        negotiationTones: negotiation.modes || [],
+        negotiationId: negotiation.negotiation_id,
+        fromHistory: true, // Flag to indicate this came from history page
+      },
+    });
+  };
 
-  const statusCounts = negotiations.reduce((acc, ng) => {
-    acc[ng.status] = (acc[ng.status] || 0) + 1;
-    return acc;
-  }, {} as Record<string, number>);
+  // Text search over the loaded pages
+  const filteredNegotiations = negotiations.filter((ng) =>
+    ng.prompt.toLowerCase().includes(searchQuery.toLowerCase()) ||
+    ng.modes.some(mode => mode.toLowerCase().includes(searchQuery.toLowerCase()))
+  );
 
   return (
     <div className="min-h-screen bg-background">
@@ -237,28 +164,28 @@ export default function NegotiationsHistoryPage() {
                 size="sm"
                 onClick={() => setStatusFilter('all')}
               >
-                All ({negotiations.length})
+                All
               </Button>
               <Button
                 variant={statusFilter === 'pending' ? 'default' : 'outline'}
                 size="sm"
                 onClick={() => setStatusFilter('pending')}
               >
-                Pending ({statusCounts.pending || 0})
+                Pending
               </Button>
               <Button
                 variant={statusFilter === 'active' ? 'default' : 'outline'}
                 size="sm"
                 onClick={() => setStatusFilter('active')}
               >
-                Active ({statusCounts.active || 0})
+                Active
               </Button>
               <Button
                 variant={statusFilter === 'completed' ? 'default' : 'outline'}
                 size="sm"
                 onClick={() => setStatusFilter('completed')}
               >
-                Completed ({statusCounts.completed || 0})
+                Completed
               </Button>
             </div>
           </div>
@@ -287,7 +214,7 @@ export default function NegotiationsHistoryPage() {
                 <Card
                   key={String(negotiation.negotiation_id)}
                   className="p-6 hover:shadow-md transition-shadow cursor-pointer"
-                  onClick={() => handleNegotiationClick(negotiation.negotiation_id)}
+                  onClick={() => handleNegotiationClick(negotiation)}
                 >
                   <div className="flex items-start justify-between gap-4">
                     <div className="flex-1 min-w-0">
@@ -306,8 +233,12 @@ export default function NegotiationsHistoryPage() {
                               <span>
                                 {negotiation.supplier_ids.length} supplier
                                 {negotiation.supplier_ids.length !== 1 ? 's' : ''}
+                                {negotiation.message_count !== undefined && ` · ${negotiation.message_count} messages`}
                               </span>
                             </div>
+                            {negotiation.best_offer != null && (
+                              <span>Best offer: {negotiation.best_offer.toLocaleString()}</span>
+                            )}
                           </div>
                         </div>
                         <Badge
@@ -340,7 +271,7 @@ export default function NegotiationsHistoryPage() {
                           size="sm"
                           onClick={(e) => {
                             e.stopPropagation();
-                            handleNegotiationClick(negotiation.negotiation_id);
+                            handleNegotiationClick(negotiation);
                           }}
                         >
                           View Details →
@@ -350,6 +281,11 @@ export default function NegotiationsHistoryPage() {
                   </div>
                 </Card>
               ))}
+              {hasMore && (
+                <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading…' : 'Load more'}
+                </Button>
+              )}
             </div>
           )}
         </div>
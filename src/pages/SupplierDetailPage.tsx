@@ -8,7 +8,7 @@ import {Progress} from '@/components/ui/progress';
 // We avoid inner scroll areas for the conversation so the whole page scrolls
 import {mockConversations, mockOffers, mockSuppliers} from '@/lib/mockData';
 import {ProductCategory, Supplier} from '@/types/procurement';
-import {getConversation, getNegotiationSummary, type Message, type NegotiationSupplierSummaryItem} from '@/lib/api';
+import {getConversationPage, getNegotiationSummary, subscribeToNegotiationEvents, subscribeToReplyStream, type Message, type NegotiationSupplierSummaryItem} from '@/lib/api';
 import {cn} from '@/lib/utils';
 
 interface SupplierWithProducts {
@@ -71,12 +71,14 @@ export default function SupplierDetailPage() {
   const offer = mockOffers.find((o) => o.supplierId === supplierId);
   const [summaryItems, setSummaryItems] = useState<NegotiationSupplierSummaryItem[] | null>(null);
   const [loadingSummary, setLoadingSummary] = useState(false);
+  // Negotiator reply currently being generated, streamed in token by token
+  const [streamingReply, setStreamingReply] = useState<string | null>(null);
   
   useEffect(() => {
     if (messagesEndRef.current) {
       messagesEndRef.current.scrollIntoView({ behavior: 'smooth' });
     }
-  }, [messages]);
+  }, [messages, streamingReply]);
 
   // Fetch per-supplier negotiation summary when we know negotiationId and supplierId
   useEffect(() => {
@@ -287,22 +289,26 @@ export default function SupplierDetailPage() {
       setLoadingMessages(true);
       setFetchError(null);
       try {
-        console.log(`Calling getConversation with negotiationId: ${negotiationId}, supplierId: ${supplierId}`);
-        const fetchedMessages = await getConversation(String(negotiationId), String(supplierId));
-        console.log('Raw fetched messages:', fetchedMessages);
-        
-        // Sort messages by timestamp
-        const sortedMessages = [...fetchedMessages].sort((a, b) => {
-          const timeA = new Date(a.message_timestamp || a.timestamp || a.created_at || 0).getTime();
-          const timeB = new Date(b.message_timestamp || b.timestamp || b.created_at || 0).getTime();
-          return timeA - timeB;
-        });
-        
-        console.log('Sorted messages:', sortedMessages);
-        setMessages(sortedMessages);
-        
+        // Page through the thread oldest-first; the server returns it in order,
+        // so pages are appended as they arrive without re-sorting
+        let loaded: Message[] = [];
+        let cursor: string | null = null;
+        let hasMore = true;
+        setMessages([]);
+        while (hasMore) {
+          const page = await getConversationPage(String(negotiationId), String(supplierId), cursor);
+          loaded = loaded.concat(page.messages);
+          cursor = page.nextCursor;
+          hasMore = page.hasMore;
+          const loadedIds = new Set(loaded.map((m) => String(m.message_id)));
+          const snapshot = loaded;
+          // Keep anything pushed by events meanwhile that is not part of the loaded pages
+          setMessages((prev) => [...snapshot, ...prev.filter((m) => !loadedIds.has(String(m.message_id)))]);
+          setLoadingMessages(false);
+        }
+
         // If we got empty array but have negotiationId, it might be a CORS issue
-        if (sortedMessages.length === 0 && negotiationId) {
+        if (loaded.length === 0 && negotiationId) {
           // Check if there was a network error (likely CORS)
           const errorCheck = await fetch(`${import.meta.env.VITE_API_BASE_URL || 'http://localhost:5147'}/health`).catch(() => null);
           if (!errorCheck || !errorCheck.ok) {
@@ -326,6 +332,30 @@ export default function SupplierDetailPage() {
     fetchMessages();
   }, [negotiationId, supplierId, state]);
 
+  // Show the negotiator's reply while it is being written; the persisted
+  // message then arrives as a message.created event and replaces the draft
+  useEffect(() => {
+    if (!negotiationId || !supplierId) return;
+    return subscribeToReplyStream(String(negotiationId), String(supplierId), {
+      onToken: (text) => setStreamingReply((prev) => (prev ?? '') + text),
+      onError: () => setStreamingReply(null),
+    });
+  }, [negotiationId, supplierId]);
+
+  // Append new messages as they are pushed instead of re-downloading the transcript
+  useEffect(() => {
+    if (!negotiationId || !supplierId) return;
+    return subscribeToNegotiationEvents(String(negotiationId), {
+      onMessage: (message) => {
+        if (message.supplier_id !== String(supplierId)) return;
+        setMessages((prev) =>
+          prev.some((m) => m.message_id === message.message_id) ? prev : [...prev, message]
+        );
+        if (message.role === 'negotiator') setStreamingReply(null);
+      },
+    });
+  }, [negotiationId, supplierId]);
+
   // Removed debug/fallback JSON fetching to keep the UI clean and focused on conversation
 
   const getStatusLabel = (status: string) => {
@@ -481,8 +511,18 @@ export default function SupplierDetailPage() {
                       </div>
                     );
                   })}
+                  {streamingReply !== null && (
+                    <div className="flex items-start gap-3 justify-end">
+                      <div className="max-w-[80%] rounded-2xl p-3 shadow-sm bg-muted/80 text-foreground rounded-br-sm">
+                        <RichText text={streamingReply} />
+                      </div>
+                      <div className="h-8 w-8 rounded-full bg-foreground text-background flex items-center justify-center">
+                        <User className="h-4 w-4" />
+                      </div>
+                    </div>
+                  )}
                   {/* Empty state */}
-                  {messages.length === 0 && (
+                  {messages.length === 0 && streamingReply === null && (
                     <div className="text-sm text-muted-foreground text-center py-12">No messages yet.</div>
                   )}
                 </div>